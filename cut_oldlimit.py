@@ -160,6 +160,7 @@ class CutOldLimit(QDialog, gui_dlg_cut_oldlimit):
                 q_ok = QMessageBox.question(self, cutlim_vtxdist_msg[0], cutlim_vtxdist_msg[1].format(msg), QMessageBox.Yes | QMessageBox.No)
                 # The user continues
                 if q_ok == QMessageBox.Yes:
+                    nw_lim_feats = []
                     for id, pt in enumerate(nw_pt_lst):
                         end_vtx = pt[3]
                         if id == 0:
@@ -168,12 +169,16 @@ class CutOldLimit(QDialog, gui_dlg_cut_oldlimit):
                         st_vtx = pt[3]
                         nw_attvals = [NULL, NULL, ge_createur, lim_delim_pub, lim_typologie_nature]
                         # Create the feature
-                        create_nw_feat(self.l_edge, line, nw_attvals)
+                        nw_lim_feats.append(build_nw_feat(self.l_edge, line, nw_attvals))
                         # Case of the last limit to create
                         if id == (len(nw_pt_lst) -1):
                             line = QgsGeometry.fromPolylineXY([end_vtx, end_lim_pt])
-                            create_nw_feat(self.l_edge, line, nw_attvals)
+                            nw_lim_feats.append(build_nw_feat(self.l_edge, line, nw_attvals))
+                    # Replace the old limit by the new ones (one undo step)
+                    self.l_edge.beginEditCommand(cutlim_editcmd)
+                    self.l_edge.addFeatures(nw_lim_feats)
                     self.l_edge.deleteFeature(oldlim.id())
+                    self.l_edge.endEditCommand()
                     self.l_edge.removeSelection()
                     self.l_vertex.removeSelection()
                     QMessageBox.information(self, cutlim_end_msg[0], cutlim_end_msg[1])
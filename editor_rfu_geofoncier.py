@@ -478,7 +478,8 @@ class EditorRFUGeofoncier:
                                     selected_ellips_acronym=self.rfu.selected_ellips_acronym,
                                     typo_nature_som=self.rfu.typo_nature_som,
                                     typo_nature_lim=self.rfu.typo_nature_lim,
-                                    tol_spt=self.rfu.tol_same_pt)
+                                    tol_spt=self.rfu.tol_same_pt,
+                                    work_zone=self.rfu.limit_area)
             self.dxf2rfu_import.import_file()
         else :
             QMessageBox.information(
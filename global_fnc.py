@@ -15,17 +15,18 @@
 """
 
 
-from qgis.PyQt.QtCore import Qt, QVariant, pyqtSignal
-from qgis.PyQt.QtGui import QColor
+from qgis.PyQt.QtCore import Qt, QVariant, QPointF, pyqtSignal
+from qgis.PyQt.QtGui import QColor, QPolygonF
 from qgis.core import (QgsCoordinateReferenceSystem, QgsCoordinateTransform,
                         QgsVectorLayer, QgsProject, QgsSymbol,
                         QgsSingleSymbolRenderer, QgsRuleBasedRenderer, QgsLineSymbol,
                         QgsField, Qgis, QgsFeature, QgsPointXY, QgsMessageLog, QgsWkbTypes,
-                        QgsEditorWidgetSetup)
+                        QgsEditorWidgetSetup, QgsGeometry, QgsSpatialIndex, NULL)
 from qgis.PyQt.QtWidgets import QMessageBox, QGridLayout
 
 import math
 import os
+import re
 import json
 import codecs
 
@@ -46,6 +47,91 @@ def find_near(pt1, pt2, tol):
         return [False, dist]
 
 
+# Index of the vertices of a layer (in CC coordinates) to find the vertices
+# in the tolerance of a point without checking all the vertices of the layer
+# The vertices are put in the cells of a grid, the size of a cell is the max tolerance:
+# the vertices in the tolerance of a point are in the 9 cells around the point
+class VtxTolIndex:
+
+    def __init__(self, l_vtx, coords_tr_cc):
+        # Vertices of the layer: (x, y, tolerance, id_noeud)
+        self.vtxs = []
+        for vtx_feat in l_vtx.getFeatures():
+            vtx_feat_g = vtx_feat.geometry()
+            if vtx_feat_g.type() == QgsWkbTypes.PointGeometry:
+                vtx_feat_pt_cc = coords_tr_cc.transform(vtx_feat_g.asPoint())
+                self.vtxs.append((vtx_feat_pt_cc.x(), vtx_feat_pt_cc.y(),
+                                  vtx_feat['som_tolerance'], vtx_feat['@id_noeud']))
+        self.build_grid()
+
+    # Put the vertices in the cells of the grid
+    def build_grid(self):
+        # find_near rounds the distance to mm, hence the additional mm
+        self.cell_size = max([vtx[2] for vtx in self.vtxs if vtx[2]] + [0.0]) + 0.001
+        self.grid = {}
+        for idx, vtx in enumerate(self.vtxs):
+            self.grid.setdefault(self.cell(vtx[0], vtx[1]), []).append(idx)
+
+    def cell(self, x, y):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    # Add a new vertex (point in CC coordinates)
+    def add(self, pt_cc, tol, id_noeud=NULL):
+        self.vtxs.append((pt_cc.x(), pt_cc.y(), tol, id_noeud))
+        if tol and tol + 0.001 > self.cell_size:
+            self.build_grid()
+        else:
+            self.grid.setdefault(self.cell(pt_cc.x(), pt_cc.y()), []).append(len(self.vtxs) - 1)
+
+    # Find the vertices in the tolerance of pt (in CC coordinates)
+    # Return a list of [vertex point (CC), tolerance, id_noeud, distance], in the order of the layer
+    def find_near(self, pt):
+        col, row = self.cell(pt.x(), pt.y())
+        idxs = []
+        for cell_col in (col - 1, col, col + 1):
+            for cell_row in (row - 1, row, row + 1):
+                idxs.extend(self.grid.get((cell_col, cell_row), []))
+        vtxs_in_tol = []
+        for idx in sorted(idxs):
+            vtx_x, vtx_y, vtx_tol, vtx_id = self.vtxs[idx]
+            vtx_pt = QgsPointXY(vtx_x, vtx_y)
+            pt_in_tol = find_near(vtx_pt, pt, vtx_tol)
+            if pt_in_tol[0]:
+                vtxs_in_tol.append([vtx_pt, vtx_tol, vtx_id, pt_in_tol[1]])
+        return vtxs_in_tol
+
+
+# Transformation of the points of an import, all the points are transformed
+# at once (1 call of transformPolygon) and then read from a dict of the coordinates
+class BatchTransform:
+
+    def __init__(self, coords_tr, xys=()):
+        self.coords_tr = coords_tr
+        # Transformed points by (x, y)
+        self.tr_pts = {}
+        self.add(xys)
+
+    # Transform the (x, y) coordinates not transformed yet
+    def add(self, xys):
+        nw_xys = list(dict.fromkeys(xy for xy in xys if xy not in self.tr_pts))
+        if not nw_xys:
+            return
+        polygon = QPolygonF([QPointF(x, y) for x, y in nw_xys])
+        self.coords_tr.transformPolygon(polygon)
+        for idx, xy in enumerate(nw_xys):
+            tr_pt = polygon.at(idx)
+            self.tr_pts[xy] = QgsPointXY(tr_pt.x(), tr_pt.y())
+
+    # Return the transformed QgsPointXY of pt (transformed now if pt was not in the batch)
+    def transform(self, pt):
+        xy = (pt.x(), pt.y())
+        tr_pt = self.tr_pts.get(xy)
+        if tr_pt is None:
+            tr_pt = self.coords_tr.transform(pt)
+            self.tr_pts[xy] = tr_pt
+        return tr_pt
+
+
 # Create 2 transformations to obtain WGS84 or CC coordinates (project CRS)
 def crs_trans_params(canvas, project):
     crs_cur = canvas.mapSettings().destinationCrs()
@@ -53,6 +139,15 @@ def crs_trans_params(canvas, project):
     coords_trf_wgs = QgsCoordinateTransform(crs_cur, crs_wgs, project)
     coords_trf_cc = QgsCoordinateTransform(crs_wgs, crs_cur, project)
     return coords_trf_wgs, coords_trf_cc
+
+
+# Return the work zone (limit area of the download, in WGS84) in the current CRS of the canvas,
+# computed when used as the CRS may have changed since the download
+# Return None if there is no work zone (no download)
+def work_zone_extent(limit_area, canvas, project):
+    if limit_area is None or limit_area.isEmpty():
+        return None
+    return crs_trans_params(canvas, project)[1].transformBoundingBox(limit_area)
     
     
 # Create the layer that will be used to store the eliminated lines
@@ -91,6 +186,25 @@ def create_elimlyr(canvas):
     return elim_lyr
     
     
+# Create the layer that will be used to store the conflicts of an import
+def create_conflictlyr():
+    conflict_lyr = QgsVectorLayer(r"Point?crs=epsg:4326&index=yes",
+                                    conflictlyr_lname, r"memory")
+    p_conflict = conflict_lyr.dataProvider()
+    QgsProject.instance().addMapLayer(conflict_lyr, True)
+    # Create a simple symbol
+    rend_symb = QgsSymbol.defaultSymbol(conflict_lyr.geometryType())
+    rend_symb.setSize(conflictlyr_size)
+    rend_symb.setColor(QColor(conflictlyr_color))
+    rend_symb.setOpacity(conflictlyr_opc)
+    conflict_lyr.setRenderer(QgsSingleSymbolRenderer(rend_symb))
+    p_conflict.addAttributes(conflictlyr_atts)
+    conflict_lyr.updateFields()
+    # Refresh the canvas
+    conflict_lyr.triggerRepaint()
+    return conflict_lyr
+
+
 # Define the params of a message box (with title, text, informativetext)
 def mbox_with_parent_params(wdg_parent, title, text, informative_text):
     mbox = QMessageBox(wdg_parent)
@@ -115,83 +229,189 @@ def mbox_w_params(title, text, informative_text):
     return mbox
 
 
+# Index of the limits of a layer (spatial index of their bounding boxes)
+# to check only the limits close to a new limit in check_limit_cross
+# Also keeps the layer of the eliminated lines once found or created
+class EdgeIndex:
+
+    def __init__(self, l_edge):
+        self.sp_index = QgsSpatialIndex()
+        # Limits of the layer: [geometry, id_arc]
+        self.edges = []
+        self.l_elimedge = None
+        for edge_feat in l_edge.getFeatures():
+            self.add(edge_feat)
+
+    # Add a limit feature (the order of the layer is kept)
+    def add(self, edge_feat):
+        edge_feat_g = edge_feat.geometry()
+        if edge_feat_g.type() == QgsWkbTypes.LineGeometry:
+            self.edges.append([edge_feat_g, edge_feat['@id_arc']])
+            self.sp_index.addFeature(len(self.edges) - 1, edge_feat_g.boundingBox())
+
+    # Return the limits whose bounding box intersects the bounding box of line
+    def candidates(self, line):
+        return [self.edges[idx] for idx in sorted(self.sp_index.intersects(line.boundingBox()))]
+
+    # Return the layer of the eliminated lines, created if it doesn't exist
+    def elim_lyr(self, canvas):
+        if self.l_elimedge is None:
+            if not QgsProject.instance().mapLayersByName(elimedge_lname):
+                self.l_elimedge = create_elimlyr(canvas)
+            else:
+                self.l_elimedge = QgsProject.instance().mapLayersByName(elimedge_lname)[0]
+        return self.l_elimedge
+
+
+# Conflicts of an import (points in the tolerance of a RFU point, double points,
+# duplicate or crossing limits)
+# In batch mode, the conflicts are collected and shown at the end of the import
+# (one message box and the conflicts layer) instead of one message box for each conflict
+class ImportReport:
+
+    def __init__(self, coords_tr_cc, batch=imp_conflicts_batch):
+        self.coords_tr_cc = coords_tr_cc
+        self.batch = batch
+        # Conflicts: [title, text, informative text, geometry (WGS84), id_noeud]
+        self.conflicts = []
+
+    # Add a conflict, geom is the point or the line (WGS84) of the conflict
+    def add(self, title, text, informative_text, geom, id_noeud=NULL):
+        if self.batch:
+            self.conflicts.append([title, text, informative_text, geom, id_noeud])
+        else:
+            mbox_w_params(title, text, informative_text).exec_()
+
+    # Put the conflicts in the conflicts layer and show the number of conflicts by type
+    def show(self):
+        if not self.conflicts:
+            return
+        if not QgsProject.instance().mapLayersByName(conflictlyr_lname):
+            l_conflict = create_conflictlyr()
+        else:
+            l_conflict = QgsProject.instance().mapLayersByName(conflictlyr_lname)[0]
+        conflict_feats = []
+        nb_conflicts = {}
+        for title, text, informative_text, geom, id_noeud in self.conflicts:
+            # Point of the conflict (middle of a line)
+            if geom.type() == QgsWkbTypes.LineGeometry:
+                conflict_pt = geom.interpolate(geom.length() / 2).asPoint()
+            else:
+                conflict_pt = geom.asPoint()
+            conflict_pt_cc = self.coords_tr_cc.transform(conflict_pt)
+            conflict_feat = QgsFeature()
+            conflict_feat.setGeometry(QgsGeometry.fromPointXY(conflict_pt))
+            conflict_feat.setFields(l_conflict.fields())
+            conflict_feat.setAttributes([title, html_to_txt(text + " " + informative_text),
+                                         round(conflict_pt_cc.x(), 2), round(conflict_pt_cc.y(), 2), id_noeud])
+            conflict_feats.append(conflict_feat)
+            nb_conflicts[title] = nb_conflicts.get(title, 0) + 1
+        # Temporary layer: the features are added to the provider (no editing mode)
+        l_conflict.dataProvider().addFeatures(conflict_feats)
+        l_conflict.updateExtents()
+        l_conflict.triggerRepaint()
+        conflicts_txt = "<br/>".join("{0:s}: {1:d}".format(title, nb) for title, nb in sorted(nb_conflicts.items()))
+        m_box = mbox_w_params(tl_imp_conflicts, txt_imp_conflicts.format(len(self.conflicts)),
+                                inftxt_imp_conflicts.format(conflicts_txt, conflictlyr_lname))
+        m_box.exec_()
+        self.conflicts = []
+
+
+# Report a conflict (title, text, informative text) to report,
+# or show it in a message box if report is None
+def report_conflict(report, conflict, geom, id_noeud=NULL):
+    if report is None:
+        mbox_w_params(*conflict).exec_()
+    else:
+        report.add(*conflict, geom, id_noeud)
+
+
+# Text of a message without the html tags
+def html_to_txt(html_txt):
+    return " ".join(re.sub(r"<[^>]+>", " ", html_txt).split())
+
+
 # Check if a limit (line) intersects one of the existing limits 
 # (in original_l_edge layer). If yes, put this limit
 # in the elimedge_lname layer and return False
 # If imported = False: use others messages and doesn't create
 # eliminated lines
 # Also check if two lines are equals
-def check_limit_cross(line, original_l_edge, ge_createur, delim_pub, lim_typo_nat, canvas, imported):
+# edge_index: EdgeIndex of original_l_edge, to use for several lines
+# (the caller adds the new limits to the index)
+# report: ImportReport of the conflicts (if None, a message box is shown for each conflict)
+def check_limit_cross(line, original_l_edge, ge_createur, delim_pub, lim_typo_nat, canvas, imported, edge_index=None,
+                      report=None):
     to_create = True
     first_creation = True
+    if edge_index is None:
+        edge_index = EdgeIndex(original_l_edge)
+    # Prepared geometry of the new line (compared to each limit close to it)
+    line_engine = QgsGeometry.createGeometryEngine(line.constGet())
+    line_engine.prepareGeometry()
     # Check intersection of lines
-    for edge_feat in original_l_edge.getFeatures():
-        edge_feat_g = edge_feat.geometry()
-        if edge_feat_g.type() == QgsWkbTypes.LineGeometry:
-            cross_case = ""
-            # Check for equality of 2 lines
-            if line.isGeosEqual(edge_feat_g):
-                # Determine the texts to use (depending on imported lines or manually created lines)
-                if imported:
-                    txt_rfu = txt_ln_equ_rfu
-                    itxt_rfu = inftxt_ln_equ_rfu
-                    txt_nw = txt_ln_equ
-                    itxt_nw = inftxt_ln_equ
-                else:
-                    txt_rfu = txt_nwln_equ_rfu
-                    itxt_rfu = inftxt_nwln_equ
-                    txt_nw = txt_nwln_equ
-                    itxt_nw = inftxt_nwln_equ
-                # Case of new line equals a RFU line
-                if edge_feat['@id_arc']:
-                    m_box = mbox_w_params(tl_ln_equ, txt_rfu, itxt_rfu)
-                # Case of 2 imported equal lines
-                else:
-                    m_box = mbox_w_params(tl_ln_equ, txt_nw, itxt_nw)
-                m_box.exec_()
-                to_create = False
-            # Check if 2 lines intersects
-            elif line.crosses(edge_feat_g) and first_creation:
-                # Determine the texts to use (depending on imported lines or manually created lines)
-                if imported:
-                    txt_rfu = txt_ln_ints_rfu
-                    itxt_rfu = inftxt_ln_ints_rfu.format(elimedge_lname)
-                    txt_nw = txt_ln_ints
-                    itxt_nw = inftxt_ln_ints.format(elimedge_lname)
-                else:
-                    txt_rfu = txt_nwln_ints_rfu
-                    itxt_rfu = inftxt_nwln_ints
-                    txt_nw = txt_nwln_ints
-                    itxt_nw = inftxt_nwln_ints
-                # Case of new line intersects a RFU line
-                if edge_feat['@id_arc']:
-                    cross_case = inter_rfu
-                    m_box = mbox_w_params(tl_ln_ints, txt_rfu, itxt_rfu)
-                # Case of 2 imported lines intersects
-                else:
-                    cross_case = inter_new
-                    m_box = mbox_w_params(tl_ln_ints, txt_nw, itxt_nw)
-                m_box.exec_()
-                to_create = False
-            # Case of imported lines: create the crossing line in a specific layer
-            if imported and cross_case != "" and first_creation:
-                # If doesn't exist, create a layer that will contain the eliminated lines
-                if not QgsProject.instance().mapLayersByName(elimedge_lname):
-                    l_elimedge = create_elimlyr(canvas)
-                else:
-                    l_elimedge = QgsProject.instance().mapLayersByName(elimedge_lname)[0]
-                # Create the eliminated line in the specific layer
-                # Start editing mode
-                if not l_elimedge.isEditable():
-                    l_elimedge.startEditing()
-                # Create the feature
-                elimedge = QgsFeature()
-                elimedge.setGeometry(line)
-                elimedge.setFields(l_elimedge.fields())
-                elimedge.setAttributes([cross_case, ge_createur, delim_pub, lim_typo_nat])
-                # Add feature to the layer
-                l_elimedge.addFeature(elimedge)
-                first_creation = False
+    for edge_feat_g, edge_id_arc in edge_index.candidates(line):
+        cross_case = ""
+        # Check for equality of 2 lines
+        if line_engine.isEqual(edge_feat_g.constGet()):
+            # Determine the texts to use (depending on imported lines or manually created lines)
+            if imported:
+                txt_rfu = txt_ln_equ_rfu
+                itxt_rfu = inftxt_ln_equ_rfu
+                txt_nw = txt_ln_equ
+                itxt_nw = inftxt_ln_equ
+            else:
+                txt_rfu = txt_nwln_equ_rfu
+                itxt_rfu = inftxt_nwln_equ
+                txt_nw = txt_nwln_equ
+                itxt_nw = inftxt_nwln_equ
+            # Case of new line equals a RFU line
+            if edge_id_arc:
+                conflict = (tl_ln_equ, txt_rfu, itxt_rfu)
+            # Case of 2 imported equal lines
+            else:
+                conflict = (tl_ln_equ, txt_nw, itxt_nw)
+            report_conflict(report, conflict, line)
+            to_create = False
+        # Check if 2 lines intersects
+        elif first_creation and line_engine.crosses(edge_feat_g.constGet()):
+            # Determine the texts to use (depending on imported lines or manually created lines)
+            if imported:
+                txt_rfu = txt_ln_ints_rfu
+                itxt_rfu = inftxt_ln_ints_rfu.format(elimedge_lname)
+                txt_nw = txt_ln_ints
+                itxt_nw = inftxt_ln_ints.format(elimedge_lname)
+            else:
+                txt_rfu = txt_nwln_ints_rfu
+                itxt_rfu = inftxt_nwln_ints
+                txt_nw = txt_nwln_ints
+                itxt_nw = inftxt_nwln_ints
+            # Case of new line intersects a RFU line
+            if edge_id_arc:
+                cross_case = inter_rfu
+                conflict = (tl_ln_ints, txt_rfu, itxt_rfu)
+            # Case of 2 imported lines intersects
+            else:
+                cross_case = inter_new
+                conflict = (tl_ln_ints, txt_nw, itxt_nw)
+            report_conflict(report, conflict, line)
+            to_create = False
+        # Case of imported lines: create the crossing line in a specific layer
+        if imported and cross_case != "" and first_creation:
+            # Layer that will contain the eliminated lines (created if it doesn't exist)
+            l_elimedge = edge_index.elim_lyr(canvas)
+            # Create the eliminated line in the specific layer
+            # Start editing mode
+            if not l_elimedge.isEditable():
+                l_elimedge.startEditing()
+            # Create the feature
+            elimedge = QgsFeature()
+            elimedge.setGeometry(line)
+            elimedge.setFields(l_elimedge.fields())
+            elimedge.setAttributes([cross_case, ge_createur, delim_pub, lim_typo_nat])
+            # Add feature to the layer
+            l_elimedge.addFeature(elimedge)
+            first_creation = False
     return to_create
 
 
@@ -330,6 +550,35 @@ def check_identical_lines(qgs_line1, qgs_line2, digit):
     return ret
 
 
+# Key of a point in the dict of the eliminated points of an import
+# (new point replaced by a RFU point): rounded CC coordinates of the point
+def elim_pt_key(qgs_pt):
+    return round(qgs_pt.x(), elim_pt_digit), round(qgs_pt.y(), elim_pt_digit)
+
+
+# Add a new point eliminated and the corresponding point in the RFU
+# to the dict of the eliminated points (the first RFU point found is kept)
+def add_elim_pt(elim_pts, nw_pt, rfu_pt):
+    elim_pts.setdefault(elim_pt_key(nw_pt), rfu_pt)
+
+
+# Return the RFU point to use instead of qgs_pt if qgs_pt is an eliminated point,
+# otherwise qgs_pt
+def replace_elim_pt(elim_pts, qgs_pt):
+    return elim_pts.get(elim_pt_key(qgs_pt), qgs_pt)
+
+
+# Key of a segment (2 points) to find the identical segments with a dict or a set
+# Same key whatever the direction of the segment
+# digit = number of digit taken into account for the comparison
+def segment_key(qgs_pt1, qgs_pt2, digit):
+    key1 = (round(qgs_pt1.x(), digit), round(qgs_pt1.y(), digit))
+    key2 = (round(qgs_pt2.x(), digit), round(qgs_pt2.y(), digit))
+    if key2 < key1:
+        return key2, key1
+    return key1, key2
+
+
 # Find the max length among several lists
 def find_maxlength(self, *val_lists):
     ret_len = 0
@@ -413,14 +662,30 @@ def chkbox_to_truefalse(chkbox):
 # geom = QgsGeometry
 # atts_val = list of attributes values
 def create_nw_feat(lyr, geom, atts_val):
+    nw_feat = build_nw_feat(lyr, geom, atts_val)
+    lyr.addFeature(nw_feat)
+    return nw_feat
+
+
+# Build a new feature with the fields of a specific layer (not added to the layer)
+def build_nw_feat(lyr, geom, atts_val):
     nw_feat = QgsFeature()
     nw_feat.setGeometry(geom)
     nw_feat.setFields(lyr.fields())
     nw_feat.setAttributes(atts_val)
-    lyr.addFeature(nw_feat)
     return nw_feat
 
 
+# Add a list of new features to a specific layer (in editing mode)
+# in one call and one edit command (one undo step named cmd_txt)
+def add_nw_feats(lyr, nw_feats, cmd_txt):
+    if not nw_feats:
+        return
+    lyr.beginEditCommand(cmd_txt)
+    lyr.addFeatures(nw_feats)
+    lyr.endEditCommand()
+
+
 ######################################################
 # FOR DEBUGGING
 ######################################################
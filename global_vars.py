@@ -27,6 +27,13 @@ txt_csvimp_canc = "Vous n'avez pas sélectionné de fichier CSV ! \nImport annul
 txt_csvimp_norfu_canc = "Vous devez d'abord télécharger les données du RFU avant d'effectuer un import du fichier CSV.\nImport CSV annulé !"
 tl_dxf_choice = "Choisir le fichier DXF à importer"
 txt_dxfimp_canc = "Vous n'avez pas sélectionné de fichier DXF ! \nImport annulé !"
+tl_dxf_probe = "Lecture du fichier DXF"
+txt_dxfprobe_canc = "La lecture du fichier DXF a été interrompue ! \nImport annulé !"
+tl_dxf_parse = "Import du fichier DXF"
+txt_dxfparse_canc = "L'import du fichier DXF a été interrompu ! \nImport annulé !"
+txt_dxf_err = "Le fichier DXF n'a pas pu être lu !\n{0}\nImport annulé !"
+txt_dxf_noent = "Aucune entité à importer dans le fichier DXF (calques, types d'entités ou zone de travail choisis) ! \nImport annulé !"
+txt_dxf_create_err = "Les sommets et les limites du fichier DXF n'ont pas pu être créés !\n{0}\nImport annulé !"
 txt_dxfimp_norfu_canc = "Vous devez d'abord télécharger les données du RFU avant d'effectuer un import du fichier DXF.\nImport DXF annulé !"
 tl_pt_exst_rfu = "Point proche d'un point déjà présent dans le RFU"
 txt_pt_exst_rfu = "<b>Un point importé est proche (dans la tolérance) d'un point RFU !</b>"
@@ -64,6 +71,10 @@ txt_nwln_equ = "<b>La nouvelle limite est strictement identique à une autre nou
 txt_nwln_equ_rfu = "<b>La nouvelle limite est strictement identique à une limite du RFU !</b>"
 inftxt_nwln_equ = "La limite en cours de création ne sera pas créée !"
 
+tl_imp_conflicts = "Conflits de l'import"
+txt_imp_conflicts = "<b>{0:d} conflit(s) détecté(s) pendant l'import !</b>"
+inftxt_imp_conflicts = "{0:s}<br/>Chaque conflit a été placé dans la couche <font color=\"firebrick\">{1:s}</font> (coordonnées, point RFU et motif)."
+
 tl_atn = "Attention"
 txt_msg_outbbox = "<b>Eléments nouveaux hors zone !</b>"
 msg_outbbox_vtx = "Un ou plusieurs sommets nouveaux se trouvent hors de la zone de travail ! <br/>Ils ont été déplacés dans la couche <font color=\"firebrick\">{0:s}</font> et n'ont pas été exportés."
@@ -190,8 +201,37 @@ no_blk = "Pas de bloc associé"
 all_blks = "Tous les blocs du calque"
 # Message for DXF Import limits choice
 no_lyr = "Pas de calque associé"
+# Tooltip of the layers in the DXF Import combos (number of INSERT, LINE and LWPOLYLINE entities)
+lyr_counts_tip = "{0:d} bloc(s), {1:d} ligne(s), {2:d} polyligne(s)"
 # LineEdit placeholder text for new nature
 le_phtxt = "Nature personnalisée"
+# DXF entity types used by the DXF Import (vertices: INSERT, limits: LINE and LWPOLYLINE)
+dxf_imp_types = ("INSERT", "LINE", "LWPOLYLINE")
+# Cache of the parsed DXF files (directory in the QGIS profile, max size in bytes)
+dxf_cache_dir = "geofoncier_rfu_dxf_cache"
+dxf_cache_max_size = 200 * 1024 * 1024
+# Margin (in project CRS units) around the work zone, the DXF entities outside are not imported
+dxf_extent_margin = 100.0
+# Number of digits of the coordinates compared to detect the duplicate segments of the DXF Import (mm)
+dxf_dup_seg_digit = 3
+# Message of the DXF Import (number of duplicate segments removed)
+dxf_dup_seg_txt = ("Import DXF", "{0:d} segment(s) en double supprimé(s) avant la création des limites.")
+
+# Number of digits of the CC coordinates of the keys of the eliminated points of the imports
+# (1E-8 like the comparison of 2 QgsPointXY)
+elim_pt_digit = 8
+# Names of the edit commands (undo steps) of the imports and of the cut of a limit
+imp_dxf_editcmd = "Import DXF"
+imp_csv_editcmd = "Import CSV"
+cutlim_editcmd = "Découpage d'une limite"
+# Conflicts of the imports reported at the end of the import (one message box and the conflicts layer)
+# instead of one message box for each conflict
+imp_conflicts_batch = True
+# Parameters of the layer created for the conflicts of an import
+conflictlyr_lname = "Conflits de l'import (non exportable)"
+conflictlyr_color = '#ff4201'
+conflictlyr_size = 3.0
+conflictlyr_opc = 0.8
 
 # Parameters of the layer created for eliminated limits
 elimedge_mono = False
@@ -292,6 +332,14 @@ elimlyr_atts = [
                 QgsField(r"lim_typologie_nature", QVariant.String)                             
                 ]
             
+conflictlyr_atts = [
+                QgsField(r"pb_type", QVariant.String),
+                QgsField(r"pb_detail", QVariant.String),
+                QgsField(r"coord_est", QVariant.Double),
+                QgsField(r"coord_nord", QVariant.Double),
+                QgsField(r"id_noeud", QVariant.LongLong)
+                ]
+            
 # List of lim_typologie_nature hardcoded
 lim_typo_nat_vals = ['Limite privée', 'Limite naturelle']
 
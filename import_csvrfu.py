@@ -19,7 +19,7 @@
 
 from qgis.PyQt.QtCore import QVariant
 from qgis.PyQt.QtWidgets import QMessageBox, QFileDialog
-from qgis.core import QgsPointXY, QgsWkbTypes, QgsFeature, QgsGeometry, NULL
+from qgis.core import QgsPointXY, QgsFeature, QgsGeometry, NULL
 
 import os
 import csv
@@ -109,11 +109,20 @@ class ImportCsvRfu:
                                                 ])
 
             # Creation of the vertices
-            elim_pts = []
+            # Eliminated points: RFU point to use instead of the new point, by rounded CC coordinates of the new point
+            elim_pts = {}
             self.iface.setActiveLayer(self.l_edge)
             self.iface.setActiveLayer(self.l_vertex)
             # Transformations to obtain the WGS84 or the CC coordinates
             coords_trf_wgs, coords_trf_cc = crs_trans_params(self.canvas, self.project)
+            # Transformation of all the points of the CSV file to WGS84 at once
+            tr_wgs = BatchTransform(coords_trf_wgs, [(pt.x(), pt.y()) for pt in csv_nw_pt.values()])
+            # Conflicts of the import (shown at the end of the import)
+            report = ImportReport(coords_trf_cc)
+            # New vertices, added to the layer at the end of the vertices creation
+            nw_vtx_feats = []
+            # Index of the vertices (RFU and new ones) in CC coordinates for the tolerance check
+            vtx_index = VtxTolIndex(self.original_l_vtx, coords_trf_cc)
             for nw_som in csv_som:
                 nw_pt = csv_nw_pt[nw_som[1]]
                 if nw_som[0].lower() == 'oui':
@@ -129,86 +138,84 @@ class ImportCsvRfu:
                 pt_type_cmt = nw_som[5]
                 if nw_som[6] != '':
                     pt_type_cmt = nw_som[6]
-                nw_pt_wgs = coords_trf_wgs.transform(nw_pt)
+                nw_pt_wgs = tr_wgs.transform(nw_pt)
                 # Check if the new vertex is in the tolerance of an existing vertex in the RFU
                 to_create = True
                 id_ptintol = NULL
-                for vtx_feat in self.original_l_vtx.getFeatures() :
-                    vtx_feat_g = vtx_feat.geometry()
-                    vtx_tol = vtx_feat['som_tolerance']
-                    if vtx_feat_g.type() == QgsWkbTypes.PointGeometry :
-                        vtx_feat_pt = vtx_feat_g.asPoint()
-                        vtx_feat_pt_cc = coords_trf_cc.transform(vtx_feat_pt)
-                        pt_in_tol = find_near(vtx_feat_pt_cc, nw_pt, vtx_tol)
-                        if pt_in_tol[0]:
-                            # Case of existing RFU point in the tolerance distance
-                            if vtx_feat['@id_noeud']:
-                                id_ptintol = vtx_feat['@id_noeud']
-                                if pt_in_tol[1] > 0:
-                                    m_box = mbox_w_params(tl_pt_exst_rfu, txt_pt_exst_rfu, 
-                                                            inftxt_pt_exst_rfu.format(nw_pt.x(), nw_pt.y(),
-                                                            float(vtx_tol), id_ptintol))
-                                # Case of strictly identical point
-                                else:
-                                    elim_dbpt = []
-                                    elim_dbpt.append(nw_pt)
-                                    # Round the pt coordinates to get the same accuracy 
-                                    # as in the csv file
-                                    rp_pt = round_pt_2_cm(vtx_feat_pt_cc)
-                                    elim_dbpt.append(rp_pt)
-                                    elim_pts.append(elim_dbpt)
-                                    to_create = False
-                                    m_box = mbox_w_params(tl_ptrfu_dbl, txt_ptrfu_dbl, 
-                                                            inftxt_ptrfu_dbl.format(nw_pt.x(), nw_pt.y(), id_ptintol))
-                            # Case of double point in the file imported
-                            else:
-                                m_box = mbox_w_params(tl_pt_dbl, txt_pt_dbl,
-                                                        inftxt_pt_dbl.format(nw_pt.x(), nw_pt.y()))
-                                # Add the list of new point eliminated and corresponding point 
-                                # in the RFU to the list of eliminated points 
-                                # (list of 2 point lists)
-                                elim_dbpt = []
-                                elim_dbpt.append(nw_pt)
-                                # Round the pt coordinates to get the same accuracy 
-                                # as in the csv file
-                                rp_pt = round_pt_2_cm(vtx_feat_pt_cc)
-                                elim_dbpt.append(rp_pt)
-                                elim_pts.append(elim_dbpt)
-                                to_create = False     
-                            m_box.exec_()
+                for vtx_feat_pt_cc, vtx_tol, vtx_id, vtx_dist in vtx_index.find_near(nw_pt):
+                    # Case of existing RFU point in the tolerance distance
+                    if vtx_id:
+                        id_ptintol = vtx_id
+                        if vtx_dist > 0:
+                            conflict = (tl_pt_exst_rfu, txt_pt_exst_rfu, 
+                                                    inftxt_pt_exst_rfu.format(nw_pt.x(), nw_pt.y(),
+                                                    float(vtx_tol), id_ptintol))
+                        # Case of strictly identical point
+                        else:
+                            # Round the pt coordinates to get the same accuracy 
+                            # as in the csv file
+                            rp_pt = round_pt_2_cm(vtx_feat_pt_cc)
+                            add_elim_pt(elim_pts, nw_pt, rp_pt)
+                            to_create = False
+                            conflict = (tl_ptrfu_dbl, txt_ptrfu_dbl, 
+                                                    inftxt_ptrfu_dbl.format(nw_pt.x(), nw_pt.y(), id_ptintol))
+                    # Case of double point in the file imported
+                    else:
+                        conflict = (tl_pt_dbl, txt_pt_dbl,
+                                                inftxt_pt_dbl.format(nw_pt.x(), nw_pt.y()))
+                        # Add the new point eliminated and corresponding point 
+                        # in the RFU to the eliminated points
+                        # Round the pt coordinates to get the same accuracy 
+                        # as in the csv file
+                        rp_pt = round_pt_2_cm(vtx_feat_pt_cc)
+                        add_elim_pt(elim_pts, nw_pt, rp_pt)
+                        to_create = False     
+                    report_conflict(report, conflict, QgsGeometry.fromPointXY(nw_pt_wgs), vtx_id)
                 # Creation of the RFU objects in the layers
                 if to_create:
-                    create_nw_feat( self.l_vertex, 
+                    nw_vtx_feats.append(build_nw_feat( self.l_vertex, 
                                     QgsGeometry.fromPointXY(nw_pt_wgs), 
                                     [NULL, NULL, ge_createur, som_delim_pub, pt_type, pt_type_cmt, idx_prec, float("{0:.02f}".format(nw_pt.x())), float("{0:.02f}".format(nw_pt.y())), self.cc, 0.0, "false", id_ptintol]
-                                    )                    
+                                    ))                    
+                    # The new vertex is in the tolerance check of the next ones
+                    vtx_index.add(nw_pt, 0.0)
+
+            # Add the new vertices to the layer (one undo step)
+            add_nw_feats(self.l_vertex, nw_vtx_feats, imp_csv_editcmd)
 
             # Creation of limits
             self.iface.setActiveLayer(self.l_vertex)
             self.iface.setActiveLayer(self.l_edge)
+            # Index of the limits (RFU and new ones) for the check of the intersections
+            edge_index = EdgeIndex(self.original_l_edge)
+            # New limits, added to the layer at the end of the limits creation
+            nw_lim_feats = []
             for lim in nw_edge:
                 start_pt_cc = lim[0]
                 end_pt_cc = lim[1]
                 # Check if the point is an eliminated point
                 # If yes, use the corresponding RFU point instead
-                for elim_pt in elim_pts:
-                    if start_pt_cc == elim_pt[0]:
-                        start_pt_cc = elim_pt[1]
-                    if end_pt_cc == elim_pt[0]:
-                        end_pt_cc = elim_pt[1]
+                start_pt_cc = replace_elim_pt(elim_pts, start_pt_cc)
+                end_pt_cc = replace_elim_pt(elim_pts, end_pt_cc)
                 
                 # Creation only if no double point
                 if check_no_dblpt(start_pt_cc, end_pt_cc):
-                    start_pt = coords_trf_wgs.transform(start_pt_cc)
-                    end_pt = coords_trf_wgs.transform(end_pt_cc)
+                    start_pt = tr_wgs.transform(start_pt_cc)
+                    end_pt = tr_wgs.transform(end_pt_cc)
                     # Create line geometry
                     line = QgsGeometry.fromPolylineXY([start_pt, end_pt])
                     # Check if the lines intersects
-                    to_create = check_limit_cross(line, self.original_l_edge,ge_createur, lim[2], lim[3], self.canvas, True)
+                    to_create = check_limit_cross(line, self.original_l_edge,ge_createur, lim[2], lim[3], self.canvas, True, edge_index, report)
                     # Creation of the new RFU objects in the layer
                     if to_create:
                         # Create the feature
-                        create_nw_feat(self.l_edge, line, [NULL, NULL, ge_createur, lim[2], lim[3]])                      
+                        nw_lim = build_nw_feat(self.l_edge, line, [NULL, NULL, ge_createur, lim[2], lim[3]])
+                        edge_index.add(nw_lim)
+                        nw_lim_feats.append(nw_lim)
                 
+            # Add the new limits to the layer (one undo step)
+            add_nw_feats(self.l_edge, nw_lim_feats, imp_csv_editcmd)
+            # Summary of the conflicts of the import
+            report.show()
             # Refresh the canvas
             self.canvas.refresh()
@@ -22,16 +22,19 @@ from qgis.PyQt.QtCore import Qt, QVariant, pyqtSignal, QSize
 from qgis.PyQt.QtGui import QColor
 from qgis.PyQt.QtWidgets import (QMessageBox, QFileDialog, QLabel, QComboBox, QLineEdit,
                                     QSizePolicy, QSpacerItem, QWidget, QDialog)
-from qgis.core import QgsPointXY, QgsWkbTypes, QgsFeature, QgsGeometry, NULL
+from qgis.core import Qgis, QgsApplication, QgsTask, QgsPointXY, QgsFeature, QgsGeometry, NULL
 
 from functools import partial
 
 import os
 import math
+from array import array
 import json
 import codecs
 
-from . import sgmdxfparser
+from .sgmdxfparser import DXFParseCanceled
+from .sgmdxfparser.cache import DrawingCache
+from .sgmdxfparser.entitysection import EntityIndex
 from .global_vars import * 
 from .global_fnc import *
 
@@ -47,7 +50,8 @@ class ImportDxf2Rfu:
                  selected_ellips_acronym=None,
                  typo_nature_som=[],
                  typo_nature_lim=[],
-                 tol_spt=0.0):
+                 tol_spt=0.0,
+                 work_zone=None):
         
         self.iface = iface
         self.canvas = canvas
@@ -60,8 +64,14 @@ class ImportDxf2Rfu:
         self.typo_nature_som = typo_nature_som
         self.typo_nature_lim = typo_nature_lim
         self.tol_spt = tol_spt
+        # Limit area of the download in WGS84 (QgsRectangle), None if no download
+        self.work_zone = work_zone
         self.cc = selected_ellips_acronym
         self.edge = None
+        # Parsed DXF files are cached, a file imported again is not parsed again
+        self.dwg_cache = DrawingCache(
+                    os.path.join(QgsApplication.qgisSettingsDirPath(), dxf_cache_dir),
+                    dxf_cache_max_size)
         
     # Import DXF file
     def import_file(self):
@@ -80,13 +90,31 @@ class ImportDxf2Rfu:
                 txt_dxfimp_canc)
             return None
         else:
-            # Read the DXF file
-            dwg = sgmdxfparser.readfile(dwg_file)
-            self.dwg_lyrs = dwg.layers
-            self.dwg_blocks = dwg.blocks
-            self.dwg_ents = list(dwg.modelspace())
+            # Probe the DXF file in a QGIS task (progress bar, can be canceled):
+            # layers, blocks and number of entities by layer
+            # (no entity is built, the entities are streamed once the parameters are chosen)
+            self.dwg_file = dwg_file
+            self.probe_task = QgsTask.fromFunction(tl_dxf_probe, self.probe_dxf, dwg_file, on_finished=self.dxf_probed)
+            QgsApplication.taskManager().addTask(self.probe_task)
+    
+    # Probe the DXF file (run by the QGIS task)
+    def probe_dxf(self, task, dwg_file):
+        def progress(size, total):
+            if total:
+                task.setProgress(100.0 * size / total)
+        return self.dwg_cache.probe(dwg_file, {"progress": progress, "cancel": task.isCanceled})
+    
+    # Show the parameters window once the DXF file is probed
+    def dxf_probed(self, exception, dwg_probe=None):
+        self.probe_task = None
+        if exception is not None:
+            self.dxf_error(exception, txt_dxfprobe_canc)
+            return None
+        else:
+            self.dwg_lyrs = dwg_probe.layers
+            self.dwg_blocks = dwg_probe.blocks
             # Prepare the parameters window
-            self.nw_param_dxf2rfu = ParamDxf2Rfu(self.dwg_lyrs, self.dwg_blocks, self.typo_nature_som, self.typo_nature_lim, self.precision_class, self.auth_creator, self.user)
+            self.nw_param_dxf2rfu = ParamDxf2Rfu(self.dwg_lyrs, self.dwg_blocks, self.typo_nature_som, self.typo_nature_lim, self.precision_class, self.auth_creator, self.user, dwg_probe)
             # Capture the dic of parameters when closing the dlg window
             self.nw_param_dxf2rfu.send_nw_params.connect(self.dxf_ok_param) 
             # Modal window
@@ -94,12 +122,72 @@ class ImportDxf2Rfu:
             # Show the parameters window
             self.nw_param_dxf2rfu.show()
     
+    # Show the message of a DXF file which could not be read (canceled or invalid file)
+    # The exceptions raised in the on_finished function of a QGIS task are not shown
+    def dxf_error(self, exception, txt_canc):
+        if isinstance(exception, DXFParseCanceled):
+            QMessageBox.information(self.iface.mainWindow(), 
+                tl_imp_canc, 
+                txt_canc)
+        else:
+            QMessageBox.warning(self.iface.mainWindow(), 
+                tl_imp_canc, 
+                txt_dxf_err.format(exception))
+    
     def dxf_ok_param1(self, dic_param):   
         return None
     
-    # Launch the process of creation once the param window is validated
+    # Launch the parse of the entities once the param window is validated
     def dxf_ok_param(self, dic_param):
         self.nw_params = dic_param
+        # Stream the entities used by the import (chosen layers only) from the DXF file
+        imp_lyrs = [self.nw_params["vtx_lyr"]] + [self.nw_params["lim_lyrs"][lim_type] 
+                                                    for lim_type in self.nw_params.get("lim_lyrs", {})]
+        # The entities far from the work zone are not built
+        # The vertices and limits drawn in (nested) blocks are imported in world coordinates if chosen
+        flatten_blk = self.nw_params.get("flatten_blk") == 'True'
+        dwg_opts = {"layer_filter": imp_lyrs, "dxftype_filter": dxf_imp_types, "flatten_blocks": flatten_blk}
+        # The work zone is computed in the current CRS (the CC zone may have changed since the download)
+        work_zone = work_zone_extent(self.work_zone, self.canvas, self.project)
+        if work_zone:
+            dwg_opts["extent"] = (work_zone.xMinimum(), work_zone.yMinimum(),
+                                  work_zone.xMaximum(), work_zone.yMaximum())
+            dwg_opts["extent_margin"] = dxf_extent_margin
+        # Parse the entities in a QGIS task (progress bar, can be canceled)
+        self.parse_task = QgsTask.fromFunction(tl_dxf_parse, self.parse_dxf, self.dwg_file, dwg_opts, 
+                                                on_finished=self.dxf_parsed)
+        QgsApplication.taskManager().addTask(self.parse_task)
+    
+    # Parse the entities of the DXF file (run by the QGIS task)
+    def parse_dxf(self, task, dwg_file, dwg_opts):
+        def progress(size, total):
+            if total:
+                task.setProgress(100.0 * size / total)
+        return self.dwg_cache.iterfile(dwg_file, dict(dwg_opts, progress=progress, cancel=task.isCanceled))
+    
+    # Launch the process of creation once the entities are parsed
+    def dxf_parsed(self, exception, dwg_ents=None):
+        self.parse_task = None
+        if exception is not None:
+            self.dxf_error(exception, txt_dxfparse_canc)
+            return None
+        # on_finished gets no result if the parse returns an empty list
+        self.dwg_ents = dwg_ents or []
+        if not self.dwg_ents:
+            QMessageBox.information(self.iface.mainWindow(), 
+                tl_imp_canc, 
+                txt_dxf_noent)
+            return None
+        # The exceptions raised in the on_finished function of a QGIS task are not shown
+        try:
+            self.create_rfu_objs()
+        except Exception as error:
+            QMessageBox.warning(self.iface.mainWindow(), 
+                tl_imp_canc, 
+                txt_dxf_create_err.format(error))
+    
+    # Create the vertices and the limits from the entities of the DXF file
+    def create_rfu_objs(self):
         idx_prec = 1
         # Find the creator
         if "createur" in self.nw_params:
@@ -127,110 +215,144 @@ class ImportDxf2Rfu:
             for k in list(self.nw_params["lim_lyrs"].keys()):
                 lim_lst.append(k)
         
+        # Index of the entities by layer and type, and of the INSERT entities by block name
+        dwg_index = EntityIndex(self.dwg_ents)
+        
         # Transformations to obtain the WGS84 or the CC coordinates
         coords_tr_wgs, coords_tr_cc = crs_trans_params(self.canvas, self.project)
+        # Transformation of all the points of the entities to WGS84 at once
+        # (the vertices and the ends of the segments are then read from tr_wgs)
+        ents_xys = []
+        for ent in self.dwg_ents:
+            if ent.dxftype == "INSERT":
+                ents_xys.append((float(ent.insert[0]), float(ent.insert[1])))
+            elif ent.dxftype == "LINE":
+                ents_xys.append((ent.start[0], ent.start[1]))
+                ents_xys.append((ent.end[0], ent.end[1]))
+            elif ent.dxftype == "LWPOLYLINE":
+                ents_xys.extend(zip(ent.coords[0::ent.ndim], ent.coords[1::ent.ndim]))
+        tr_wgs = BatchTransform(coords_tr_wgs, ents_xys)
         
         # Creation of the vertices        
         self.iface.setActiveLayer(self.l_edge)
         self.iface.setActiveLayer(self.l_vertex)    
-        elim_pts = []
-        vtx_blk_ents = [entity for entity in self.dwg_ents if entity.layer == self.nw_params["vtx_lyr"] and entity.dxftype == "INSERT"]
+        # Eliminated points: RFU point to use instead of the new point, by rounded CC coordinates of the new point
+        elim_pts = {}
+        # Conflicts of the import (shown at the end of the import)
+        report = ImportReport(coords_tr_cc)
+        # New vertices, added to the layer at the end of the vertices creation
+        nw_vtx_feats = []
+        # Index of the vertices (RFU and new ones) in CC coordinates for the tolerance check
+        vtx_index = VtxTolIndex(self.original_l_vtx, coords_tr_cc)
         for pt_type in blk_lst:
             if self.nw_params["blk_corrs"][pt_type] == all_blks:
-                vtx_curtypeblks = vtx_blk_ents
+                vtx_curtypeblks = dwg_index.get(self.nw_params["vtx_lyr"], "INSERT")
             else:
-                vtx_curtypeblks = [entity for entity in vtx_blk_ents if entity.name == self.nw_params["blk_corrs"][pt_type]]
+                vtx_curtypeblks = dwg_index.get_inserts(self.nw_params["blk_corrs"][pt_type], self.nw_params["vtx_lyr"])
             for blk in vtx_curtypeblks:
                 blk_pt = blk.insert
                 nw_pt = QgsPointXY(float(blk_pt[0]), float(blk_pt[1]))
-                nw_pt_wgs = coords_tr_wgs.transform(nw_pt)
+                nw_pt_wgs = tr_wgs.transform(nw_pt)
                 # Check if the new vertex is in the tolerance of an existing vertex in the RFU
                 to_create = True
                 id_ptintol = NULL
-                for vtx_feat in self.original_l_vtx.getFeatures():
-                    vtx_feat_g = vtx_feat.geometry()
-                    vtx_tol = vtx_feat['som_tolerance']
-                    if vtx_feat_g.type() == QgsWkbTypes.PointGeometry:
-                        vtx_feat_pt = vtx_feat_g.asPoint()
-                        vtx_feat_pt_cc = coords_tr_cc.transform(vtx_feat_pt)
-                        # if find_near(vtx_feat_pt_cc, nw_pt, self.tol_spt):
-                        pt_in_tol = find_near(vtx_feat_pt_cc, nw_pt, vtx_tol)
-                        if pt_in_tol[0]:
-                            # Case of existing RFU point in the tolerance distance
-                            if vtx_feat['@id_noeud']:
-                                id_ptintol = vtx_feat['@id_noeud']
-                                if pt_in_tol[1] > 0:
-                                    m_box = mbox_w_params(tl_pt_exst_rfu, txt_pt_exst_rfu, 
-                                                            inftxt_pt_exst_rfu.format(nw_pt.x(), nw_pt.y(),
-                                                            float(vtx_tol), id_ptintol))
-                                # Case of strictly identical point
-                                else:
-                                    elim_dbpt = []
-                                    elim_dbpt.append(nw_pt)
-                                    elim_dbpt.append(vtx_feat_pt_cc)
-                                    elim_pts.append(elim_dbpt)
-                                    to_create = False
-                                    m_box = mbox_w_params(tl_ptrfu_dbl, txt_ptrfu_dbl, 
-                                                            inftxt_ptrfu_dbl.format(nw_pt.x(), nw_pt.y(), id_ptintol))
-                            # Case of double point in the file imported
-                            else:
-                                m_box = mbox_w_params(tl_pt_dbl, txt_pt_dbl,
-                                                        inftxt_pt_dbl.format(nw_pt.x(), nw_pt.y()))
-                                # Add the list of new point eliminated and corresponding point 
-                                # in the RFU to the list of eliminated points 
-                                # (list of 2 point lists)
-                                elim_dbpt = []
-                                elim_dbpt.append(nw_pt)
-                                elim_dbpt.append(vtx_feat_pt_cc)
-                                elim_pts.append(elim_dbpt)
-                                to_create = False
-                            m_box.exec_()
+                for vtx_feat_pt_cc, vtx_tol, vtx_id, vtx_dist in vtx_index.find_near(nw_pt):
+                    # Case of existing RFU point in the tolerance distance
+                    if vtx_id:
+                        id_ptintol = vtx_id
+                        if vtx_dist > 0:
+                            conflict = (tl_pt_exst_rfu, txt_pt_exst_rfu, 
+                                                    inftxt_pt_exst_rfu.format(nw_pt.x(), nw_pt.y(),
+                                                    float(vtx_tol), id_ptintol))
+                        # Case of strictly identical point
+                        else:
+                            add_elim_pt(elim_pts, nw_pt, vtx_feat_pt_cc)
+                            to_create = False
+                            conflict = (tl_ptrfu_dbl, txt_ptrfu_dbl, 
+                                                    inftxt_ptrfu_dbl.format(nw_pt.x(), nw_pt.y(), id_ptintol))
+                    # Case of double point in the file imported
+                    else:
+                        conflict = (tl_pt_dbl, txt_pt_dbl,
+                                                inftxt_pt_dbl.format(nw_pt.x(), nw_pt.y()))
+                        # Add the new point eliminated and corresponding point 
+                        # in the RFU to the eliminated points
+                        add_elim_pt(elim_pts, nw_pt, vtx_feat_pt_cc)
+                        to_create = False
+                    report_conflict(report, conflict, QgsGeometry.fromPointXY(nw_pt_wgs), vtx_id)
                 # Creation of the RFU objects in the layers
                 if to_create:
-                    create_nw_feat( self.l_vertex, 
+                    nw_vtx_feats.append(build_nw_feat( self.l_vertex, 
                                     QgsGeometry.fromPointXY(nw_pt_wgs), 
                                     [NULL, NULL, ge_createur, delim_pub, pt_type, pt_type, idx_prec, float("{0:.02f}".format(nw_pt.x())), float("{0:.02f}".format(nw_pt.y())), self.cc, 0.0, "false", id_ptintol]
-                                    )
+                                    ))
+                    # The new vertex is in the tolerance check of the next ones
+                    vtx_index.add(nw_pt, 0.0)
+        
+        # Add the new vertices to the layer (one undo step)
+        add_nw_feats(self.l_vertex, nw_vtx_feats, imp_dxf_editcmd)
         
         # Creation of the limits
         self.iface.setActiveLayer(self.l_vertex)
         self.iface.setActiveLayer(self.l_edge)
+        # Keys of the segments already processed (segments drawn twice in the DXF file are removed
+        # before the check of the intersections)
+        seg_keys = set()
+        nb_dup_segs = 0
+        # Index of the limits (RFU and new ones) for the check of the intersections
+        edge_index = EdgeIndex(self.original_l_edge)
+        # New limits, added to the layer at the end of the limits creation
+        nw_lim_feats = []
         for lim_type in lim_lst:            
-            edge_ents = [entity for entity in self.dwg_ents if entity.layer == self.nw_params["lim_lyrs"][lim_type] and \
-                            (entity.dxftype == "LWPOLYLINE" or entity.dxftype == "LINE")]
+            edge_ents = dwg_index.query(self.nw_params["lim_lyrs"][lim_type], ("LWPOLYLINE", "LINE"))
             for lwp_ent in edge_ents:
-                lwp_ent_pts = []
+                # x and y coordinates of the vertices (read from the flat coordinates array of the LWPOLYLINE)
                 if lwp_ent.dxftype == "LWPOLYLINE":
-                    lwp_ent_pts = lwp_ent.points
-                    if lwp_ent.is_closed:
-                        lwp_ent_pts.append(lwp_ent_pts[0])
+                    lwp_ent_xs = lwp_ent.coords[0::lwp_ent.ndim]
+                    lwp_ent_ys = lwp_ent.coords[1::lwp_ent.ndim]
+                    if lwp_ent.is_closed and len(lwp_ent_xs) > 0:
+                        lwp_ent_xs.append(lwp_ent_xs[0])
+                        lwp_ent_ys.append(lwp_ent_ys[0])
                 if lwp_ent.dxftype == "LINE":
-                    lwp_ent_pts.append(lwp_ent.start)
-                    lwp_ent_pts.append(lwp_ent.end)
-                for idpt, lwp_pt in enumerate(lwp_ent_pts):
-                    if idpt < (len(lwp_ent_pts) - 1):
-                        start_pt_cc = QgsPointXY(float(lwp_pt[0]), float(lwp_pt[1]))
-                        end_pt_cc = QgsPointXY(float(lwp_ent_pts[idpt + 1][0]), float(lwp_ent_pts[idpt + 1][1]))
-                        # Creation only if no double point
-                        if check_no_dblpt(start_pt_cc, end_pt_cc):
-                            # Check if the point is an eliminated point
-                            # If yes, use the corresponding RFU point instead
-                            for elim_pt in elim_pts:
-                                if start_pt_cc == elim_pt[0]:
-                                    start_pt_cc = elim_pt[1]
-                                if end_pt_cc == elim_pt[0]:
-                                    end_pt_cc = elim_pt[1]
-                            start_pt = coords_tr_wgs.transform(start_pt_cc)
-                            end_pt = coords_tr_wgs.transform(end_pt_cc)
-                            # Creation of the new RFU objects in the layers
-                            # Create line geometry
-                            line = QgsGeometry.fromPolylineXY([start_pt, end_pt])
-                            # Check if the lines intersects
-                            to_create = check_limit_cross(line, self.original_l_edge, ge_createur, delim_pub, lim_type, self.canvas, True)
-                            # Creation of the RFU objects in the layer
-                            if to_create:
-                                # Create the feature
-                                create_nw_feat(self.l_edge, line, [NULL, NULL, ge_createur, delim_pub, lim_type])
+                    lwp_ent_xs = array('d', (lwp_ent.start[0], lwp_ent.end[0]))
+                    lwp_ent_ys = array('d', (lwp_ent.start[1], lwp_ent.end[1]))
+                # Segments between consecutive vertices
+                for start_x, start_y, end_x, end_y in zip(lwp_ent_xs, lwp_ent_ys, lwp_ent_xs[1:], lwp_ent_ys[1:]):
+                    start_pt_cc = QgsPointXY(start_x, start_y)
+                    end_pt_cc = QgsPointXY(end_x, end_y)
+                    # Creation only if no double point
+                    if check_no_dblpt(start_pt_cc, end_pt_cc):
+                        # Check if the point is an eliminated point
+                        # If yes, use the corresponding RFU point instead
+                        start_pt_cc = replace_elim_pt(elim_pts, start_pt_cc)
+                        end_pt_cc = replace_elim_pt(elim_pts, end_pt_cc)
+                        # Check if the segment is a duplicate (same points, in any direction)
+                        seg_key = segment_key(start_pt_cc, end_pt_cc, dxf_dup_seg_digit)
+                        if seg_key in seg_keys:
+                            nb_dup_segs += 1
+                            continue
+                        seg_keys.add(seg_key)
+                        start_pt = tr_wgs.transform(start_pt_cc)
+                        end_pt = tr_wgs.transform(end_pt_cc)
+                        # Creation of the new RFU objects in the layers
+                        # Create line geometry
+                        line = QgsGeometry.fromPolylineXY([start_pt, end_pt])
+                        # Check if the lines intersects
+                        to_create = check_limit_cross(line, self.original_l_edge, ge_createur, delim_pub, lim_type, self.canvas, True, edge_index, report)
+                        # Creation of the RFU objects in the layer
+                        if to_create:
+                            # Create the feature
+                            nw_lim = build_nw_feat(self.l_edge, line, [NULL, NULL, ge_createur, delim_pub, lim_type])
+                            edge_index.add(nw_lim)
+                            nw_lim_feats.append(nw_lim)
+        # Number of duplicate segments removed
+        if nb_dup_segs > 0:
+            self.iface.messageBar().pushMessage(
+                dxf_dup_seg_txt[0], dxf_dup_seg_txt[1].format(nb_dup_segs),
+                Qgis.Info, duration=10)
+        # Add the new limits to the layer (one undo step)
+        add_nw_feats(self.l_edge, nw_lim_feats, imp_dxf_editcmd)
+        # Summary of the conflicts of the import
+        report.show()
         # Refresh the canvas
         self.canvas.refresh()
 
@@ -239,7 +361,7 @@ class ParamDxf2Rfu(QWidget, gui_dlg_dxf2rfu):
 
     send_nw_params = pyqtSignal(dict)
     
-    def __init__(self, dwg_lyrs, dwg_blocks, typo_nature_som, typo_nature_lim, precision_class, auth_creator, user, parent=None):
+    def __init__(self, dwg_lyrs, dwg_blocks, typo_nature_som, typo_nature_lim, precision_class, auth_creator, user, dwg_probe=None, parent=None):
 
         super(ParamDxf2Rfu, self).__init__(parent)
         self.setupUi(self)
@@ -259,12 +381,16 @@ class ParamDxf2Rfu(QWidget, gui_dlg_dxf2rfu):
             self.old_params = self.json_params[r"dxfparams"]
         # Manage delim_pub_chk text
         self.delim_pub_chk.stateChanged.connect(self.settext_delim_pub_chk)
+        # Manage flatten_blk_chk text
+        self.flatten_blk_chk.stateChanged.connect(self.settext_flatten_blk_chk)
         # Create sorted list of the names of dwg layers
         self.dwg_lyrs = dwg_lyrs
         lyr_names = []
         for lyr in self.dwg_lyrs:
             lyr_names.append(str(lyr.name))
         lyr_names.sort()
+        # Number of entities by layer (shown in the tooltips of the layers)
+        self.dwg_probe = dwg_probe
         # Create sorted list of the names of blocks
         self.dwg_blocks = dwg_blocks
         blk_names = []
@@ -284,6 +410,9 @@ class ParamDxf2Rfu(QWidget, gui_dlg_dxf2rfu):
                 self.delim_pub_chk.setChecked(True)
             else:
                 self.delim_pub_chk.setChecked(False)
+        # Fill the flatten_blk checkbox (the blocks are not flattened by default)
+        if "flatten_blk" in self.old_params:
+            self.flatten_blk_chk.setChecked(self.old_params["flatten_blk"] == 'True')
         # Populate createur list
         creat_param = False
         for i, e in enumerate(self.auth_creator):
@@ -330,6 +459,7 @@ class ParamDxf2Rfu(QWidget, gui_dlg_dxf2rfu):
             self.vtx_lyr_cmb.addItem(lyr_name)
 
         self.vtx_lyr_cmb.setCurrentIndex(vtx_curidx)
+        self.set_lyr_tips(self.vtx_lyr_cmb, lyr_names)
 
         # Populate the different types of points
         for idx, pt_type in enumerate (self.typo_nature_som):
@@ -439,18 +569,36 @@ class ParamDxf2Rfu(QWidget, gui_dlg_dxf2rfu):
             for lyr_name in lyr_names:
                 self.cur_cmb.addItem(lyr_name)
             self.cur_cmb.setCurrentIndex(lyr_cur_idx)
+            self.set_lyr_tips(self.cur_cmb, lyr_names)
                        
         sp_item2 = QSpacerItem(20, 40, QSizePolicy.Minimum, QSizePolicy.Expanding)
         self.lim_grid_lay.addItem(sp_item2, (idx + 1), 0, 1, 1)
         # Adapt the size of the dlg
         self.lim_type_gpb.setMinimumSize(QSize(470, 56+29*(idx+1)))
         
+    # Show the number of entities imported from each layer in the tooltip of its item
+    def set_lyr_tips(self, combo, lyr_names):
+        if self.dwg_probe is None:
+            return
+        for idx in range(combo.count()):
+            lyr_name = combo.itemText(idx)
+            if lyr_name in lyr_names:
+                counts = self.dwg_probe.layer_counts(lyr_name)
+                combo.setItemData(idx, lyr_counts_tip.format(counts.get("INSERT", 0), counts.get("LINE", 0), counts.get("LWPOLYLINE", 0)), Qt.ToolTipRole)
+        
     # Change the text of the delim_pub checkbox
     def settext_delim_pub_chk(self):
         if self.delim_pub_chk.isChecked():
             self.delim_pub_chk.setText('oui')
         else:
             self.delim_pub_chk.setText('non')
+
+    # Change the text of the flatten_blk checkbox
+    def settext_flatten_blk_chk(self):
+        if self.flatten_blk_chk.isChecked():
+            self.flatten_blk_chk.setText('oui')
+        else:
+            self.flatten_blk_chk.setText('non')
         
     # Manage the background color of comboboxes
     # (depends on the color of the current item)
@@ -504,6 +652,7 @@ class ParamDxf2Rfu(QWidget, gui_dlg_dxf2rfu):
             self.param_dxf["prec_class"] = self.precision_class_cmb.currentText()
             # Transform the delim_pub checkbox into the correct value
             self.param_dxf["delim_pub"] = chkbox_to_truefalse(self.delim_pub_chk)
+            self.param_dxf["flatten_blk"] = chkbox_to_truefalse(self.flatten_blk_chk)
             blk_def = {}
             for idx, pt_type in enumerate(self.typo_nature_som):
                 type_cmb = self.findChild(QComboBox, "symb_corr_cmb" + str(idx))
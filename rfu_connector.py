@@ -81,6 +81,8 @@ class RFUDockWidget(QDockWidget, gui_dckwdgt_rfu_connector):
         self.url_rfu = self.config.base_url_rfu
         self.url = None
         self.refdoss_cmt = None
+        # Limit area of the download (WGS84), None before the download
+        self.limit_area = None
 
         self.l_vertex = None
         self.l_edge = None
@@ -554,6 +556,7 @@ class RFUDockWidget(QDockWidget, gui_dckwdgt_rfu_connector):
         self.l_vertex = None
         self.l_edge = None
         self.layers = [self.l_vertex, self.l_edge]
+        self.limit_area = None
         self.edges_added = {}
         self.vertices_added = {}
         self.edges_removed = {}
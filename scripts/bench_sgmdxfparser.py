@@ -0,0 +1,665 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""Benchmarks of the sgmdxfparser DXF reader.
+
+Usage:
+    python scripts/bench_sgmdxfparser.py tagger FILE.dxf [FILE.dxf ...]
+    python scripts/bench_sgmdxfparser.py memory FILE.dxf [FILE.dxf ...]
+    python scripts/bench_sgmdxfparser.py binary FILE.dxf [FILE.dxf ...]
+    python scripts/bench_sgmdxfparser.py cast FILE.dxf [FILE.dxf ...]
+    python scripts/bench_sgmdxfparser.py generate FILE.dxf [FILE.dxf ...]
+    python scripts/bench_sgmdxfparser.py suite RESULTS.json
+    python scripts/bench_sgmdxfparser.py compare OLD.json NEW.json
+
+tagger: throughput (MB/s) of sgmdxfparser.tags.stream_tagger compared to the
+        reference line by line tokenizer (two readline() calls per tag).
+memory: memory held by the entities of a drawing, in bytes per entity and per
+        dxftype (allocations made in sgmdxfparser.dxfentities, as seen by
+        tracemalloc).
+binary: sgmdxfparser.readfile time of an ASCII DXF file and of the same
+        drawing converted to binary DXF (written next to the ASCII file as
+        FILE.bin.dxf).
+cast:   time spent casting the values of the tags of a file (points excepted)
+        with the dense cast table (list of the casters indexed by group code)
+        compared to the reference dict of the casters by group code: in the
+        tagger loop (caster cached with the group code) and by
+        sgmdxfparser.tags.cast_tag_value.
+generate: writes a synthetic DXF file (see write_synthetic_dxf) of
+        --flavour R12 or R2013 with --inserts INSERT entities on the vertex
+        layer, --limits LWPOLYLINE (POLYLINE in R12) and LINE entities on the
+        limit layers and --noise entities on the noise layer.
+suite:  generates the synthetic DXF files of both flavours (or --flavour) in
+        --directory (a temporary directory by default) and measures the wall
+        time, the peak of memory (tracemalloc) and the entities per second of
+        sgmdxfparser.readfile, of sgmdxfparser.iterfile (modelspace) and of
+        the entity filtering of the DXF import (iterfile with the layer and
+        dxftype filters, then EntityIndex). The results are written to
+        RESULTS.json, --label names the parser version measured.
+compare: prints the ratio of the timings and memory peaks of NEW.json to the
+        ones of OLD.json, both written by suite.
+"""
+
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from optparse import OptionParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import sgmdxfparser  # noqa: E402
+from sgmdxfparser.tags import (DXFTag, POINT_CODES, DXFStructureError, cast_tag, stream_tagger, dxfinfo,  # noqa: E402
+                               TYPES, MAX_GROUP_CODE, tostr, point_tuple, cast_table, cast_tag_value,
+                               BINARY_DXF_SENTINEL, BIN_STR, BIN_DOUBLE, BIN_INT16, BIN_INT32, BIN_INT64, BIN_BOOL,
+                               binary_value_types)
+from sgmdxfparser.entitysection import EntityIndex  # noqa: E402
+
+# synthetic drawings
+VERTEX_LAYER = 'VTX'
+LIMIT_LAYERS = ('LIM', 'LIM2')
+NOISE_LAYER = 'NOISE'
+VERTEX_BLOCK = 'SOM'
+IMPORT_TYPES = ('INSERT', 'LINE', 'LWPOLYLINE')  # global_vars.dxf_imp_types
+FLAVOURS = {'R12': 'AC1009', 'R2013': 'AC1027'}
+ORIGIN = (650000.0, 6860000.0)  # Lambert 93
+WIDTH = 5000.0  # meters
+
+
+def readline_tagger(stream, assure_3d_coords=False):
+    """Reference tokenizer: two readline() calls and one DXFTag per group code."""
+    undo_tag = None
+    line = [0]
+
+    def next_tag():
+        code = stream.readline()
+        value = stream.readline()
+        line[0] += 2
+        if code and value:
+            return DXFTag(int(code[:-1]), value[:-1])
+        else:
+            raise EOFError()
+
+    while True:
+        try:
+            if undo_tag is not None:
+                x = undo_tag
+                undo_tag = None
+            else:
+                x = next_tag()
+            code = x.code
+            if code == 999:
+                continue
+            if code in POINT_CODES:
+                y = next_tag()
+                if y.code != code + 10:
+                    raise DXFStructureError("Missing required y coordinate near line: {}.".format(line[0]))
+                z = next_tag()
+                if z.code == code + 20:
+                    point = (float(x.value), float(y.value), float(z.value))
+                else:
+                    point = (float(x.value), float(y.value))
+                    undo_tag = z
+                yield DXFTag(code, point)
+            else:
+                yield cast_tag(x)
+        except EOFError:
+            return
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def count_tags(tagger, filename):
+    with io.open(filename, encoding='cp1252', errors='ignore') as fp:
+        return sum(1 for _ in tagger(fp))
+
+
+def bench_tagger(filenames, repeat):
+    print("{:<40} {:>10} {:>12} {:>12} {:>8}".format("file", "tags", "readline MB/s", "block MB/s", "speedup"))
+    for filename in filenames:
+        size_mb = os.path.getsize(filename) / float(1 << 20)
+        ref_time, ref_count = best_of(lambda: count_tags(readline_tagger, filename), repeat)
+        new_time, new_count = best_of(lambda: count_tags(stream_tagger, filename), repeat)
+        if ref_count != new_count:
+            print("warning: {} tags with readline_tagger, {} with stream_tagger".format(ref_count, new_count))
+        print("{:<40} {:>10} {:>12.1f} {:>12.1f} {:>7.2f}x".format(
+            os.path.basename(filename)[-40:], new_count, size_mb / ref_time, size_mb / new_time, ref_time / new_time))
+
+
+def entities_memory(filename):
+    """Returns the modelspace entities of filename and the bytes allocated by the entity classes."""
+    entities_filter = tracemalloc.Filter(True, os.path.join('*', 'sgmdxfparser', 'dxfentities.py'))
+    tracemalloc.start()
+    try:
+        entities = list(sgmdxfparser.readfile(filename).modelspace())
+        snapshot = tracemalloc.take_snapshot().filter_traces([entities_filter])
+    finally:
+        tracemalloc.stop()
+    return entities, sum(stat.size for stat in snapshot.statistics('filename'))
+
+
+def bench_memory(filenames, repeat):
+    print("{:<40} {:>10} {:>12} {:>10}".format("file / dxftype", "entities", "MB", "B/entity"))
+    for filename in filenames:
+        entities, size = entities_memory(filename)
+        count = len(entities)
+        print("{:<40} {:>10} {:>12.1f} {:>10.0f}".format(
+            os.path.basename(filename)[-40:], count, size / float(1 << 20), size / float(max(count, 1))))
+        for dxftype, type_count in sorted(Counter(entity.dxftype for entity in entities).items()):
+            entity = next(entity for entity in entities if entity.dxftype == dxftype)
+            print("    {:<36} {:>10} {:>12} {:>10}".format(dxftype, type_count, "object B", sizeof_entity(entity)))
+
+
+def sizeof_entity(entity):
+    """Size of the entity object itself, with its __dict__ if it has one (attribute values are not counted)."""
+    size = sys.getsizeof(entity)
+    if hasattr(entity, '__dict__'):
+        size += sys.getsizeof(entity.__dict__)
+    return size
+
+
+def write_binary_dxf(filename, binary_filename):
+    """Converts the ASCII DXF file filename to binary DXF."""
+    with io.open(filename, encoding='cp1252', errors='ignore') as fp:
+        info = dxfinfo(fp)
+    encoding = 'utf-8' if info.version >= 'AC1021' else info.encoding
+    types = binary_value_types()
+    packers = {
+        BIN_DOUBLE: struct.Struct('<d').pack,
+        BIN_INT16: struct.Struct('<h').pack,
+        BIN_INT32: struct.Struct('<i').pack,
+        BIN_INT64: struct.Struct('<q').pack,
+        BIN_BOOL: struct.Struct('<B').pack,
+    }
+    pack_code = struct.Struct('<H' if info.version > 'AC1009' else '<B').pack
+    pack_extended_code = struct.Struct('<BH').pack
+
+    def tag_data(code, value):
+        if info.version > 'AC1009' or code < 255:
+            yield pack_code(code)
+        else:  # DXF R12: extended group code
+            yield pack_extended_code(255, code)
+        value_type = types[code] if code < len(types) else BIN_STR
+        if value_type == BIN_STR:
+            yield value.encode(encoding) + b'\x00'
+        elif value_type in packers:
+            yield packers[value_type](float(value) if value_type == BIN_DOUBLE else int(value))
+        else:  # BIN_CHUNK, hex string
+            chunk = bytes.fromhex(value)
+            yield struct.pack('<B', len(chunk)) + chunk
+
+    with io.open(filename, 'rb') as fp, io.open(binary_filename, 'wb') as out:
+        out.write(BINARY_DXF_SENTINEL)
+        for code, value in stream_tagger(fp):
+            if code in POINT_CODES:
+                for index, coordinate in enumerate(value):
+                    out.write(b''.join(tag_data(code + index * 10, coordinate)))
+            else:
+                out.write(b''.join(tag_data(code, value)))
+
+
+def bench_binary(filenames, repeat):
+    print("{:<40} {:>10} {:>10} {:>10} {:>10} {:>8}".format(
+        "file", "ASCII MB", "binary MB", "ASCII s", "binary s", "speedup"))
+    for filename in filenames:
+        binary_filename = os.path.splitext(filename)[0] + '.bin.dxf'
+        write_binary_dxf(filename, binary_filename)
+        ascii_time, ascii_dwg = best_of(lambda: sgmdxfparser.readfile(filename), repeat)
+        binary_time, binary_dwg = best_of(lambda: sgmdxfparser.readfile(binary_filename), repeat)
+        if len(ascii_dwg.entities) != len(binary_dwg.entities):
+            print("warning: {} entities in the ASCII file, {} in the binary file".format(
+                len(ascii_dwg.entities), len(binary_dwg.entities)))
+        print("{:<40} {:>10.1f} {:>10.1f} {:>10.2f} {:>10.2f} {:>7.2f}x".format(
+            os.path.basename(filename)[-40:], os.path.getsize(filename) / float(1 << 20),
+            os.path.getsize(binary_filename) / float(1 << 20), ascii_time, binary_time, ascii_time / binary_time))
+
+
+DICT_CASTERS = dict((code, caster) for caster, codes in TYPES for code in codes)
+
+
+def raw_tags(filename):
+    """Returns the (raw code, value) tags of a file as read, without the points and the comments."""
+    with io.open(filename, encoding='cp1252', errors='ignore') as fp:
+        lines = fp.read().splitlines()
+    return [(code, value) for code, value in zip(lines[0::2], lines[1::2])
+            if int(code) != 999 and DICT_CASTERS.get(int(code)) is not point_tuple]
+
+
+def dict_cast_all(tags):
+    """Reference cast (previous stream_tagger): group code, then its caster looked up in a dict."""
+    group_codes = dict((raw, int(raw)) for raw in set(raw for raw, _ in tags))
+    for raw, value in tags:
+        code = group_codes[raw]
+        typecaster = DICT_CASTERS.get(code, tostr)
+        if typecaster is not tostr:
+            try:
+                value = typecaster(value)
+            except ValueError:
+                value = int(float(value))
+    return len(tags)
+
+
+def table_cast_all(tags):
+    """Cast of stream_tagger: the caster (dense cast table) is cached with the group code."""
+    casters = cast_table()
+    group_codes = dict((raw, (int(raw), casters[int(raw)] if 0 <= int(raw) <= MAX_GROUP_CODE else tostr))
+                       for raw in set(raw for raw, _ in tags))
+    for raw, value in tags:
+        code, typecaster = group_codes[raw]
+        if typecaster is not tostr:
+            try:
+                value = typecaster(value)
+            except ValueError:
+                value = int(float(value))
+    return len(tags)
+
+
+def value_cast_all(cast_value, tags):
+    for raw, value in tags:
+        cast_value(int(raw), value)
+    return len(tags)
+
+
+def dict_cast_value(code, value):
+    """Reference cast_tag_value (previous TagCaster): the caster is looked up in a dict."""
+    typecaster = DICT_CASTERS.get(code, tostr)
+    try:
+        return typecaster(value)
+    except ValueError:
+        if typecaster is int:  # convert float to int
+            return int(float(value))
+        else:
+            raise
+
+
+def bench_cast(filenames, repeat):
+    print("{:<32} {:>9} {:>9} {:>9} {:>8} {:>9} {:>9} {:>8}".format(
+        "file", "tags", "dict s", "table s", "speedup", "dict s", "table s", "speedup"))
+    print("{:<32} {:>9} {:>27}   {:>27}".format("", "", "tagger cast", "cast_tag_value"))
+    for filename in filenames:
+        tags = raw_tags(filename)
+        ref_time, count = best_of(lambda: dict_cast_all(tags), repeat)
+        new_time, count = best_of(lambda: table_cast_all(tags), repeat)
+        ref_value_time, count = best_of(lambda: value_cast_all(dict_cast_value, tags), repeat)
+        new_value_time, count = best_of(lambda: value_cast_all(cast_tag_value, tags), repeat)
+        print("{:<32} {:>9} {:>9.3f} {:>9.3f} {:>7.2f}x {:>9.3f} {:>9.3f} {:>7.2f}x".format(
+            os.path.basename(filename)[-32:], count, ref_time, new_time, ref_time / new_time,
+            ref_value_time, new_value_time, ref_value_time / new_value_time))
+
+
+class SyntheticWriter(object):
+    """Writes the tags of a synthetic DXF file, with handles and subclass markers for the versions after R12."""
+    def __init__(self, fp, dxfversion):
+        self.fp = fp
+        self.dxfversion = dxfversion
+        self.handles = dxfversion > 'AC1009'
+        self.next_handle = 0x100
+
+    def tag(self, code, value):
+        self.fp.write("{:>3}\n{}\n".format(code, value))
+
+    def point(self, code, point):
+        for index, coordinate in enumerate(point):
+            self.tag(code + index * 10, "{:.3f}".format(coordinate))
+
+    def start(self, dxftype, layer, *subclasses):
+        """Writes the common tags of an entity: type, handle, owner, layer and the subclass markers."""
+        self.tag(0, dxftype)
+        if self.handles:
+            self.tag(5, "{:X}".format(self.next_handle))
+            self.next_handle += 1
+            self.tag(330, "1F")
+            self.tag(100, "AcDbEntity")
+        self.tag(8, layer)
+        if self.handles:
+            for subclass in subclasses:
+                self.tag(100, subclass)
+
+    def section(self, name):
+        self.tag(0, "SECTION")
+        self.tag(2, name)
+
+    def end_section(self):
+        self.tag(0, "ENDSEC")
+
+
+def write_synthetic_dxf(filename, flavour='R2013', inserts=1000, limits=1000, noise=1000, seed=0):
+    """Writes a synthetic DXF file in the drawing conventions of the DXF import.
+
+    inserts INSERT entities of the VERTEX_BLOCK block (with an ATTRIB) on VERTEX_LAYER, limits entities on
+    LIMIT_LAYERS (alternately LWPOLYLINE and LINE, POLYLINE instead of LWPOLYLINE in R12) and noise entities on
+    NOISE_LAYER (HATCH, MTEXT and SPLINE, or TEXT, CIRCLE and ARC in R12 which has none of them). The same seed
+    gives the same drawing.
+    """
+    dxfversion = FLAVOURS[flavour]
+    rnd = random.Random(seed)
+
+    def random_point():
+        return ORIGIN[0] + rnd.uniform(0., WIDTH), ORIGIN[1] + rnd.uniform(0., WIDTH)
+
+    with io.open(filename, 'w', encoding='cp1252', newline='\n') as fp:
+        dxf = SyntheticWriter(fp, dxfversion)
+        dxf.section("HEADER")
+        dxf.tag(9, "$ACADVER")
+        dxf.tag(1, dxfversion)
+        dxf.tag(9, "$DWGCODEPAGE")
+        dxf.tag(3, "ANSI_1252")
+        dxf.end_section()
+
+        dxf.section("TABLES")
+        dxf.tag(0, "TABLE")
+        dxf.tag(2, "LAYER")
+        dxf.tag(70, 5)
+        for color, layer in enumerate(('0', VERTEX_LAYER) + LIMIT_LAYERS + (NOISE_LAYER,)):
+            dxf.tag(0, "LAYER")
+            if dxf.handles:
+                dxf.tag(5, "{:X}".format(0x10 + color))
+                dxf.tag(100, "AcDbSymbolTableRecord")
+                dxf.tag(100, "AcDbLayerTableRecord")
+            dxf.tag(2, layer)
+            dxf.tag(70, 0)
+            dxf.tag(62, color + 1)
+            dxf.tag(6, "CONTINUOUS")
+        dxf.tag(0, "ENDTAB")
+        dxf.end_section()
+
+        dxf.section("BLOCKS")
+        dxf.start("BLOCK", '0', "AcDbBlockBegin")
+        dxf.tag(2, VERTEX_BLOCK)
+        dxf.tag(70, 2)
+        dxf.point(10, (0., 0., 0.))
+        dxf.tag(3, VERTEX_BLOCK)
+        dxf.start("CIRCLE", '0', "AcDbCircle")
+        dxf.point(10, (0., 0., 0.))
+        dxf.tag(40, "0.5")
+        dxf.start("ATTDEF", '0', "AcDbText", "AcDbAttributeDefinition")
+        dxf.point(10, (0.6, 0.6, 0.))
+        dxf.tag(40, "1.0")
+        dxf.tag(1, "")
+        dxf.tag(3, "Numero")
+        dxf.tag(2, "NUM")
+        dxf.tag(70, 0)
+        dxf.start("ENDBLK", '0', "AcDbBlockEnd")
+        dxf.end_section()
+
+        dxf.section("ENTITIES")
+        for index in range(inserts):
+            x, y = random_point()
+            dxf.start("INSERT", VERTEX_LAYER, "AcDbBlockReference")
+            dxf.tag(66, 1)
+            dxf.tag(2, VERTEX_BLOCK)
+            dxf.point(10, (x, y, 0.))
+            dxf.start("ATTRIB", VERTEX_LAYER, "AcDbText")
+            dxf.point(10, (x + 0.6, y + 0.6, 0.))
+            dxf.tag(40, "1.0")
+            dxf.tag(1, "P{}".format(index + 1))
+            if dxf.handles:
+                dxf.tag(100, "AcDbAttribute")
+            dxf.tag(2, "NUM")
+            dxf.tag(70, 0)
+            dxf.start("SEQEND", VERTEX_LAYER)
+
+        for index in range(limits):
+            layer = LIMIT_LAYERS[index % len(LIMIT_LAYERS)]
+            x, y = random_point()
+            points = [(x + rnd.uniform(-50., 50.), y + rnd.uniform(-50., 50.)) for _ in range(rnd.randint(1, 5))]
+            if index % 2:
+                dxf.start("LINE", layer, "AcDbLine")
+                dxf.point(10, (x, y, 0.))
+                dxf.point(11, points[0] + (0.,))
+            elif dxf.handles:
+                dxf.start("LWPOLYLINE", layer, "AcDbPolyline")
+                dxf.tag(90, len(points) + 1)
+                dxf.tag(70, 0)
+                for point in [(x, y)] + points:
+                    dxf.point(10, point)
+            else:
+                dxf.start("POLYLINE", layer)
+                dxf.tag(66, 1)
+                dxf.point(10, (0., 0., 0.))
+                dxf.tag(70, 0)
+                for point in [(x, y)] + points:
+                    dxf.start("VERTEX", layer)
+                    dxf.point(10, point + (0.,))
+                dxf.start("SEQEND", layer)
+
+        for index in range(noise):
+            x, y = random_point()
+            kind = index % 3
+            if not dxf.handles:
+                if kind == 0:
+                    dxf.start("TEXT", NOISE_LAYER)
+                    dxf.point(10, (x, y, 0.))
+                    dxf.tag(40, "2.5")
+                    dxf.tag(1, "Texte {}".format(index))
+                elif kind == 1:
+                    dxf.start("CIRCLE", NOISE_LAYER)
+                    dxf.point(10, (x, y, 0.))
+                    dxf.tag(40, "{:.3f}".format(rnd.uniform(1., 20.)))
+                else:
+                    dxf.start("ARC", NOISE_LAYER)
+                    dxf.point(10, (x, y, 0.))
+                    dxf.tag(40, "{:.3f}".format(rnd.uniform(1., 20.)))
+                    dxf.tag(50, "0.0")
+                    dxf.tag(51, "{:.3f}".format(rnd.uniform(10., 350.)))
+            elif kind == 0:
+                dxf.start("HATCH", NOISE_LAYER, "AcDbHatch")
+                dxf.point(10, (0., 0., 0.))
+                dxf.point(210, (0., 0., 1.))
+                dxf.tag(2, "SOLID")
+                dxf.tag(70, 1)
+                dxf.tag(71, 0)
+                dxf.tag(91, 1)
+                dxf.tag(92, 2)  # polyline boundary
+                dxf.tag(72, 0)
+                dxf.tag(73, 1)
+                dxf.tag(93, 4)
+                for dx, dy in ((0., 0.), (10., 0.), (10., 10.), (0., 10.)):
+                    dxf.point(10, (x + dx, y + dy))
+                dxf.tag(97, 0)
+                dxf.tag(75, 0)
+                dxf.tag(76, 1)
+                dxf.tag(98, 0)
+            elif kind == 1:
+                dxf.start("MTEXT", NOISE_LAYER, "AcDbMText")
+                dxf.point(10, (x, y, 0.))
+                dxf.tag(40, "2.5")
+                dxf.tag(41, "40.0")
+                dxf.tag(71, 1)
+                dxf.tag(72, 5)
+                dxf.tag(1, "Parcelle {}\\Pnoise".format(index))
+            else:
+                dxf.start("SPLINE", NOISE_LAYER, "AcDbSpline")
+                dxf.point(210, (0., 0., 1.))
+                dxf.tag(70, 8)
+                dxf.tag(71, 3)
+                dxf.tag(72, 8)
+                dxf.tag(73, 4)
+                dxf.tag(74, 0)
+                for knot in (0., 0., 0., 0., 1., 1., 1., 1.):
+                    dxf.tag(40, knot)
+                for step in range(4):
+                    dxf.point(10, (x + step * 5., y + rnd.uniform(-5., 5.), 0.))
+        dxf.end_section()
+        dxf.tag(0, "EOF")
+
+
+def bench_generate(filenames, options):
+    for filename in filenames:
+        write_synthetic_dxf(filename, options.flavour or 'R2013', options.inserts, options.limits, options.noise,
+                            options.seed)
+        print("{:<40} {:>10.1f} MB".format(os.path.basename(filename)[-40:],
+                                           os.path.getsize(filename) / float(1 << 20)))
+
+
+def import_filter(filename):
+    """Filters the entities of filename as the DXF import does, returns the number of entities indexed."""
+    options = {'layer_filter': (VERTEX_LAYER,) + LIMIT_LAYERS, 'dxftype_filter': IMPORT_TYPES,
+               'flatten_blocks': True}
+    return len(EntityIndex(sgmdxfparser.iterfile(filename, options))._entities)
+
+
+SUITE_CASES = (
+    ('readfile', lambda filename: len(sgmdxfparser.readfile(filename).entities)),
+    ('modelspace', lambda filename: sum(1 for _ in sgmdxfparser.iterfile(filename))),
+    ('import_filter', import_filter),
+)
+
+
+def peak_memory(func):
+    """Returns the peak of the memory allocated while func() runs (tracemalloc), in bytes."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(filename, repeat):
+    """Returns {case: {seconds, peak_memory, entities, entities_per_second}} of the SUITE_CASES on filename."""
+    results = {}
+    for name, case in SUITE_CASES:
+        seconds, entities = best_of(lambda: case(filename), repeat)
+        results[name] = {
+            'seconds': seconds,
+            'peak_memory': peak_memory(lambda: case(filename)),  # separate run, tracemalloc slows the parser
+            'entities': entities,
+            'entities_per_second': entities / seconds if seconds else None,
+        }
+    return results
+
+
+def bench_suite(filenames, options):
+    directory = options.directory or tempfile.mkdtemp(prefix='bench_sgmdxfparser')
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    flavours = [options.flavour] if options.flavour else sorted(FLAVOURS)
+    report = {
+        'label': options.label or sgmdxfparser.VERSION,
+        'version': sgmdxfparser.VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'date': datetime.now().isoformat(),
+        'repeat': options.repeat,
+        'files': [],
+    }
+    print("{:<12} {:<14} {:>10} {:>10} {:>10} {:>12}".format(
+        "flavour", "case", "entities", "s", "peak MB", "entities/s"))
+    try:
+        for flavour in flavours:
+            filename = os.path.join(directory, 'synthetic_{}.dxf'.format(flavour))
+            write_synthetic_dxf(filename, flavour, options.inserts, options.limits, options.noise, options.seed)
+            results = measure(filename, options.repeat)
+            report['files'].append({
+                'flavour': flavour,
+                'dxfversion': FLAVOURS[flavour],
+                'inserts': options.inserts,
+                'limits': options.limits,
+                'noise': options.noise,
+                'seed': options.seed,
+                'size': os.path.getsize(filename),
+                'results': results,
+            })
+            for name, case in SUITE_CASES:
+                result = results[name]
+                print("{:<12} {:<14} {:>10} {:>10.2f} {:>10.1f} {:>12.0f}".format(
+                    flavour, name, result['entities'], result['seconds'], result['peak_memory'] / float(1 << 20),
+                    result['entities_per_second'] or 0))
+    finally:
+        if not options.directory:
+            shutil.rmtree(directory, ignore_errors=True)
+    with io.open(filenames[0], 'w', encoding='utf-8') as fp:
+        fp.write(json.dumps(report, indent=2, sort_keys=True))
+
+
+def bench_compare(filenames, options):
+    if len(filenames) != 2:
+        print("compare needs OLD.json and NEW.json")
+        return
+    reports = []
+    for filename in filenames:
+        with io.open(filename, encoding='utf-8') as fp:
+            reports.append(json.load(fp))
+    old, new = reports
+    print("{} -> {}".format(old['label'], new['label']))
+    print("{:<12} {:<14} {:>10} {:>10} {:>8} {:>10} {:>10} {:>8}".format(
+        "flavour", "case", "old s", "new s", "ratio", "old MB", "new MB", "ratio"))
+    old_files = dict((entry['flavour'], entry) for entry in old['files'])
+    for entry in new['files']:
+        old_entry = old_files.get(entry['flavour'])
+        if old_entry is None:
+            continue
+        if (old_entry['inserts'], old_entry['limits'], old_entry['noise']) != \
+                (entry['inserts'], entry['limits'], entry['noise']):
+            print("warning: the {} files do not have the same size".format(entry['flavour']))
+        for name, result in sorted(entry['results'].items()):
+            old_result = old_entry['results'].get(name)
+            if old_result is None:
+                continue
+            print("{:<12} {:<14} {:>10.2f} {:>10.2f} {:>7.2f}x {:>10.1f} {:>10.1f} {:>7.2f}x".format(
+                entry['flavour'], name, old_result['seconds'], result['seconds'],
+                result['seconds'] / old_result['seconds'],
+                old_result['peak_memory'] / float(1 << 20), result['peak_memory'] / float(1 << 20),
+                result['peak_memory'] / float(old_result['peak_memory'])))
+
+
+BENCHMARKS = {
+    'tagger': bench_tagger,
+    'memory': bench_memory,
+    'binary': bench_binary,
+    'cast': bench_cast,
+}
+COMMANDS = {  # commands taking all the options
+    'generate': bench_generate,
+    'suite': bench_suite,
+    'compare': bench_compare,
+}
+
+
+def main():
+    parser = OptionParser(usage="%prog {} FILE [FILE ...]".format('|'.join(sorted(set(BENCHMARKS) | set(COMMANDS)))))
+    parser.add_option("-r", "--repeat", dest="repeat", type="int", default=3,
+                      help="Number of runs, the best one is kept [default: %default]")
+    parser.add_option("--flavour", dest="flavour", choices=sorted(FLAVOURS),
+                      help="DXF version of the synthetic files: R12 or R2013 [default: both, R2013 for generate]")
+    parser.add_option("--inserts", dest="inserts", type="int", default=20000,
+                      help="Number of INSERT entities on the vertex layer [default: %default]")
+    parser.add_option("--limits", dest="limits", type="int", default=20000,
+                      help="Number of LWPOLYLINE and LINE entities on the limit layers [default: %default]")
+    parser.add_option("--noise", dest="noise", type="int", default=20000,
+                      help="Number of entities on the noise layer [default: %default]")
+    parser.add_option("--seed", dest="seed", type="int", default=0,
+                      help="Seed of the synthetic drawings [default: %default]")
+    parser.add_option("--directory", dest="directory",
+                      help="Directory of the synthetic files of suite, kept [default: a temporary directory]")
+    parser.add_option("--label", dest="label",
+                      help="Name of the parser version in the results of suite [default: sgmdxfparser.VERSION]")
+    options, args = parser.parse_args()
+    if len(args) < 2 or args[0] not in BENCHMARKS and args[0] not in COMMANDS:
+        parser.print_help()
+        return 1
+    if args[0] in COMMANDS:
+        COMMANDS[args[0]](args[1:], options)
+    else:
+        BENCHMARKS[args[0]](args[1:], options.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -28,23 +28,46 @@ else:  # PYTHON27
 from .const import BYBLOCK, BYLAYER
 
 import io
-from .tags import dxfinfo
+from .tags import dxfinfo, DXFParseCanceled
 from .color import aci_to_true_color
 
 
 def read(stream, options=None):
-    if hasattr(stream, 'readline'):
+    """ Reads a DXF drawing from a text stream or from a binary stream (opened in 'rb' mode). """
+    if hasattr(stream, 'read'):
         from .drawing import Drawing
         return Drawing(stream, options)
     else:
-        raise AttributeError('stream object requires a readline() method.')
+        raise AttributeError('stream object requires a read() method.')
 
 
 def readfile(filename, options=None):
-    try:  # is it ascii code-page encoded?
-        return readfile_as_asc(filename, options)
-    except UnicodeDecodeError:  # try unicode and ignore errors
-        return readfile_as_utf8(filename, options, errors='ignore')
+    """ Reads a DXF file in a single pass, the encoding is found in the HEADER section. """
+    from .drawing import Drawing
+
+    with io.open(filename, 'rb') as fp:
+        dwg = Drawing(fp, options)
+    dwg.filename = filename
+    return dwg
+
+
+def iterfile(filename, options=None):
+    """ Yields the modelspace entities of a DXF file while it is read, without building a Drawing. """
+    from .streaming import iter_modelspace
+
+    with io.open(filename, 'rb') as fp:
+        for entity in iter_modelspace(fp, options):
+            yield entity
+
+
+def probe(filename, options=None):
+    """ Returns the layers, blocks (without their entities) and the counts and bounding boxes of the modelspace
+    entities by (layer, dxftype) of a DXF file, read in a single pass without building the entities.
+    """
+    from .dxfprobe import probe_stream
+
+    with io.open(filename, 'rb') as fp:
+        return probe_stream(fp, options)
 
 
 def readfile_as_utf8(filename, options=None, errors='strict'):
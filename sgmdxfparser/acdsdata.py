@@ -8,7 +8,6 @@
 from __future__ import unicode_literals
 __author__ = "emoro - mozman"
 
-from itertools import islice
 from .tags import TagGroups, DXFStructureError, Tags, binary_encoded_data_to_bytes
 
 
@@ -30,8 +29,8 @@ class AcDsDataSection(object):
         if len(tags) == 3:  # empty entities section
             return
 
-        for group in TagGroups(islice(tags, 2, len(tags)-1)):
-            data_record = AcDsDataRecord(Tags(group))
+        for group in TagGroups(tags[2:-1]):
+            data_record = AcDsDataRecord(group)
             if data_record.dxftype == 'ACDSRECORD':
                 asm_data = data_record.get_section('ASM_Data', None)
                 if asm_data is not None:
@@ -72,7 +71,7 @@ class AcDsDataRecord(object):
         start_index = 2
         while tags[start_index].code != 2:
             start_index += 1
-        self.sections = [Section(tags) for tags in TagGroups(islice(tags, start_index, None), split_code=2)]
+        self.sections = [Section(tags) for tags in TagGroups(tags[start_index:], split_code=2)]
 
     def has_section(self, name):
         return self.get_section(name, default=None) is not None
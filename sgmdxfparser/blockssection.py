@@ -8,8 +8,6 @@
 from __future__ import unicode_literals
 __author__ = "emoro - mozman"
 
-from itertools import islice
-
 from .tags import TagGroups
 from .entitysection import build_entities
 
@@ -23,26 +21,36 @@ class BlocksSection(object):
     @staticmethod
     def from_tags(tags, drawing):
         blocks_section = BlocksSection()
-        if drawing.grab_blocks:
+        if drawing is None or drawing.grab_blocks:
             blocks_section._build(tags)
         return blocks_section
 
     def _build(self, tags):
+        """ Builds the BLOCK entities only, the entities of a block are built on first access. """
         if len(tags) == 3:  # empty block section
             return
         groups = list()
-        for group in TagGroups(islice(tags, 2, len(tags)-1)):
+        for group in TagGroups(tags[2:-1]):
             groups.append(group)
             if group[0].value == 'ENDBLK':
-                entities = build_entities(groups)
-                block = entities[0]
-                block.set_entities(entities[1:-1])
+                block = build_entities(groups[:1])[0]
+                block.set_entities_loader(BlockLoader(groups))
                 self._add(block)
                 groups = list()
 
     def _add(self, block):
         self._blocks[block.name] = block
 
+    def resolve_text_styles(self, text_styles):
+        """ Text styles are resolved when the entities of a block are built. """
+        for block in self._blocks.values():
+            if block.entities_loaded():
+                for entity in block:
+                    if hasattr(entity, 'resolve_text_style'):
+                        entity.resolve_text_style(text_styles)
+            else:
+                block.get_entities_loader().text_styles = text_styles
+
     # start of public interface
     def __len__(self):
         return len(self._blocks)
@@ -58,3 +66,20 @@ class BlocksSection(object):
 
     def get(self, name, default=None):
         return self._blocks.get(name, default)
+
+
+class BlockLoader(object):
+    """ Builds the entities of a block from its tag groups (BLOCK ... ENDBLK). """
+    __slots__ = ('groups', 'text_styles')
+
+    def __init__(self, groups):
+        self.groups = groups
+        self.text_styles = None
+
+    def __call__(self):
+        entities = build_entities(self.groups)[1:-1]
+        if self.text_styles is not None:
+            for entity in entities:
+                if hasattr(entity, 'resolve_text_style'):
+                    entity.resolve_text_style(self.text_styles)
+        return entities
@@ -0,0 +1,137 @@
+﻿# sgmdxfparser - copyright (C) 2017, Etienne MORO
+# and copyright (C) 2012, Manfred Moitzi (mozman)
+# Purpose: on-disk cache of parsed DXF drawings
+# Created: 2026-10-18
+# License: MIT License
+
+from __future__ import unicode_literals
+__author__ = "emoro - mozman"
+
+import hashlib
+import io
+import os
+import pickle
+from functools import partial
+
+from . import readfile, iterfile, probe, VERSION
+
+DEFAULT_MAX_SIZE = 200 << 20  # bytes
+HASH_BLOCK_SIZE = 1 << 20
+ENTRY_EXT = '.pickle'
+CACHE_FORMAT = 2  # increase when the pickled objects change without a new VERSION
+RUN_OPTIONS = ('parallel', 'progress', 'cancel')  # options which do not change the parse result
+
+
+class DrawingCache(object):
+    """ On-disk cache of the drawings (readfile), modelspace entities (iterfile) and probes parsed from DXF files.
+
+    An entry is keyed by the path, size, modification time and content hash of the file, and by the
+    options of the parser: a file changed since it was cached is parsed again. The least recently used
+    entries are removed when the cache directory exceeds max_size bytes.
+    """
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+
+    def readfile(self, filename, options=None):
+        """ Returns the Drawing of filename, see sgmdxfparser.readfile(). """
+        return self._cached('drawing', filename, options, lambda: readfile(filename, options))
+
+    def iterfile(self, filename, options=None):
+        """ Returns the list of the modelspace entities of filename, see sgmdxfparser.iterfile(). """
+        return self._cached('modelspace', filename, options, lambda: list(iterfile(filename, options)))
+
+    def probe(self, filename, options=None):
+        """ Returns the DXFProbe of filename, see sgmdxfparser.probe(). """
+        return self._cached('probe', filename, options, lambda: probe(filename, options))
+
+    def entry_path(self, kind, filename, options=None):
+        key = repr((VERSION, CACHE_FORMAT, kind, file_key(filename), options_key(options)))
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + ENTRY_EXT)
+
+    def clear(self):
+        for path, size, mtime in self._entries():
+            remove(path)
+
+    def _cached(self, kind, filename, options, parse):
+        path = self.entry_path(kind, filename, options)
+        if os.path.exists(path):
+            try:
+                with io.open(path, 'rb') as fp:
+                    value = pickle.load(fp)
+            except Exception:  # corrupted or outdated entry, the file is parsed again
+                remove(path)
+            else:
+                os.utime(path, None)  # recently used
+                return value
+        value = parse()
+        self._store(path, value)
+        return value
+
+    def _store(self, path, value):
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            temp_path = path + '.tmp'
+            with io.open(temp_path, 'wb') as fp:
+                pickle.dump(value, fp, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except EnvironmentError:  # the cache is only an optimization
+            return
+        self.evict()
+
+    def _entries(self):
+        """ Returns the (path, size, mtime) of the cache entries. """
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for name in os.listdir(self.directory):
+            if name.endswith(ENTRY_EXT):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except EnvironmentError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def evict(self):
+        """ Removes the least recently used entries until the cache size is below max_size. """
+        entries = self._entries()
+        total_size = sum(size for path, size, mtime in entries)
+        for path, size, mtime in sorted(entries, key=lambda entry: entry[2]):
+            if total_size <= self.max_size:
+                break
+            remove(path)
+            total_size -= size
+
+
+def file_key(filename):
+    """ Returns (path, size, mtime, sha1 of the content) of filename. """
+    stat = os.stat(filename)
+    digest = hashlib.sha1()
+    with io.open(filename, 'rb') as fp:
+        for block in iter(partial(fp.read, HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return os.path.abspath(filename), stat.st_size, stat.st_mtime, digest.hexdigest()
+
+
+def options_key(options):
+    """ Returns the options which change the parse result as a sorted tuple, filters are sorted too. """
+    if options is None:
+        return None
+    return tuple(sorted((name, option_key(name, value))
+                        for name, value in options.items() if name not in RUN_OPTIONS)) or None
+
+
+def option_key(name, value):
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(sorted(value)) if name.endswith('_filter') else tuple(value)
+    return value
+
+
+def remove(path):
+    try:
+        os.remove(path)
+    except EnvironmentError:
+        pass
@@ -8,12 +8,12 @@
 from __future__ import unicode_literals
 __author__ = "emoro - mozman"
 
-from .tags import Tags, DXFTag
+from .tags import Tags, TagsView, TagStore, DXFTag
 
 
 class DefaultChunk(object):
     def __init__(self, tags):
-        assert isinstance(tags, Tags)
+        assert isinstance(tags, (Tags, TagsView))
         self.tags = tags
 
     @staticmethod
@@ -26,15 +26,31 @@ class DefaultChunk(object):
 
 
 def iterchunks(tagreader, stoptag='EOF', endofchunk='ENDSEC'):
+    """ Yields the chunks read from tagreader, each chunk is stored in its own TagStore and yielded as a TagsView. """
     while True:
         tag = next(tagreader)
         if tag == DXFTag(0, stoptag):
             return
 
-        tags = Tags([tag])
-        append = tags.append
+        store = TagStore()
+        append = store.append
+        append(tag)
         end_tag = DXFTag(0, endofchunk)
         while tag != end_tag:
             tag = next(tagreader)
             append(tag)
-        yield tags
+        yield store.view()
+
+
+def iterchunk_views(tags, stoptag='EOF', endofchunk='ENDSEC'):
+    """ Yields the chunks of tags (a TagsView) as views of the same store, nothing is copied. """
+    start = None
+    for group in tags.groups():
+        name = group.get_type()
+        if start is None:
+            if name == stoptag:
+                return
+            start = group.start
+        if name == endofchunk:
+            yield TagsView(group.store, start, group.start + 1)
+            start = None
@@ -7,13 +7,22 @@
 
 __author__ = "emoro - mozman"
 
-from .tags import stream_tagger
+from .tags import stream_tagger, parse_monitor
 from .sections import Sections
+from .entitysection import EntityIndex
 
 DEFAULT_OPTIONS = {
     "grab_blocks": True,  # import block definitions True=yes, False=No
     "assure_3d_coords": False,  # guarantees (x, y, z) tuples for ALL coordinates
     "resolve_text_styles": True,  # Text, Attrib, Attdef and MText attributes will be set by the associated text style if necessary
+    "layer_filter": None,  # iterable of layer names, only entities on these layers are built, None=all layers
+    "dxftype_filter": None,  # iterable of dxftypes ('INSERT', 'LINE', ...), only these entities are built, None=all types
+    "extent": None,  # (xmin, ymin, xmax, ymax), INSERT, LINE and LWPOLYLINE entities outside are not built, None=no extent
+    "extent_margin": 0.,  # margin added around the extent
+    "flatten_blocks": False,  # iterfile only: INSERT entities are followed by the entities of their blocks in WCS
+    "parallel": False,  # parse the sections of a file opened in 'rb' mode in a process pool, True=all cpus or number of processes
+    "progress": None,  # progress(size, total) called while the file is read, size and total in characters or bytes
+    "cancel": None,  # cancel() called while the file is parsed, True stops the parse with DXFParseCanceled
 }
 
 
@@ -24,12 +33,25 @@ class Drawing(object):
         self.grab_blocks = options.get('grab_blocks', True)
         self.assure_3d_coords = options.get('assure_3d_coords', False)
         self.resolve_text_styles = options.get('resolve_text_styles', True)
+        self.layer_filter = as_filter(options.get('layer_filter'))
+        self.dxftype_filter = as_filter(options.get('dxftype_filter'))
+        self.extent = as_extent(options.get('extent'), options.get('extent_margin', 0.))
+        self.parallel = options.get('parallel', False)
 
-        tagreader = stream_tagger(stream, self.assure_3d_coords)
         self.dxfversion = 'AC1009'
         self.encoding = 'cp1252'
         self.filename = None
-        sections = Sections(tagreader, self)
+        self._entity_index = None
+        self.monitor = parse_monitor(stream, options)
+        sections = None
+        if self.parallel and self.monitor is None:
+            from .parallel import parallel_sections
+            sections = parallel_sections(stream, self)
+        if sections is None:  # sequential reading
+            progress = None if self.monitor is None else self.monitor.update
+            tagreader = stream_tagger(stream, self.assure_3d_coords, progress=progress)
+            sections = Sections(tagreader, self)
+        self.monitor = None  # callbacks of the caller, not kept
         self.header = sections.header
         self.layers = sections.tables.layers
         self.styles = sections.tables.styles
@@ -45,8 +67,7 @@ class Drawing(object):
 
         if self.resolve_text_styles:
             resolve_text_styles(self.entities, self.styles)
-            for block in self.blocks:
-                resolve_text_styles(block, self.styles)
+            self.blocks.resolve_text_styles(self.styles)
 
     def modelspace(self):
         return (entity for entity in self.entities if not entity.paperspace)
@@ -54,6 +75,12 @@ class Drawing(object):
     def paperspace(self):
         return (entity for entity in self.entities if entity.paperspace)
 
+    def entity_index(self):
+        """ Returns the EntityIndex of the modelspace entities, built on first call. """
+        if self._entity_index is None:
+            self._entity_index = EntityIndex(self.modelspace())
+        return self._entity_index
+
     def collect_sab_data(self):
         for entity in self.entities:
             if hasattr(entity, 'set_sab_data'):
@@ -61,6 +88,17 @@ class Drawing(object):
                 entity.set_sab_data(sab_data)
 
 
+def as_filter(names):
+    return None if names is None else frozenset(names)
+
+
+def as_extent(extent, margin=0.):
+    if extent is None:
+        return None
+    xmin, ymin, xmax, ymax = extent
+    return float(xmin) - margin, float(ymin) - margin, float(xmax) + margin, float(ymax) + margin
+
+
 def resolve_text_styles(entities, text_styles):
     for entity in entities:
         if hasattr(entity, 'resolve_text_style'):
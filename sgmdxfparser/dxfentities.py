@@ -10,6 +10,7 @@ from __future__ import unicode_literals
 __author__ = "emoro - mozman"
 
 import math
+from array import array
 
 from . import const
 from .color import TrueColor
@@ -57,7 +58,18 @@ hvalign_to_attpt = {
     
 
 
+def slot_names(cls):
+    """ Returns the names of the attributes defined by __slots__ in cls and its base classes. """
+    names = []
+    for klass in reversed(cls.__mro__):
+        names.extend(getattr(klass, '__slots__', ()))
+    return names
+
+
 class DXFEntity(object):
+    __slots__ = ('dxftype', 'handle', 'owner', 'paperspace', 'layer', 'linetype', 'thickness', 'extrusion', 'ltscale',
+                 'line_weight', 'invisible', 'color', 'true_color', 'transparency', 'shadow_mode', 'layout_tab_name')
+
     def __init__(self):
         self.dxftype = 'ENTITY'
         self.handle = None
@@ -97,6 +109,8 @@ class DXFEntity(object):
 
 
 class Point(DXFEntity):
+    __slots__ = ('point',)
+
     def __init__(self):
         super(Point, self).__init__()
         self.point = (0, 0, 0)
@@ -111,6 +125,8 @@ class Point(DXFEntity):
 
 
 class Line(DXFEntity):
+    __slots__ = ('start', 'end')
+
     def __init__(self):
         super(Line, self).__init__()
         self.start = (0, 0, 0)
@@ -127,6 +143,8 @@ class Line(DXFEntity):
 
 
 class Circle(DXFEntity):
+    __slots__ = ('center', 'radius')
+
     def __init__(self):
         super(Circle, self).__init__()
         self.center = (0, 0, 0)
@@ -144,6 +162,8 @@ class Circle(DXFEntity):
 
 
 class Arc(Circle):
+    __slots__ = ('start_angle', 'end_angle')
+
     def __init__(self):
         super(Arc, self).__init__()
         self.start_angle = 0.
@@ -163,6 +183,8 @@ TRACE_CODES = frozenset((10, 11, 12, 13))
 
 
 class Trace(DXFEntity):
+    __slots__ = ('points',)
+
     def __init__(self):
         super(Trace, self).__init__()
         self.points = []
@@ -180,6 +202,8 @@ Solid = Trace
 
 
 class Face(Trace):
+    __slots__ = ('invisible_edge',)
+
     def __init__(self):
         super(Face, self).__init__()
         self.points = []
@@ -199,6 +223,9 @@ class Face(Trace):
 
 
 class Text(DXFEntity):
+    __slots__ = ('insert', 'height', 'text', 'rotation', 'oblique', 'style', 'width', 'is_backwards', 'is_upside_down',
+                 'halign', 'valign', 'align_point', 'font', 'big_font', 'attachment_point')
+
     def __init__(self):
         super(Text, self).__init__()
         self.insert = (0., 0.)
@@ -289,6 +316,8 @@ class Text(DXFEntity):
 
 
 class Attrib(Text):
+    __slots__ = ('field_length', 'tag')
+
     def __init__(self):
         super(Attrib, self).__init__()
         self.field_length = 0
@@ -308,6 +337,9 @@ class Attrib(Text):
                 yield code, value
 
 class Insert(DXFEntity):
+    __slots__ = ('name', 'insert', 'insert_z', 'rotation', 'scale', 'scale_x', 'scale_y', 'scale_z', 'row_count',
+                 'row_spacing', 'col_count', 'col_spacing', 'attribsfollow', 'attribs')
+
     def __init__(self):
         super(Insert, self).__init__()
         self.name = ""
@@ -366,12 +398,17 @@ class Insert(DXFEntity):
 
 
 class Polyline(DXFEntity):
+    __slots__ = ('vertices', 'coords', 'ndim', 'control_points', 'width', 'bulge', 'tangents', 'flags', 'mode',
+                 'mcount', 'ncount', 'default_start_width', 'default_end_width', 'is_mclosed', 'is_nclosed',
+                 'is_closed', 'elevation', 'm_smooth_density', 'n_smooth_density', 'smooth_type', 'spline_type')
+
     LINE_TYPES = frozenset(('spline2d', 'polyline2d', 'polyline3d'))
 
     def __init__(self):
         super(Polyline, self).__init__()
         self.vertices = []  # set in append data
-        self.points = []  # set in append data
+        self.coords = array('d')  # set in append data, flat coordinates of the points: x0, y0[, z0], x1, ...
+        self.ndim = 2  # set in append data, number of coordinates per point
         self.control_points = []  # set in append data
         self.width = []  # set in append data
         self.bulge = []  # set in append data
@@ -440,6 +477,10 @@ class Polyline(DXFEntity):
         self.is_closed = self.is_mclosed
         self.set_default_extrusion()
 
+    @property
+    def points(self):
+        return coords_to_points(self.coords, self.ndim)
+
     def __len__(self):
         return len(self.vertices)
 
@@ -459,14 +500,16 @@ class Polyline(DXFEntity):
 
         self.vertices = vertices
         if self.mode in Polyline.LINE_TYPES:
+            points = []
             for vertex in self.vertices:
                 if vertex.flags & const.VTX_SPLINE_FRAME_CONTROL_POINT:
                     self.control_points.append(vertex.location)
                 else:
-                    self.points.append(vertex.location)
+                    points.append(vertex.location)
                     self.width.append(default_width(vertex.start_width, vertex.end_width))
                     self.bulge.append(vertex.bulge)
                     self.tangents.append(vertex.tangent if vertex.flags & const.VTX_CURVE_FIT_TANGENT else None)
+            self.coords, self.ndim = points_to_coords(points)
 
     def cast(self):
         if self.mode == 'polyface':
@@ -478,6 +521,8 @@ class Polyline(DXFEntity):
 
 
 class SubFace(object):
+    __slots__ = ('_vertices', 'face_record')
+
     def __init__(self, face_record, vertices):
         self._vertices = vertices
         self.face_record = face_record
@@ -504,8 +549,9 @@ class SubFace(object):
 class PolyShape(object):
     def __init__(self, polyline, dxftype):
         # copy all dxf attributes from polyline
-        for key, value in polyline.__dict__.items():
-            self.__dict__[key] = value
+        for key in slot_names(type(polyline)):
+            setattr(self, key, getattr(polyline, key))
+        self.points = polyline.points
         self.dxftype = dxftype
 
     def __str__(self):
@@ -557,6 +603,8 @@ class PolyMesh(PolyShape):
 
 
 class Vertex(DXFEntity):
+    __slots__ = ('location', 'flags', 'start_width', 'end_width', 'bulge', 'tangent', 'vtx')
+
     def __init__(self):
         super(Vertex, self).__init__()
         self.location = (0., 0., 0.)
@@ -607,6 +655,8 @@ class Vertex(DXFEntity):
 
 
 class Block(DXFEntity):
+    __slots__ = ('basepoint', 'name', 'description', 'flags', 'xrefpath', '_entities', '_loader')
+
     def __init__(self):
         super(Block, self).__init__()
         self.basepoint = (0, 0, 0)
@@ -615,6 +665,7 @@ class Block(DXFEntity):
         self.flags = 0
         self.xrefpath = ""
         self._entities = []
+        self._loader = None  # builds _entities on first access
 
     def setup_attributes(self, tags):
         for code, value in super(Block, self).setup_attributes(tags):
@@ -645,23 +696,43 @@ class Block(DXFEntity):
 
     def set_entities(self, entities):
         self._entities = entities
+        self._loader = None
+
+    def set_entities_loader(self, loader):
+        """ loader() returns the entities of the block, it is called on first access. """
+        self._entities = None
+        self._loader = loader
+
+    def get_entities_loader(self):
+        return self._loader
+
+    def entities_loaded(self):
+        return self._entities is not None
+
+    def get_entities(self):
+        if self._entities is None:
+            self.set_entities(self._loader())
+        return self._entities
 
     def __iter__(self):
-        return iter(self._entities)
+        return iter(self.get_entities())
 
     def __getitem__(self, item):
-        return self._entities[item]
+        return self.get_entities()[item]
 
     def __len__(self):
-        return len(self._entities)
+        return len(self.get_entities())
 
 
 class LWPolyline(DXFEntity):
+    __slots__ = ('coords', 'ndim', 'widths', 'bulge', 'elevation', 'const_width', 'flags')
+
     def __init__(self):
         super(LWPolyline, self).__init__()
-        self.points = []
-        self.width = []
-        self.bulge = []
+        self.coords = array('d')  # flat coordinates of the points: x0, y0[, z0], x1, ...
+        self.ndim = 2  # number of coordinates per point
+        self.widths = array('d')  # flat start and end widths: start0, end0, start1, ...
+        self.bulge = array('d')
         self.elevation = 0.
         self.const_width = 0.
         self.flags = 0
@@ -669,14 +740,19 @@ class LWPolyline(DXFEntity):
     def setup_attributes(self, tags):
         bulge, start_width, end_width = 0., 0., 0.
         init = True
+        coords = self.coords
+        widths = self.widths
 
         for code, value in super(LWPolyline, self).setup_attributes(tags):
             if code == 10:
-                if not init:
+                if init:
+                    self.ndim = len(value)
+                else:
                     self.bulge.append(bulge)
-                    self.width.append((start_width, end_width))
+                    widths.append(start_width)
+                    widths.append(end_width)
                     bulge, start_width, end_width = 0., 0., 0.
-                self.points.append(value)
+                coords.extend(value)
                 init = False
             elif code == 40:
                 start_width = value
@@ -699,27 +775,32 @@ class LWPolyline(DXFEntity):
 
         # add values for the last point
         self.bulge.append(bulge)
-        self.width.append((start_width, end_width))
+        widths.append(start_width)
+        widths.append(end_width)
 
         if self.const_width != 0.:
-            self.width = []
+            self.widths = array('d')
         # Added by SIGMOE
         # Special case if there is an extrusion vector code
         if self.extrusion:
-            nwpoints = []
-            for pts in self.points:
-                nwpoint = ocs_2_wcs_xy(pts, self.elevation, self.extrusion)
-                nwpoints.append(nwpoint)
-            self.points = []
-            self.points = list(nwpoints)
+            self.coords = ocs_2_wcs_coords(coords, self.ndim, self.elevation, self.extrusion)
+            self.ndim = 2
         self.set_default_extrusion()
 
+    @property
+    def points(self):
+        return coords_to_points(self.coords, self.ndim)
+
+    @property
+    def width(self):
+        return coords_to_points(self.widths, 2)
+
     @property
     def is_closed(self):
         return bool(self.flags & 1)
 
     def __len__(self):
-        return len(self.points)
+        return len(self.coords) // self.ndim
 
     def __getitem__(self, item):
         return self.points[item]
@@ -729,6 +810,8 @@ class LWPolyline(DXFEntity):
 
 
 class Ellipse(DXFEntity):
+    __slots__ = ('center', 'major_axis', 'ratio', 'start_param', 'end_param')
+
     def __init__(self):
         super(Ellipse, self).__init__()
         self.center = (0., 0., 0.)
@@ -755,6 +838,8 @@ class Ellipse(DXFEntity):
 
 
 class Ray(DXFEntity):
+    __slots__ = ('start', 'unit_vector')
+
     def __init__(self):
         super(Ray, self).__init__()
         self.start = (0, 0, 0)
@@ -840,6 +925,9 @@ ONE_CHAR_COMMANDS = "PLlOoKkX"
 
 
 class MText(DXFEntity):
+    __slots__ = ('insert', 'raw_text', 'height', 'rect_width', 'horizontal_width', 'vertical_height', 'line_spacing',
+                 'attachment_point', 'style', 'xdirection', 'font', 'big_font', 'rotation')
+
     def __init__(self):
         super(MText, self).__init__()
         self.insert = (0., 0., 0.)
@@ -954,6 +1042,11 @@ class MText(DXFEntity):
 
 
 class Light(DXFEntity):
+    __slots__ = ('version', 'name', 'light_type', 'status', 'light_color', 'plot_glyph', 'intensity', 'position',
+                 'target', 'attenuation_type', 'use_attenuation_limits', 'attenuation_start_limit',
+                 'attenuation_end_limit', 'hotspot_angle', 'fall_off_angle', 'cast_shadows', 'shadow_type',
+                 'shadow_map_size', 'shadow_softness')
+
     def __init__(self):
         super(Light, self).__init__()
         self.version = 1
@@ -1024,6 +1117,8 @@ class Light(DXFEntity):
 
 
 class Body(DXFEntity):
+    __slots__ = ('version', 'acis')
+
     def __init__(self):
         super(Body, self).__init__()
         # need handle to get SAB data in DXF version AC1027 and later
@@ -1054,6 +1149,8 @@ class Body(DXFEntity):
 
 
 class Surface(Body):
+    __slots__ = ('u_isolines', 'v_isolines')
+
     def __init__(self):
         super(Body, self).__init__()
         self.u_isolines = 0
@@ -1070,6 +1167,8 @@ class Surface(Body):
 
 
 class Mesh(DXFEntity):
+    __slots__ = ('version', 'blend_crease', 'subdivision_levels', 'vertices', 'faces', 'edges', 'edge_crease_list')
+
     def __init__(self):
         super(Mesh, self).__init__()
         self.version = 2
@@ -1146,6 +1245,9 @@ class Mesh(DXFEntity):
 
 
 class Spline(DXFEntity):
+    __slots__ = ('normal_vector', 'flags', 'degree', 'start_tangent', 'end_tangent', 'knots', 'weights', 'tol_knot',
+                 'tol_control_point', 'tol_fit_point', 'control_points', 'fit_points')
+
     def __init__(self):
         super(Spline, self).__init__()
         self.normal_vector = None
@@ -1218,6 +1320,9 @@ class Spline(DXFEntity):
 
 
 class Helix(Spline):
+    __slots__ = ('helix_version', 'axis_base_point', 'start_point', 'axis_vector', 'radius', 'turns', 'turn_height',
+                 'handedness', 'constrain')
+
     def __init__(self):
         super(Helix, self).__init__()
         self.helix_version = (1, 1)
@@ -1265,6 +1370,9 @@ class Helix(Spline):
         
 # Added by SIGMOE
 class Hatch(DXFEntity):
+    __slots__ = ('points', 'bulge', 'circlepath', 'border_type', 'nb_borders', 'hatch_type', 'hatch_angle',
+                 'hatch_scale_spacing')
+
     def __init__(self):
         super(Hatch, self).__init__()
         self.points = []
@@ -1486,6 +1594,23 @@ def entity_factory(tags):
 def cross(u, v):
     return [u[1]*v[2]-u[2]*v[1], u[2]*v[0]-u[0]*v[2], u[0]*v[1]-u[1]*v[0]]
 
+# Unit vector of the direction of vector
+def unit(vector):
+    x, y, z = vector
+    length = math.sqrt(x * x + y * y + z * z)
+    return x / length, y / length, z / length
+
+# Unit vectors of the x, y and z axes of the Object Coordinate System of n_vector
+# (Arbitrary Axis Algorithm, DXF)
+def ocs_axes(n_vector):
+    az = unit(n_vector)
+    if abs(az[0]) < 1/64 and abs(az[1]) < 1/64:
+        ax = unit(cross([0,1,0], az))
+    else:
+        ax = unit(cross([0,0,1], az))
+    ay = unit(cross(az, ax))
+    return ax, ay, az
+
 # Added by SIGMOE
 # Transform a 2D point from Object Coordinate Sytem to WCS
 def ocs_2_wcs_xy(xy_point, elevation, n_vector):
@@ -1493,13 +1618,7 @@ def ocs_2_wcs_xy(xy_point, elevation, n_vector):
     xyz_point = list(xy_point)
     if len(xyz_point) < 3:
         xyz_point.append(elevation)
-    # This is the Arbitrary Axis Algorithm (DXF)
-    if abs(n_vector[0]) < 1/64 and abs(n_vector[1]) < 1/64:
-        ax = cross([0,1,0], n_vector)
-    else:
-        ax = cross([0,0,1], n_vector)
-    ay = cross(n_vector, ax)
-    az = n_vector
+    ax, ay, az = ocs_axes(n_vector)
     xyz = [ xyz_point[0]*ax[0] + xyz_point[1]*ay[0] + xyz_point[2]*az[0],
             xyz_point[0]*ax[1] + xyz_point[1]*ay[1] + xyz_point[2]*az[1],
             xyz_point[0]*ax[2] + xyz_point[1]*ay[2] + xyz_point[2]*az[2]
@@ -1507,6 +1626,42 @@ def ocs_2_wcs_xy(xy_point, elevation, n_vector):
     nwpt = (xyz[0], xyz[1])
     return nwpt
 
+# Transform the flat coordinates of 2D points (x0, y0[, z0], x1, ...) from OCS to WCS
+# The rows of the OCS to WCS matrix are computed once for all the points (the constant
+# elevation is folded into the rows), returns the flat x, y WCS coordinates
+def ocs_2_wcs_coords(coords, ndim, elevation, n_vector):
+    ax, ay, az = ocs_axes(n_vector)
+    (x0, x1, x2), (y0, y1, y2) = (ax[0], ay[0], az[0]), (ax[1], ay[1], az[1])
+    xs = coords[0::ndim]
+    ys = coords[1::ndim]
+    wcs = array('d', bytes(8 * 2 * len(xs)))
+    if ndim > 2:
+        zs = coords[2::ndim]
+        wcs[0::2] = array('d', [x*x0 + y*x1 + z*x2 for x, y, z in zip(xs, ys, zs)])
+        wcs[1::2] = array('d', [x*y0 + y*y1 + z*y2 for x, y, z in zip(xs, ys, zs)])
+    else:
+        x_elev, y_elev = elevation * x2, elevation * y2
+        wcs[0::2] = array('d', [x*x0 + y*x1 + x_elev for x, y in zip(xs, ys)])
+        wcs[1::2] = array('d', [x*y0 + y*y1 + y_elev for x, y in zip(xs, ys)])
+    return wcs
+
+# Flat coordinates array of a list of points, and the number of coordinates per point
+# (points with less coordinates get z = 0.)
+def points_to_coords(points):
+    ndim = max(len(point) for point in points) if points else 2
+    coords = array('d')
+    for point in points:
+        coords.extend(point)
+        if len(point) < ndim:
+            coords.append(0.)
+    return coords, ndim
+
+# List of point tuples from flat coordinates
+def coords_to_points(coords, ndim):
+    if ndim == 2:
+        return list(zip(coords[0::2], coords[1::2]))
+    return list(zip(coords[0::3], coords[1::3], coords[2::3]))
+
 # Added by SIGMOE
 # Calculate the bulge of an arc
 def bulgeFromArc(arcStartAngle, arcEndAngle, counterclockwise):
@@ -1524,10 +1679,9 @@ def polarPointDg(center, radius, angle):
     y = center[1] + abs(radius) * math.sin(math.pi * angle / 180)
     return (x, y)
     
-from qgis.core import QgsMessageLog
-
 # Show the debug messages
 def debugMessage(debugOnOff, msgStr, msgListvar):
     if debugOnOff == 'DEBUG':
+        from qgis.core import QgsMessageLog  # imported here, the parser can be used without QGIS
         msg = msgStr % msgListvar
         QgsMessageLog.logMessage(msg, 'Sgm debug')
@@ -0,0 +1,142 @@
+﻿# sgmdxfparser - copyright (C) 2017, Etienne MORO
+# and copyright (C) 2012, Manfred Moitzi (mozman)
+# Purpose: summary of a DXF drawing read in one pass, without building its entities
+# Created: 2026-10-18
+# License: MIT License
+
+from __future__ import unicode_literals
+__author__ = "emoro - mozman"
+
+from .tags import stream_tagger, parse_monitor, Tags
+from .tablessection import TablesSection
+from .dxfentities import entity_factory
+from .streaming import SECTION, EOF, read_section, skip_section
+
+FOLLOWERS = frozenset(('VERTEX', 'ATTRIB', 'SEQEND'))  # their points belong to the previous POLYLINE or INSERT
+# group codes of the locations of an entity, the other points are directions, vectors or elevations
+LOCATION_CODES = {
+    '3DFACE': (10, 11, 12, 13),
+    'DIMENSION': (10, 11, 13, 14),
+    'HATCH': (10, 11),  # the first point (10) is the elevation point
+    'LINE': (10, 11),
+    'MLINE': (10, 11),
+    'POLYLINE': (),  # (10) is the elevation point, the locations are the points of the VERTEX entities
+    'SOLID': (10, 11, 12, 13),
+    'SPLINE': (10, 11),  # control and fit points
+    'TEXT': (10, 11),
+    'TRACE': (10, 11, 12, 13),
+}
+DEFAULT_LOCATION_CODES = (10, )
+
+
+class DXFProbe(object):
+    """ Layers, blocks and modelspace entity counts of a DXF drawing. """
+    def __init__(self):
+        self.layers = TablesSection().layers
+        self.blocks = []  # BLOCK entities, their entities are not read
+        self.counts = {}  # (layer, dxftype): number of modelspace entities
+        self.bboxes = {}  # (layer, dxftype): [xmin, ymin, xmax, ymax] of the points of these entities
+
+    def layer_counts(self, layer):
+        """ Returns {dxftype: number of modelspace entities} of layer. """
+        return dict((dxftype, count) for (name, dxftype), count in self.counts.items() if name == layer)
+
+    def bbox(self, layers=None, dxftypes=None):
+        """ Returns (xmin, ymin, xmax, ymax) of the entities of layers and dxftypes (None=all), or None. """
+        bbox = None
+        for (layer, dxftype), (xmin, ymin, xmax, ymax) in self.bboxes.items():
+            if (layers is None or layer in layers) and (dxftypes is None or dxftype in dxftypes):
+                if bbox is None:
+                    bbox = [xmin, ymin, xmax, ymax]
+                else:
+                    bbox = [min(bbox[0], xmin), min(bbox[1], ymin), max(bbox[2], xmax), max(bbox[3], ymax)]
+        return None if bbox is None else tuple(bbox)
+
+
+def probe_stream(stream, options=None):
+    """ Returns the DXFProbe of a DXF stream (text or binary), read in one pass.
+
+    Only the progress and cancel options of Drawing are used.
+    """
+    dxf_probe = DXFProbe()
+    monitor = parse_monitor(stream, options or {})
+    tagreader = stream_tagger(stream, progress=None if monitor is None else monitor.update)
+    for tag in tagreader:
+        if tag == EOF:
+            break
+        if tag != SECTION:
+            continue
+        name = next(tagreader).value
+        if name == 'TABLES':
+            dxf_probe.layers = TablesSection.from_tags(read_section(tagreader, name), None).layers
+        elif name == 'BLOCKS':
+            dxf_probe.blocks = list(probe_blocks(tagreader))
+        elif name == 'ENTITIES':
+            probe_entities(tagreader, dxf_probe.counts, dxf_probe.bboxes, None if monitor is None else monitor.check)
+        else:
+            skip_section(tagreader)
+    return dxf_probe
+
+
+def probe_blocks(tagreader):
+    """ Yields the BLOCK entities of the BLOCKS section, the other tags are skipped. """
+    group = None
+    for tag in tagreader:
+        if tag.code == 0:
+            if group is not None:
+                yield entity_factory(group)
+                group = None
+            if tag.value == 'BLOCK':
+                group = Tags([tag])
+            elif tag.value == 'ENDSEC':
+                return
+        elif group is not None:
+            group.append(tag)
+
+
+def probe_entities(tagreader, counts, bboxes, check=None):
+    """ Counts the modelspace entities of the ENTITIES section by (layer, dxftype) and grows their bboxes.
+
+    check() is called before each entity, it stops the probe by raising an exception.
+    """
+    def add(key, points):
+        if not points:
+            return
+        xs = [point[0] for point in points]
+        ys = [point[1] for point in points]
+        bbox = bboxes.get(key)
+        if bbox is None:
+            bboxes[key] = [min(xs), min(ys), max(xs), max(ys)]
+        else:
+            bbox[:] = [min(bbox[0], min(xs)), min(bbox[1], min(ys)), max(bbox[2], max(xs)), max(bbox[3], max(ys))]
+
+    key = None  # (layer, dxftype) of the current entity, None for paperspace entities
+    dxftype = layer = None
+    paperspace = False
+    points = []
+    point_codes = DEFAULT_LOCATION_CODES
+    elevation = False
+    for code, value in tagreader:
+        if code == 0:
+            if dxftype is not None and dxftype not in FOLLOWERS:  # end of an entity
+                key = None if paperspace else (layer, dxftype)
+                if key is not None:
+                    counts[key] = counts.get(key, 0) + 1
+            if key is not None and dxftype != 'ATTRIB':
+                add(key, points)
+            if value == 'ENDSEC':
+                return
+            if check is not None:
+                check()
+            dxftype, layer, paperspace, points = value, '0', False, []
+            point_codes = LOCATION_CODES.get(dxftype, DEFAULT_LOCATION_CODES)
+            elevation = dxftype == 'HATCH'
+        elif code == 8:
+            layer = value
+        elif code == 67:
+            paperspace = value == 1
+        elif code in point_codes:
+            if elevation and code == 10:
+                elevation = False
+            else:
+                points.append(value)
@@ -8,7 +8,8 @@
 from __future__ import unicode_literals
 __author__ = "emoro - mozman"
 
-from itertools import islice
+from collections import defaultdict
+from heapq import merge
 
 from .tags import TagGroups, DXFStructureError
 from .tags import Tags
@@ -24,9 +25,13 @@ class EntitySection(object):
     @classmethod
     def from_tags(cls, tags, drawing):
         entity_section = cls()
-        entity_section._build(tags)
+        entity_section._build(tags, entity_section._group_filter(drawing), drawing.monitor)
         return entity_section
 
+    @staticmethod
+    def _group_filter(drawing):
+        return group_filter(drawing.layer_filter, drawing.dxftype_filter, drawing.extent)
+
     def get_entities(self):
         return self._entities
 
@@ -43,34 +48,158 @@ class EntitySection(object):
 
     # end of public interface
 
-    def _build(self, tags):
+    def _build(self, tags, keep=None, monitor=None):
         if len(tags) == 3:  # empty entities section
             return
-        groups = TagGroups(islice(tags, 2, len(tags)-1))
-        self._entities = build_entities(groups)
+        groups = TagGroups(tags[2:-1])
+        self._entities = build_entities(groups, keep, None if monitor is None else monitor.check)
 
 
 class ObjectsSection(EntitySection):
     name = 'objects'
 
+    @staticmethod
+    def _group_filter(drawing):
+        return None  # objects are never filtered
+
+
+def group_filter(layers=None, dxftypes=None, extent=None):
+    """ Returns a function which tells if a tag group has to be built, or None if all groups are built.
+
+    layers and dxftypes are sets of names, extent is (xmin, ymin, xmax, ymax), None means no restriction.
+    """
+    if layers is None and dxftypes is None and extent is None:
+        return None
+
+    def keep(group):
+        if dxftypes is not None and group[0].value not in dxftypes:
+            return False
+        if layers is not None:
+            layer = '0'  # no layer tag, the entity is on the default layer
+            for tag in group:
+                if tag.code == 8:
+                    layer = tag.value
+                    break
+            if layer not in layers:
+                return False
+        if extent is not None:
+            return in_extent(group, extent)
+        return True
+    return keep
+
+
+# point group codes of the entities filtered by extent
+EXTENT_POINT_CODES = {
+    'INSERT': (10, ),
+    'LINE': (10, 11),
+    'LWPOLYLINE': (10, ),
+}
+
+
+def in_extent(group, extent):
+    """ False if the points of an INSERT, LINE or LWPOLYLINE tag group are all on the same side outside
+    of extent (xmin, ymin, xmax, ymax), True for other entities and for entities in an OCS which is not the WCS.
+    """
+    dxftype = group[0].value
+    point_codes = EXTENT_POINT_CODES.get(dxftype)
+    if point_codes is None:
+        return True
+    xs = []
+    ys = []
+    for code, value in group:
+        if code in point_codes:
+            xs.append(value[0])
+            ys.append(value[1])
+        elif code == 210 and dxftype != 'LINE' and tuple(value) != (0., 0., 1.):
+            return True  # OCS coordinates
+    if not xs:
+        return True
+    xmin, ymin, xmax, ymax = extent
+    return min(xs) <= xmax and max(xs) >= xmin and min(ys) <= ymax and max(ys) >= ymin
+
+
+def entity_filter(layers=None, dxftypes=None, extent=None):
+    """ Returns a function which tells if a built entity is kept, like group_filter, or None if all entities are kept. """
+    if layers is None and dxftypes is None and extent is None:
+        return None
+
+    def keep(entity):
+        if dxftypes is not None and entity.dxftype not in dxftypes:
+            return False
+        if layers is not None and entity.layer not in layers:
+            return False
+        if extent is not None:
+            return entity_in_extent(entity, extent)
+        return True
+    return keep
+
+
+def entity_in_extent(entity, extent):
+    """ Like in_extent, for a built INSERT, LINE or LWPOLYLINE entity. """
+    dxftype = entity.dxftype
+    if dxftype == 'INSERT':
+        if entity.extrusion not in (None, (0., 0., 1.)):
+            return True  # OCS coordinates
+        xs, ys = [entity.insert[0]], [entity.insert[1]]
+    elif dxftype == 'LINE':
+        xs, ys = [entity.start[0], entity.end[0]], [entity.start[1], entity.end[1]]
+    elif dxftype == 'LWPOLYLINE':
+        xs, ys = entity.coords[0::entity.ndim], entity.coords[1::entity.ndim]
+    else:
+        return True
+    if not xs:
+        return True
+    xmin, ymin, xmax, ymax = extent
+    return min(xs) <= xmax and max(xs) >= xmin and min(ys) <= ymax and max(ys) >= ymin
+
 
-def build_entities(tag_groups):
+def has_followers(group):
+    """ True if the entity of this group is followed by VERTEX or ATTRIB entities ended by a SEQEND. """
+    dxftype = group[0].value
+    if dxftype == 'POLYLINE':
+        return True
+    if dxftype == 'INSERT':
+        for tag in group:
+            if tag.code == 66:
+                return tag.value == 1
+    return False
+
+
+def build_entities(tag_groups, keep=None, check=None):
+    return list(iter_entities(tag_groups, keep, check))
+
+
+def iter_entities(tag_groups, keep=None, check=None):
+    """ Yields the entities built from tag_groups, POLYLINE and INSERT entities are yielded with their
+    VERTEX and ATTRIB entities once their SEQEND is reached.
+
+    tag_groups may be an iterator, only one entity (with its followers) is held at a time.
+    check() is called before each tag group, it stops the build by raising an exception.
+    """
     def build_entity(group):
         try:
-            entity = entity_factory(Tags(group))
+            entity = entity_factory(group)
         except KeyError:
             entity = None  # ignore unsupported entities
         return entity
 
-    entities = list()
     collector = None
+    skip_followers = False
     for group in tag_groups:
+        if check is not None:
+            check()
+        if skip_followers:  # VERTEX, ATTRIB and SEQEND of a skipped entity
+            skip_followers = group[0].value != 'SEQEND'
+            continue
+        if keep is not None and collector is None and not keep(group):
+            skip_followers = has_followers(group)
+            continue
         entity = build_entity(group)
         if entity is not None:
             if collector:
                 if entity.dxftype == 'SEQEND':
                     collector.stop()
-                    entities.append(collector.entity)
+                    yield collector.entity
                     collector = None
                 else:
                     collector.append(entity)
@@ -79,8 +208,59 @@ def build_entities(tag_groups):
             elif entity.dxftype == 'INSERT' and entity.attribsfollow:
                 collector = _Collector(entity)
             else:
-                entities.append(entity)
-    return entities
+                yield entity
+
+
+def iter_groups(tagreader, endofchunk='ENDSEC'):
+    """ Yields the tag groups of a section read from tagreader until the (0, endofchunk) tag,
+    without building the list of the section tags.
+    """
+    group = None
+    for tag in tagreader:
+        if tag.code == 0:
+            if group is not None:
+                yield group
+            if tag.value == endofchunk:
+                return
+            group = Tags([tag])
+        elif group is not None:
+            group.append(tag)
+    if group is not None:
+        yield group
+
+
+class EntityIndex(object):
+    """ Index of entities by (layer, dxftype) and of the INSERT entities by (layer, block name).
+
+    The lists returned keep the order of the entities given to the index.
+    """
+    def __init__(self, entities=()):
+        self._entities = list(entities)
+        self._types = defaultdict(list)  # (layer, dxftype): positions of the entities in self._entities
+        self._inserts = defaultdict(list)  # (layer, block name): positions of the INSERT entities
+        for position, entity in enumerate(self._entities):
+            self._types[entity.layer, entity.dxftype].append(position)
+            if entity.dxftype == 'INSERT':
+                self._inserts[entity.layer, entity.name].append(position)
+
+    def get(self, layer, dxftype):
+        """ Returns the entities of type dxftype on layer. """
+        return self._get(self._types.get((layer, dxftype), ()))
+
+    def query(self, layer, dxftypes):
+        """ Returns the entities of the types dxftypes on layer. """
+        return self._get(merge(*[self._types.get((layer, dxftype), ()) for dxftype in dxftypes]))
+
+    def get_inserts(self, name, layer=None):
+        """ Returns the INSERT entities of block name on layer, or on all layers if layer is None. """
+        if layer is not None:
+            return self._get(self._inserts.get((layer, name), ()))
+        return self._get(merge(*[positions for (layer, block_name), positions in self._inserts.items()
+                                 if block_name == name]))
+
+    def _get(self, positions):
+        entities = self._entities
+        return [entities[position] for position in positions]
 
 
 class _Collector:
@@ -0,0 +1,210 @@
+﻿# sgmdxfparser - copyright (C) 2017, Etienne MORO
+# and copyright (C) 2012, Manfred Moitzi (mozman)
+# Purpose: transform the entities of nested blocks to world coordinates
+# Created: 2026-10-18
+# License: MIT License
+
+from __future__ import unicode_literals
+__author__ = "emoro - mozman"
+
+import math
+from array import array
+from operator import attrgetter
+
+from .dxfentities import ocs_axes, slot_names
+
+# affine transformation (m00, m01, m02, m10, m11, m12, m20, m21, m22, tx, ty, tz): p' = M . p + t
+IDENTITY = (1., 0., 0., 0., 1., 0., 0., 0., 1., 0., 0., 0.)
+QUARTER_TURNS = ((1., 0.), (0., 1.), (-1., 0.), (0., -1.))  # (cos, sin) of 0, 90, 180 and 270 degrees
+FLATTEN_TYPES = ('INSERT', 'LINE', 'LWPOLYLINE', 'POINT')  # entity types transformed by BlockFlattener
+
+
+def compose(a, b):
+    """ Returns the transformation a(b(p)). """
+    a00, a01, a02, a10, a11, a12, a20, a21, a22, atx, aty, atz = a
+    b00, b01, b02, b10, b11, b12, b20, b21, b22, btx, bty, btz = b
+    return (a00 * b00 + a01 * b10 + a02 * b20, a00 * b01 + a01 * b11 + a02 * b21, a00 * b02 + a01 * b12 + a02 * b22,
+            a10 * b00 + a11 * b10 + a12 * b20, a10 * b01 + a11 * b11 + a12 * b21, a10 * b02 + a11 * b12 + a12 * b22,
+            a20 * b00 + a21 * b10 + a22 * b20, a20 * b01 + a21 * b11 + a22 * b21, a20 * b02 + a21 * b12 + a22 * b22,
+            a00 * btx + a01 * bty + a02 * btz + atx,
+            a10 * btx + a11 * bty + a12 * btz + aty,
+            a20 * btx + a21 * bty + a22 * btz + atz)
+
+
+def translation(x, y, z=0.):
+    return 1., 0., 0., 0., 1., 0., 0., 0., 1., x, y, z
+
+
+def rotation_z(degrees):
+    degrees %= 360.
+    if degrees % 90. == 0.:  # exact values for the quarter turns
+        c, s = QUARTER_TURNS[int(degrees // 90.)]
+    else:
+        c = math.cos(math.radians(degrees))
+        s = math.sin(math.radians(degrees))
+    return c, -s, 0., s, c, 0., 0., 0., 1., 0., 0., 0.
+
+
+def scaling(sx, sy, sz=1.):
+    return sx, 0., 0., 0., sy, 0., 0., 0., sz, 0., 0., 0.
+
+
+def ocs_matrix(extrusion):
+    """ Returns the transformation from the OCS of extrusion to the WCS (Arbitrary Axis Algorithm). """
+    if extrusion is None:
+        return IDENTITY
+    ax, ay, az = ocs_axes(extrusion)
+    if az == (0., 0., 1.):
+        return IDENTITY
+    return ax[0], ay[0], az[0], ax[1], ay[1], az[1], ax[2], ay[2], az[2], 0., 0., 0.
+
+
+def insert_matrices(insert, basepoint=(0., 0., 0.)):
+    """ Returns the transformations from the coordinates of the block to the coordinates of the INSERT container,
+    one per element of the insert array (MINSERT: col_count x row_count).
+    """
+    x, y = insert.insert[:2]
+    z = insert.insert[2] if len(insert.insert) > 2 else 0.
+    bx, by = basepoint[:2]
+    bz = basepoint[2] if len(basepoint) > 2 else 0.
+    # Insert.rotation is 360 - the DXF rotation
+    placement = compose(ocs_matrix(insert.extrusion), compose(translation(x, y, z), rotation_z(-insert.rotation)))
+    block = compose(scaling(insert.scale_x, insert.scale_y, insert.scale_z), translation(-bx, -by, -bz))
+    matrices = []
+    for row in range(max(insert.row_count, 1)):
+        for col in range(max(insert.col_count, 1)):
+            offset = translation(col * insert.col_spacing, row * insert.row_spacing)
+            matrices.append(compose(placement, compose(offset, block)))
+    return matrices
+
+
+def transform_point(m, point):
+    """ Returns the transformed point, with the number of coordinates of point (z = 0. for 2D points). """
+    m00, m01, m02, m10, m11, m12, m20, m21, m22, tx, ty, tz = m
+    if len(point) > 2:
+        x, y, z = point[:3]
+        return m00 * x + m01 * y + m02 * z + tx, m10 * x + m11 * y + m12 * z + ty, m20 * x + m21 * y + m22 * z + tz
+    x, y = point[:2]
+    return m00 * x + m01 * y + tx, m10 * x + m11 * y + ty
+
+
+def transform_coords(m, coords, ndim):
+    """ Returns the flat coordinates (x0, y0[, z0], x1, ...) transformed by m, all points at once. """
+    m00, m01, m02, m10, m11, m12, m20, m21, m22, tx, ty, tz = m
+    xs = coords[0::ndim]
+    ys = coords[1::ndim]
+    result = array('d', bytes(8 * len(coords)))
+    if ndim > 2:
+        zs = coords[2::ndim]
+        result[0::3] = array('d', [m00 * x + m01 * y + m02 * z + tx for x, y, z in zip(xs, ys, zs)])
+        result[1::3] = array('d', [m10 * x + m11 * y + m12 * z + ty for x, y, z in zip(xs, ys, zs)])
+        result[2::3] = array('d', [m20 * x + m21 * y + m22 * z + tz for x, y, z in zip(xs, ys, zs)])
+    else:
+        result[0::2] = array('d', [m00 * x + m01 * y + tx for x, y in zip(xs, ys)])
+        result[1::2] = array('d', [m10 * x + m11 * y + ty for x, y in zip(xs, ys)])
+    return result
+
+
+class BlockFlattener(object):
+    """ Transforms the entities of the blocks inserted by INSERT entities (and of their nested blocks) to the
+    coordinates of the INSERT container, the WCS for a modelspace INSERT.
+
+    The entities of a block are flattened once, in the coordinates of the block: an INSERT of this block then
+    costs one transformation of these entities. Entities on layer '0' take the layer of their INSERT.
+    Only the dxftypes entities are returned (INSERT, LINE, LWPOLYLINE and POINT are supported), the nested INSERT
+    entities are always traversed.
+    """
+    def __init__(self, blocks, dxftypes=FLATTEN_TYPES):
+        self.blocks = blocks
+        self.dxftypes = frozenset(dxftypes).intersection(FLATTEN_TYPES)
+        self._flattened = {}  # block name: flattened entities in block coordinates
+
+    def flatten(self, insert):
+        """ Returns the entities of the block of insert in the coordinates of the container of insert. """
+        block = self.blocks.get(insert.name)
+        if block is None:
+            return []
+        entities = self.block_entities(block)
+        result = []
+        for m in insert_matrices(insert, block.basepoint):
+            result.extend(transform_entity(entity, m, insert.layer) for entity in entities)
+        return result
+
+    def has_entities(self, name):
+        """ True if the flattened block name has entities. """
+        block = self.blocks.get(name)
+        return block is not None and len(self.block_entities(block)) > 0
+
+    def block_entities(self, block):
+        """ Returns the entities of block and of its nested blocks, in the coordinates of block. """
+        try:
+            return self._flattened[block.name]
+        except KeyError:
+            pass
+        self._flattened[block.name] = []  # a block inserted in itself is empty
+        entities = []
+        for entity in block:
+            if entity.dxftype in self.dxftypes:
+                entities.append(entity)
+            if entity.dxftype == 'INSERT':
+                entities.extend(self.flatten(entity))
+        self._flattened[block.name] = entities
+        return entities
+
+
+def transform_entity(entity, m, layer):
+    """ Returns a copy of entity transformed by m, on layer if entity is on layer '0'. """
+    entity = copy_entity(entity)
+    if entity.layer == '0':
+        entity.layer = layer
+    dxftype = entity.dxftype
+    if dxftype == 'LINE':
+        entity.start = transform_point(m, entity.start)
+        entity.end = transform_point(m, entity.end)
+    elif dxftype == 'LWPOLYLINE':
+        entity.coords = transform_coords(m, entity.coords, entity.ndim)
+        if m[0] * m[4] - m[1] * m[3] < 0.:  # mirrored, the arcs turn the other way
+            entity.bulge = array('d', [-bulge for bulge in entity.bulge])
+    elif dxftype == 'POINT':
+        entity.point = transform_point(m, entity.point)
+    elif dxftype in ('ATTRIB', 'TEXT'):
+        entity.insert = transform_point(compose(m, ocs_matrix(entity.extrusion)), entity.insert)
+        entity.extrusion = (0., 0., 1.)
+    elif dxftype == 'INSERT':
+        transform_insert(entity, m)
+    return entity
+
+
+_slot_getters = {}  # entity class: (slot names, attrgetter of the slots)
+
+
+def copy_entity(entity):
+    """ Returns a shallow copy of entity, faster than copy.copy() for the __slots__ based entity classes. """
+    cls = entity.__class__
+    try:
+        names, getter = _slot_getters[cls]
+    except KeyError:
+        names = slot_names(cls)
+        names, getter = _slot_getters[cls] = names, attrgetter(*names)
+    new_entity = cls.__new__(cls)
+    for name, value in zip(names, getter(entity)):
+        setattr(new_entity, name, value)
+    return new_entity
+
+
+def transform_insert(insert, m):
+    """ Places the copy of an INSERT entity transformed by m, its x and y axes are transformed in the XY plane. """
+    m = compose(m, ocs_matrix(insert.extrusion))
+    insert.insert = transform_point(m, insert.insert)
+    if len(insert.insert) > 2:
+        insert.insert_z = insert.insert[2]
+    angle = math.radians(-insert.rotation)
+    x_axis = (m[0] * math.cos(angle) + m[1] * math.sin(angle), m[3] * math.cos(angle) + m[4] * math.sin(angle))
+    y_axis = (-m[0] * math.sin(angle) + m[1] * math.cos(angle), -m[3] * math.sin(angle) + m[4] * math.cos(angle))
+    determinant = x_axis[0] * y_axis[1] - x_axis[1] * y_axis[0]
+    insert.rotation = 360.0 - math.degrees(math.atan2(x_axis[1], x_axis[0])) % 360.0
+    insert.scale_x *= math.hypot(*x_axis)
+    insert.scale_y *= math.copysign(math.hypot(*y_axis), determinant)
+    insert.scale = (insert.scale_x, insert.scale_y, insert.scale_z)
+    insert.extrusion = (0., 0., 1.)
+    insert.attribs = [transform_entity(attrib, m, insert.layer) for attrib in insert.attribs]
@@ -8,7 +8,6 @@
 __author__ = "emoro - mozman"
 
 from .tags import TagGroups
-from .tags import Tags
 from .color import TrueColor
 
 LOCK = 0b00000100
@@ -80,7 +79,7 @@ class Table(object):
         assert groups.get_name(0) == 'TABLE'
         assert groups.get_name(-1) == 'ENDTAB'
         for entrytags in groups[1:-1]:
-            yield Tags(entrytags)
+            yield entrytags
 
 
 class LayerTable(Table):
@@ -0,0 +1,151 @@
+﻿# sgmdxfparser - copyright (C) 2017, Etienne MORO
+# and copyright (C) 2012, Manfred Moitzi (mozman)
+# Purpose: parse the sections of a DXF file in a process pool
+# Created: 2026-10-18
+# License: MIT License
+
+from __future__ import unicode_literals
+__author__ = "emoro - mozman"
+
+import io
+import mmap
+import multiprocessing
+import re
+
+from .tags import stream_tagger, BINARY_DXF_SENTINEL
+from .defaultchunk import iterchunks
+from .sections import Sections, SECTIONMAP, get_section_class
+
+# (0, 'SECTION') followed by (2, name), group code lines only contain an integer so a (0, ...) tag can not be
+# confused with a value '0' followed by a group code
+SECTION_RE = re.compile(br'^[ \t]*0[ \t]*\r?\nSECTION\r?\n[ \t]*2[ \t]*\r?\n([^\r\n]*)\r?$', re.M)
+EOF_RE = re.compile(br'^[ \t]*0[ \t]*\r?\nEOF\r?$', re.M)
+# first tag of an entity which is not a VERTEX, ATTRIB or SEQEND of the previous POLYLINE or INSERT
+ENTITY_RE = re.compile(br'^[ \t]*0[ \t]*\r?\n(?![ \t]*-?\d+[ \t]*\r?$)(?!(?:VERTEX|ATTRIB|SEQEND)\r?$)', re.M)
+BLOCK_RE = re.compile(br'^[ \t]*0[ \t]*\r?\nBLOCK\r?$', re.M)
+ENDSEC_RE = re.compile(br'^[ \t]*0[ \t]*\r?\nENDSEC\r?$', re.M)
+
+# sections split in several parts, at the first tag of an entity or a block
+SPLIT_RE = {
+    'ENTITIES': ENTITY_RE,
+    'BLOCKS': BLOCK_RE,
+}
+MIN_PART_SIZE = 1 << 20  # bytes
+EOF_TAG = b'  0\nEOF\n'
+
+
+def parallel_sections(stream, drawing):
+    """ Returns the Sections of a DXF file, parsed in a pool of drawing.parallel processes (all cpus if True).
+
+    The first section (HEADER) is parsed in this process to get the version and the encoding, the other
+    sections are parsed by the pool, ENTITIES and BLOCKS sections are split in parts of whole entities and
+    blocks. Returns None if stream is not an ASCII DXF file opened in 'rb' mode, it is read sequentially.
+
+    On Windows, QGIS must be told which python executable starts the pool processes:
+    multiprocessing.set_executable(os.path.join(sys.exec_prefix, 'pythonw.exe')).
+    """
+    processes = None if drawing.parallel is True else int(drawing.parallel)
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if processes < 2 or 'b' not in getattr(stream, 'mode', ''):
+        return None
+    try:
+        data = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, ValueError, EnvironmentError, io.UnsupportedOperation):
+        return None  # not a file or empty file
+    try:
+        if data[:len(BINARY_DXF_SENTINEL)] == BINARY_DXF_SENTINEL:
+            return None
+        ranges = section_ranges(data)
+        if not ranges:
+            return None
+        first_name, first_start, first_end = ranges[0]
+        tagreader = stream_tagger(io.BytesIO(data[:first_end] + EOF_TAG), drawing.assure_3d_coords)
+        sections = Sections(tagreader, drawing)  # HEADER: dxfversion and encoding of the drawing
+        tasks = []
+        for name, start, end in ranges[1:]:
+            if name not in SECTIONMAP or (name == 'BLOCKS' and not drawing.grab_blocks):
+                continue  # not grabbed, like in Sections
+            tasks.extend(section_tasks(data, name, start, end, processes))
+    finally:
+        data.close()
+
+    if tasks:
+        pool = multiprocessing.Pool(processes)
+        try:
+            parts = pool.map(parse_section, [(stream.name, drawing) + task for task in tasks], chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+        merge_parts(sections, tasks, parts)
+    return sections
+
+
+def section_ranges(data):
+    """ Returns the (name, start, end) byte ranges of the sections of data, end is the start of the next section. """
+    starts = [(match.group(1).decode('ascii', 'ignore'), match.start()) for match in SECTION_RE.finditer(data)]
+    if not starts:
+        return []
+    end_of_file = EOF_RE.search(data, starts[-1][1])
+    ends = [start for name, start in starts[1:]] + [end_of_file.start() if end_of_file else len(data)]
+    return [(name, start, end) for (name, start), end in zip(starts, ends)]
+
+
+def section_tasks(data, name, start, end, processes):
+    """ Returns the (name, start, end, head, tail) tasks of the section in data[start:end].
+
+    A big ENTITIES or BLOCKS section is split in about 2 parts per process, head and tail are the bytes
+    which make a whole section of a part.
+    """
+    split_re = SPLIT_RE.get(name)
+    part_size = max(MIN_PART_SIZE, (end - start) // (processes * 2))
+    if split_re is None or end - start < 2 * part_size:
+        return [(name, start, end, b'', EOF_TAG)]
+    body_end = end
+    for match in ENDSEC_RE.finditer(data, start, end):
+        body_end = match.start()
+    boundaries = [start]
+    position = start + part_size
+    while position < body_end:
+        match = split_re.search(data, position, body_end)
+        if match is None:
+            break
+        boundaries.append(match.start())
+        position = match.start() + part_size
+    boundaries.append(end)
+    head = '  0\nSECTION\n  2\n{}\n'.format(name).encode('ascii')
+    tail = b'  0\nENDSEC\n' + EOF_TAG
+    tasks = []
+    for index, (part_start, part_end) in enumerate(zip(boundaries, boundaries[1:])):
+        first = index == 0
+        last = part_end == end
+        tasks.append((name, part_start, part_end, b'' if first else head, EOF_TAG if last else tail))
+    return tasks
+
+
+def parse_section(task):
+    """ Parses a section (or a part of section) in a pool process. """
+    filename, drawing, name, start, end, head, tail = task
+    with io.open(filename, 'rb') as fp:
+        fp.seek(start)
+        data = fp.read(end - start)
+    tagreader = stream_tagger(io.BytesIO(head + data + tail), drawing.assure_3d_coords, encoding=drawing.encoding)
+    for section in iterchunks(tagreader, stoptag='EOF', endofchunk='ENDSEC'):
+        return get_section_class(name).from_tags(section, drawing)
+    return None
+
+
+def merge_parts(sections, tasks, parts):
+    """ Adds the parsed parts to sections, in file order, the parts of a split section are merged. """
+    previous = None
+    for (name, start, end, head, tail), part in zip(tasks, parts):
+        if part is None:
+            continue
+        if head:  # next part of the previous section
+            if name == 'BLOCKS':
+                previous._blocks.update(part._blocks)
+            else:
+                previous._entities.extend(part._entities)
+        else:
+            sections._sections[part.name] = part
+            previous = part
@@ -42,7 +42,10 @@ class Sections(object):
                 new_section = HeaderSection.from_tags(section)
                 drawing.dxfversion = new_section.get('$ACADVER', 'AC1009')
                 codepage = new_section.get('$DWGCODEPAGE', 'ANSI_1252')
-                drawing.encoding = toencoding(codepage)
+                if drawing.dxfversion >= 'AC1021':  # DXF R2007 and later are always utf-8 encoded
+                    drawing.encoding = 'utf-8'
+                else:
+                    drawing.encoding = toencoding(codepage)
                 bootstrap = False
             else:
                 section_name = name(section)
@@ -0,0 +1,106 @@
+﻿# sgmdxfparser - copyright (C) 2017, Etienne MORO 
+# and copyright (C) 2012, Manfred Moitzi (mozman)
+# Purpose: stream the modelspace entities of a DXF drawing
+# Created: 2026-10-18
+# License: MIT License
+
+from __future__ import unicode_literals
+__author__ = "emoro - mozman"
+
+from .tags import stream_tagger, parse_monitor, TagStore, DXFTag
+from .tablessection import TablesSection
+from .blockssection import BlocksSection
+from .entitysection import iter_entities, iter_groups, group_filter, entity_filter
+from .flatten import BlockFlattener
+from .drawing import DEFAULT_OPTIONS, as_filter, as_extent
+
+SECTION = DXFTag(0, 'SECTION')
+ENDSEC = DXFTag(0, 'ENDSEC')
+EOF = DXFTag(0, 'EOF')
+
+
+def iter_modelspace(stream, options=None):
+    """ Yields the modelspace entities of a DXF stream (text or binary) while the stream is read.
+
+    Only the entity being built is held in memory, the ENTITIES section is never stored. The TABLES section is
+    read only if text styles have to be resolved, the BLOCKS section only with the flatten_blocks option, all other
+    sections are skipped. The options are the Drawing options, grab_blocks and parallel are ignored.
+
+    flatten_blocks: each INSERT entity is followed by the entities of its block and nested blocks transformed to
+    the WCS (see BlockFlattener), the filters apply to these entities too.
+    """
+    if options is None:
+        options = DEFAULT_OPTIONS
+    filters = (as_filter(options.get('layer_filter')), as_filter(options.get('dxftype_filter')),
+               as_extent(options.get('extent'), options.get('extent_margin', 0.)))
+    keep = group_filter(*filters)
+    resolve_text_styles = options.get('resolve_text_styles', True)
+    styles = None
+    flatten_blocks = options.get('flatten_blocks', False)
+    flattener = None
+    keep_entity = entity_filter(*filters) if flatten_blocks else None
+
+    monitor = parse_monitor(stream, options)
+    progress = None if monitor is None else monitor.update
+    tagreader = stream_tagger(stream, options.get('assure_3d_coords', False), progress=progress)
+    for tag in tagreader:
+        if tag == EOF:
+            return
+        if tag != SECTION:
+            continue
+        name = next(tagreader).value
+        if name == 'ENTITIES':
+            if flattener is not None and keep is not None:
+                # the INSERT entities of blocks with entities are built to flatten their blocks
+                keep = keep_group_or_insert(keep, flattener)
+            for entity in iter_entities(iter_groups(tagreader), keep, None if monitor is None else monitor.check):
+                if entity.paperspace:
+                    continue
+                if styles is not None and hasattr(entity, 'resolve_text_style'):
+                    entity.resolve_text_style(styles)
+                if flatten_blocks and entity.dxftype == 'INSERT':
+                    for flat_entity in [entity] + ([] if flattener is None else flattener.flatten(entity)):
+                        if keep_entity is None or keep_entity(flat_entity):
+                            yield flat_entity
+                    continue
+                yield entity
+        elif name == 'TABLES' and resolve_text_styles:
+            styles = TablesSection.from_tags(read_section(tagreader, name), None).styles
+        elif name == 'BLOCKS' and flatten_blocks:
+            blocks = BlocksSection.from_tags(read_section(tagreader, name), None)
+            if styles is not None:
+                blocks.resolve_text_styles(styles)
+            flattener = BlockFlattener(blocks)
+        else:
+            skip_section(tagreader)
+
+
+def keep_group_or_insert(keep, flattener):
+    def keep_group(group):
+        if keep(group):
+            return True
+        if group[0].value != 'INSERT':
+            return False
+        for tag in group:
+            if tag.code == 2:
+                return flattener.has_entities(tag.value)
+        return False
+    return keep_group
+
+
+def read_section(tagreader, name):
+    """ Returns the tags of the section name (as a TagsView), read from tagreader until (0, 'ENDSEC'). """
+    store = TagStore()
+    store.append(SECTION)
+    store.append(DXFTag(2, name))
+    for tag in tagreader:
+        store.append(tag)
+        if tag == ENDSEC:
+            break
+    return store.view()
+
+
+def skip_section(tagreader):
+    for tag in tagreader:
+        if tag == ENDSEC:
+            return
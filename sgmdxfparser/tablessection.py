@@ -8,7 +8,7 @@
 from __future__ import unicode_literals
 __author__ = "emoro - mozman"
 
-from .defaultchunk import iterchunks, DefaultChunk
+from .defaultchunk import iterchunk_views, DefaultChunk
 from .layers import LayerTable
 from .styles import StyleTable
 from .linetypes import LinetypeTable
@@ -59,19 +59,16 @@ class TablesSection(object):
         def name(table):
             return table[1].value
 
-        def skiptags(tags, count):
-            for i in range(count):
-                next(tags)
-            return tags
-
-        itertags = skiptags(iter(tags), 2)  # (0, 'SECTION'), (2, 'TABLES')
-        for table in iterchunks(itertags, stoptag='ENDSEC', endofchunk='ENDTAB'):
+        # skip (0, 'SECTION'), (2, 'TABLES')
+        for table in iterchunk_views(tags[2:], stoptag='ENDSEC', endofchunk='ENDTAB'):
             table_class = table_factory(name(table))
             if table_class is not None:
                 new_table = table_class.from_tags(table)
                 self._tables[new_table.name] = new_table
 
     def __getattr__(self, key):
+        if key.startswith('_'):  # _tables itself, not set yet while unpickling
+            raise AttributeError(key)
         try:
             return self._tables[key]
         except KeyError:
@@ -9,18 +9,26 @@
 from __future__ import unicode_literals
 __author__ = "emoro - mozman"
 
+import io
+import os
 import sys
+import struct
+from binascii import hexlify
 from .codepage import toencoding
 from .const import acadrelease
 from array import array
 
 from io import StringIO
+from bisect import bisect_left
 from collections import namedtuple
+from functools import partial
 from itertools import chain, islice
+from operator import length_hint
 from . import tostr
 
 
 DXFTag = namedtuple('DXFTag', 'code value')
+make_tag = partial(tuple.__new__, DXFTag)  # make_tag((code, value)), faster than DXFTag(code, value)
 NONE_TAG = DXFTag(999999, 'NONE')
 APP_DATA_MARKER = 102
 SUBCLASS_MARKER = 100
@@ -31,6 +39,43 @@ class DXFStructureError(Exception):
     pass
 
 
+class DXFParseCanceled(Exception):
+    pass
+
+
+class ParseMonitor(object):
+    """ Reports the progress of a parse and stops it by raising DXFParseCanceled once cancel() returns True.
+
+    progress(size, total) gets the number of characters (or bytes) read and the size of the file (None if unknown).
+    """
+    def __init__(self, progress=None, cancel=None, total=None):
+        self.progress = progress
+        self.cancel = cancel
+        self.total = total
+
+    def update(self, size):
+        self.check()
+        if self.progress is not None:
+            self.progress(size, self.total)
+
+    def check(self):
+        if self.cancel is not None and self.cancel():
+            raise DXFParseCanceled()
+
+
+def parse_monitor(stream, options):
+    """ Returns the ParseMonitor of the progress and cancel options of a parse of stream, None if not needed. """
+    progress = options.get('progress')
+    cancel = options.get('cancel')
+    if progress is None and cancel is None:
+        return None
+    try:
+        total = os.fstat(stream.fileno()).st_size
+    except (AttributeError, ValueError, EnvironmentError, io.UnsupportedOperation):
+        total = None
+    return ParseMonitor(progress, cancel, total)
+
+
 def point_tuple(value):
     return tuple(float(f) for f in value)
 
@@ -50,6 +95,8 @@ def to_float_with_infinite(value):
     try:
         return float(value)
     except ValueError:
+        if isinstance(value, bytes):
+            value = value.decode('ascii', 'ignore')
         value = value.lower().strip()
         if value.startswith('inf'):
             return infinite
@@ -61,29 +108,17 @@ def to_float_with_infinite(value):
 
 class TagCaster:
     def __init__(self):
-        self._cast = self._build()
-
-    def _build(self):
-        table = {}
-        for caster, codes in TYPES:
-            for code in codes:
-                table[code] = caster
-        return table
+        self._cast = cast_table()
 
     def cast(self, tag):
         code, value = tag
-        typecaster = self._cast.get(code, tostr)
-        try:
-            value = typecaster(value)
-        except ValueError:
-            if typecaster is int:  # convert float to int
-                value = int(float(value))
-            else:
-                raise
-        return DXFTag(code, value)
+        return DXFTag(code, self.cast_value(code, value))
 
     def cast_value(self, code, value):
-        typecaster = self._cast.get(code, tostr)
+        try:
+            typecaster = self._cast[code] if code >= 0 else tostr
+        except IndexError:  # code above MAX_GROUP_CODE
+            typecaster = tostr
         try:
             return typecaster(value)
         except ValueError:
@@ -121,69 +156,308 @@ TYPES = [
     (to_float_with_infinite, range(1020, 1060)),
     (int, range(1060, 1072)),
 ]
+MAX_GROUP_CODE = 1071
+
+
+def cast_table():
+    """ Returns the casters of the group codes 0 to MAX_GROUP_CODE as a list indexed by group code. """
+    table = [tostr] * (MAX_GROUP_CODE + 1)
+    for caster, codes in TYPES:
+        for code in codes:
+            table[code] = caster
+    return table
 
 _TagCaster = TagCaster()
 cast_tag = _TagCaster.cast
 cast_tag_value = _TagCaster.cast_value
 
 
-def stream_tagger(stream, assure_3d_coords=False):
-    """ Generates DXFTag() from a stream (untrusted external source). Does not skip comment tags 999.
+BLOCK_SIZE = 1 << 20  # characters or bytes read at once by the tokenizer
+
+
+def stream_tagger(stream, assure_3d_coords=False, block_size=BLOCK_SIZE, encoding='cp1252', progress=None):
+    """ Generates DXFTag() from a stream (untrusted external source). Skips comment tags 999.
+
+    The stream is read by large blocks which are split into lines in one pass, point coordinates
+    (10, 20, 30) are merged into tuples. Group codes are parsed only once per distinct code string.
+
+    A binary stream (file opened in 'rb' mode) is read in a single pass: numbers are converted
+    directly from bytes and only string values are decoded, with the encoding given by the
+    $DWGCODEPAGE header var (always utf-8 for DXF R2007 and later). encoding is the encoding used
+    until the HEADER section gives it, for streams which do not start with the HEADER section.
+
+    progress(size) is called with the number of characters (or bytes) read so far after each block read.
     """
-    class Counter:
-        def __init__(self):
-            self.counter = 0
-
-    undo_tag = None
-    line = Counter()  # writeable line counter for next_tag(), Python 2.7 does not support the nonlocal statement
-
-    def next_tag():
-        code = stream.readline()
-        value = stream.readline()
-        line.counter += 2
-        if code and value:  # StringIO(): empty strings indicates EOF
-            return DXFTag(int(code[:-1]), value[:-1])  # without '\n'
-        else:  # StringIO(): missing '\n' indicates EOF
-            raise EOFError()
-
-    while True:
+    group_codes = {}  # raw group code string -> (int, caster)
+    header_var = None  # name of the last header var, while it waits for its value
+    unicode_dxf = False
+    casters = _TagCaster._cast
+    line = 0  # line number of the first line of the current block
+    lines = []
+    it = iter(lines)
+
+    def line_number():  # line number of the last tag read, only computed for error messages
+        return line + len(lines) - length_hint(it)
+
+    def group_code(raw):
         try:
-            if undo_tag is not None:
-                x = undo_tag
-                undo_tag = None
+            code = int(raw)
+        except ValueError:
+            raise DXFStructureError('Invalid group code "{code}" near line: {line}.'.format(
+                code=raw.strip(),
+                line=line_number(),
+            ))
+        group_codes[raw] = code, (casters[code] if 0 <= code <= MAX_GROUP_CODE else tostr)
+        return group_codes[raw]
+
+    def cast_fallback(typecaster, code, value):
+        try:
+            if typecaster is int:  # convert float to int
+                return int(float(value))
+        except ValueError:
+            pass
+        raise DXFStructureError('Invalid tag (code={code}, value="{value}") near line: {line}.'.format(
+            line=line_number(),
+            code=code,
+            value=value,
+        ))
+
+    def point(pcode, x, y, z=None):
+        try:
+            if z is not None:
+                return make_tag((pcode, (float(x), float(y), float(z))))
+            elif assure_3d_coords:
+                return make_tag((pcode, (float(x), float(y), 0.)))
             else:
-                x = next_tag()
-            code = x.code
-            if code == 999:  # skip comments
+                return make_tag((pcode, (float(x), float(y))))
+        except ValueError:
+            raise DXFStructureError('Invalid floating point values near line: {}.'.format(line_number()))
+
+    pcode = 0  # group code of a point waiting for its y and z coordinates, 0 = no pending point
+    px = py = None
+    block = stream.read(block_size)
+    size = len(block)
+    binary = isinstance(block, bytes)
+    if binary and block.startswith(BINARY_DXF_SENTINEL):  # binary DXF file, read at once
+        block += stream.read()
+        if progress is not None:
+            progress(len(block))
+        for tag in binary_tagger(block, assure_3d_coords):
+            yield tag
+        return
+    if progress is not None:
+        progress(size)
+    newline = b'\n' if binary else '\n'
+    rest = block[:0]  # incomplete tag at the end of the previous block
+    eof = False
+    while not eof:
+        eof = not block
+        line += len(lines)
+        data = rest + block
+        if binary and b'\r' in data:
+            data = data.replace(b'\r\n', b'\n')
+        lines = data.split(newline)
+        if eof:
+            if not lines[-1]:  # final line end
+                lines.pop()
+        else:
+            rest = lines.pop()  # incomplete last line
+            if len(lines) & 1:  # group code without its value
+                rest = lines.pop() + newline + rest
+        it = iter(lines)
+        for code, value in zip(it, it):
+            try:
+                code, typecaster = group_codes[code]
+            except KeyError:
+                code, typecaster = group_code(code)
+            if pcode:
+                if py is None:  # y coordinate is mandatory
+                    if code != pcode + 10:
+                        raise DXFStructureError("Missing required y coordinate near line: {}.".format(line_number()))
+                    py = value
+                    continue
+                if code == pcode + 20:  # z coordinate just for 3d points
+                    yield point(pcode, px, py, value)
+                    pcode = 0
+                    continue
+                yield point(pcode, px, py)
+                pcode = 0
+            if typecaster is point_tuple:  # POINT_CODES
+                pcode, px, py = code, value, None
+            elif code == 999:  # skip comments
                 continue
-            if code in POINT_CODES:
-                y = next_tag()  # y coordinate is mandatory
-                if y.code != code + 10:
-                    raise DXFStructureError("Missing required y coordinate near line: {}.".format(line.counter))
-                z = next_tag()  # z coordinate just for 3d points
-                try:
-                    if z.code == code + 20:
-                        point = (float(x.value), float(y.value), float(z.value))
-                    else:
-                        if assure_3d_coords:
-                            point = (float(x.value), float(y.value), 0.)
-                        else:
-                            point = (float(x.value), float(y.value))
-                        undo_tag = z
-                except ValueError:
-                    raise DXFStructureError('Invalid floating point values near line: {}.'.format(line.counter))
-                yield DXFTag(code, point)
             else:  # just a single tag
-                try:
-                    yield cast_tag(x)
-                except ValueError:
-                    raise DXFStructureError('Invalid tag (code={code}, value="{value}") near line: {line}.'.format(
-                        line=line.counter,
-                        code=x.code,
-                        value=x.value,
-                    ))
-        except EOFError:
-            return
+                if typecaster is tostr:
+                    if binary:
+                        try:
+                            value = value.decode(encoding)
+                        except UnicodeDecodeError:
+                            value = value.decode('utf-8', 'ignore')
+                        if header_var is not None:  # learn the encoding from the HEADER section
+                            encoding, unicode_dxf = header_encoding(header_var, value, encoding, unicode_dxf)
+                            header_var = None
+                        if code == 9:
+                            header_var = value
+                else:
+                    try:
+                        value = typecaster(value)
+                    except ValueError:
+                        value = cast_fallback(typecaster, code, value)
+                yield make_tag((code, value))
+        if not eof:
+            block = stream.read(block_size)
+            if progress is not None:
+                size += len(block)
+                progress(size)
+    if pcode:
+        if py is None:
+            raise DXFStructureError("Missing required y coordinate near line: {}.".format(line_number()))
+        yield point(pcode, px, py)
+
+
+def header_encoding(name, value, encoding, unicode_dxf):
+    """ Returns the encoding and the unicode flag of the DXF file after the header var name=value. """
+    if name == '$ACADVER':
+        unicode_dxf = value >= 'AC1021'
+        if unicode_dxf:
+            encoding = 'utf-8'
+    elif name == '$DWGCODEPAGE' and not unicode_dxf:
+        encoding = toencoding(value)
+    return encoding, unicode_dxf
+
+
+BINARY_DXF_SENTINEL = b'AutoCAD Binary DXF\r\n\x1a\x00'
+MAX_CACHED_STRINGS = 1 << 16
+
+# value types in binary DXF files, all other group codes are zero terminated strings
+BIN_STR, BIN_DOUBLE, BIN_INT16, BIN_INT32, BIN_INT64, BIN_BOOL, BIN_CHUNK = range(7)
+BINARY_TYPES = [
+    (BIN_DOUBLE, tuple(chain(range(10, 60), range(110, 150), range(210, 240), range(460, 470), range(1010, 1060)))),
+    (BIN_INT16, tuple(chain(range(60, 80), range(170, 180), range(270, 290), range(370, 390), range(400, 410),
+                            range(1060, 1071)))),
+    (BIN_INT32, tuple(chain(range(90, 100), range(420, 460), [1071]))),
+    (BIN_INT64, tuple(range(160, 170))),
+    (BIN_BOOL, tuple(range(290, 300))),
+    (BIN_CHUNK, tuple(chain(range(310, 320), [1004]))),
+]
+
+
+def binary_value_types():
+    """ Returns the list of the binary value types, indexed by group code. """
+    types = [BIN_STR] * 1072
+    for value_type, codes in BINARY_TYPES:
+        for code in codes:
+            types[code] = value_type
+    return types
+
+
+def binary_tagger(data, assure_3d_coords=False):
+    """ Generates DXFTag() from the content (bytes) of a binary DXF file. Skips comment tags 999.
+
+    Values are unpacked with struct according to their group code, binary chunks (310-319, 1004) are returned
+    as hex strings like in ASCII DXF files. Group codes are 1 byte long (255 + 2 bytes for extended codes)
+    in DXF R12 files and 2 bytes long in later versions, the width is found from the first (0, 'SECTION') tag.
+    """
+    if not data.startswith(BINARY_DXF_SENTINEL):
+        raise DXFStructureError('Not a binary DXF file.')
+    types = binary_value_types()
+    max_code = len(types)
+    unpack_double = struct.Struct('<d').unpack_from
+    unpack_int16 = struct.Struct('<h').unpack_from
+    unpack_uint16 = struct.Struct('<H').unpack_from
+    unpack_int32 = struct.Struct('<i').unpack_from
+    unpack_int64 = struct.Struct('<q').unpack_from
+    encoding = 'cp1252'
+    header_var = None
+    unicode_dxf = False
+    strings = {}  # decoded strings, layer names, subclass markers... are repeated all along the file
+
+    def point(pcode, x, y, z=None):
+        if z is not None:
+            return DXFTag(pcode, (x, y, z))
+        elif assure_3d_coords:
+            return DXFTag(pcode, (x, y, 0.))
+        else:
+            return DXFTag(pcode, (x, y))
+
+    index = len(BINARY_DXF_SENTINEL)
+    size = len(data)
+    one_byte_codes = size > index + 1 and data[index + 1] != 0  # 2 bytes codes: (0, 'SECTION') starts with 2 zeros
+    pcode = 0  # group code of a point waiting for its y and z coordinates, 0 = no pending point
+    px = py = None
+    try:
+        while index < size:
+            code = data[index]
+            if not one_byte_codes:
+                code |= data[index + 1] << 8
+                index += 2
+            elif code == 255:  # extended group code
+                code = unpack_uint16(data, index + 1)[0]
+                index += 3
+            else:
+                index += 1
+
+            value_type = types[code] if code < max_code else BIN_STR
+            if value_type == BIN_DOUBLE:
+                value = unpack_double(data, index)[0]
+                index += 8
+            elif value_type == BIN_STR:
+                end = data.index(b'\x00', index)
+                raw = data[index:end]
+                index = end + 1
+                value = strings.get(raw)
+                if value is None:
+                    try:
+                        value = raw.decode(encoding)
+                    except UnicodeDecodeError:
+                        value = raw.decode('utf-8', 'ignore')
+                    if len(strings) < MAX_CACHED_STRINGS:
+                        strings[raw] = value
+                if header_var is not None:  # learn the encoding from the HEADER section
+                    encoding, unicode_dxf = header_encoding(header_var, value, encoding, unicode_dxf)
+                    header_var = None
+                    strings.clear()
+                if code == 9:
+                    header_var = value
+            elif value_type == BIN_INT16:
+                value = unpack_int16(data, index)[0]
+                index += 2
+            elif value_type == BIN_INT32:
+                value = unpack_int32(data, index)[0]
+                index += 4
+            elif value_type == BIN_BOOL:
+                value = data[index]
+                index += 1
+            elif value_type == BIN_INT64:
+                value = unpack_int64(data, index)[0]
+                index += 8
+            else:  # BIN_CHUNK
+                end = index + 1 + data[index]
+                value = hexlify(data[index + 1:end]).upper().decode('ascii')
+                index = end
+
+            if pcode:
+                if py is None:  # y coordinate is mandatory
+                    if code != pcode + 10:
+                        raise DXFStructureError("Missing required y coordinate near byte: {}.".format(index))
+                    py = value
+                    continue
+                if code == pcode + 20:  # z coordinate just for 3d points
+                    yield point(pcode, px, py, value)
+                    pcode = 0
+                    continue
+                yield point(pcode, px, py)
+                pcode = 0
+            if code in POINT_CODES:
+                pcode, px, py = code, value, None
+            elif code != 999:  # skip comments
+                yield make_tag((code, value))
+    except (IndexError, ValueError, struct.error):
+        raise DXFStructureError("Premature end of binary DXF data near byte: {}.".format(index))
+    if pcode:
+        if py is None:
+            raise DXFStructureError("Missing required y coordinate near byte: {}.".format(index))
+        yield point(pcode, px, py)
 
 
 def string_tagger(s):
@@ -279,6 +553,126 @@ class Tags(list):
         return classes.get(name, 'noname')
 
 
+class TagStore(object):
+    """ Columnar storage of DXF tags: group codes in an int array, values in one list.
+
+    The (0, ...) tags are indexed while the store is filled, TagsView.groups() uses this index to split a view
+    into entity groups without scanning the codes.
+    """
+    __slots__ = ('codes', 'values', 'splits')
+
+    def __init__(self):
+        self.codes = array('i')
+        self.values = []
+        self.splits = array('l')  # indices of the tags with group code 0
+
+    def append(self, tag):
+        code, value = tag
+        if code == 0:
+            self.splits.append(len(self.values))
+        self.codes.append(code)
+        self.values.append(value)
+
+    def __len__(self):
+        return len(self.values)
+
+    def view(self, start=0, end=None):
+        return TagsView(self, start, len(self.values) if end is None else end)
+
+
+class TagsView(object):
+    """ Read only view of the tags store[start:end], nothing is copied.
+
+    Has the interface of Tags: indexing returns a DXFTag and slicing returns a new view.
+    """
+    __slots__ = ('store', 'start', 'end')
+
+    def __init__(self, store, start, end):
+        self.store = store
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.end - self.start)
+            if step != 1:
+                return Tags(self)[index]
+            return TagsView(self.store, self.start + start, self.start + max(start, stop))
+        if index < 0:
+            index += self.end - self.start
+        if not 0 <= index < self.end - self.start:
+            raise IndexError(index)
+        index += self.start
+        return make_tag((self.store.codes[index], self.store.values[index]))
+
+    def __iter__(self):
+        return map(make_tag, zip(self.codes(), self.store.values[self.start:self.end]))
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return 'TagsView(%r)' % list(self)
+
+    def codes(self):
+        """ Returns the group codes of the view as an array. """
+        return self.store.codes[self.start:self.end]
+
+    def find_all(self, code):
+        """ Returns a list of DXFTag(code, ...). """
+        values = self.store.values
+        return [DXFTag(code, values[index]) for index in self._indices(code)]
+
+    def tag_index(self, code, start=0, end=None):
+        """Return first index of DXFTag(code, value).
+        """
+        if end is None:
+            end = len(self)
+        try:
+            return self.store.codes[self.start + start:self.start + end].index(code) + start
+        except ValueError:
+            raise ValueError(code)
+
+    def get_value(self, code):
+        return self.store.values[self.start + self.tag_index(code)]
+
+    def get_type(self):
+        return self.store.values[self.start]
+
+    def plain_tags(self):  # yield no app data and no xdata
+        codes = self.codes()
+        if max(codes, default=0) < 1000 and APP_DATA_MARKER not in codes:  # nothing to skip
+            return iter(self)
+        return Tags.plain_tags(self)
+
+    xdata = Tags.xdata
+    app_data = Tags.app_data
+    subclasses = Tags.subclasses
+    get_subclass = Tags.get_subclass
+
+    def groups(self, split_code=0):
+        """ Returns the views of the groups starting with a tag of group code split_code, like TagGroups. """
+        if split_code == 0:
+            splits = self.store.splits
+            starts = splits[bisect_left(splits, self.start):bisect_left(splits, self.end)].tolist()
+        else:
+            codes = self.store.codes
+            starts = [index for index in range(self.start, self.end) if codes[index] == split_code]
+        ends = starts[1:]
+        ends.append(self.end)
+        return [TagsView(self.store, start, end) for start, end in zip(starts, ends)]
+
+    def _indices(self, code):
+        codes = self.store.codes
+        return [index for index in range(self.start, self.end) if codes[index] == code]
+
+
 class TagGroups(list):
     """
     Group of tags starting with a SplitTag and ending before the next SplitTag.
@@ -288,7 +682,10 @@ class TagGroups(list):
     """
     def __init__(self, tags, split_code=0):
         super(TagGroups, self).__init__()
-        self._build_groups(tags, split_code)
+        if isinstance(tags, TagsView):  # groups are views of the same store
+            self.extend(tags.groups(split_code))
+        else:
+            self._build_groups(tags, split_code)
 
     def _build_groups(self, tags, splitcode):
         def append(tag):  # first do nothing, skip tags in front of the first split tag
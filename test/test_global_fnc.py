@@ -0,0 +1,238 @@
+# coding=utf-8
+"""Tests of the helpers of the DXF and CSV imports (global_fnc).
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'contact@geofoncier.fr'
+__date__ = '2026-10-18'
+__copyright__ = 'Copyright 2026, Geofoncier'
+
+import importlib
+import os
+import sys
+import unittest
+
+from qgis.PyQt.QtCore import QVariant
+from qgis.core import (QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsField, QgsGeometry,
+                       QgsPointXY, QgsProject, QgsRectangle, QgsVectorLayer)
+
+from utilities import get_qgis_app
+QGIS_APP = get_qgis_app()
+
+# The modules of the plugin use relative imports: the plugin is imported as a package
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+global_fnc = importlib.import_module(os.path.basename(PLUGIN_DIR) + '.global_fnc')
+
+
+def memory_layer(geom_type, fields, feats=()):
+    """ Memory layer of geom_type with fields [(name, QVariant type)] and feats [(geometry, attributes)]. """
+    lyr = QgsVectorLayer(geom_type + '?crs=EPSG:2154', 'test', 'memory')
+    lyr.dataProvider().addAttributes([QgsField(name, field_type) for name, field_type in fields])
+    lyr.updateFields()
+    for geom, atts in feats:
+        lyr.dataProvider().addFeatures([global_fnc.build_nw_feat(lyr, geom, atts)])
+    return lyr
+
+
+def identity_transform():
+    crs = QgsCoordinateReferenceSystem('EPSG:2154')
+    return QgsCoordinateTransform(crs, crs, QgsProject.instance())
+
+
+class VtxTolIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        l_vtx = memory_layer('Point', [('som_tolerance', QVariant.Double), ('@id_noeud', QVariant.Int)],
+                             [(QgsGeometry.fromPointXY(QgsPointXY(1.0, 2.0)), [0.05, 1])])
+        self.index = global_fnc.VtxTolIndex(l_vtx, identity_transform())
+
+    def test_tolerance_limit(self):
+        # distances rounded to mm, a point exactly at the tolerance is in the tolerance
+        for x, y in ((1.05, 2.0), (0.95, 2.0), (1.0, 2.05), (1.0, 1.95)):
+            near = self.index.find_near(QgsPointXY(x, y))
+            self.assertEqual([(vtx[2], vtx[3]) for vtx in near], [(1, 0.05)])
+        self.assertEqual(self.index.find_near(QgsPointXY(1.051, 2.0)), [])
+        self.assertEqual(self.index.find_near(QgsPointXY(1.0, 1.949)), [])
+
+    def test_cell_boundaries(self):
+        # points every mm across the cells around the vertex, same result as the check of all the vertices
+        vtx_pt = QgsPointXY(1.0, 2.0)
+        for i in range(-60, 61):
+            for pt in (QgsPointXY(1.0 + i / 1000.0, 2.0), QgsPointXY(1.0, 2.0 + i / 1000.0),
+                       QgsPointXY(1.0 + i / 1000.0, 2.0 + i / 1000.0)):
+                found = global_fnc.find_near(vtx_pt, pt, 0.05)[0]
+                self.assertEqual(len(self.index.find_near(pt)), 1 if found else 0, (pt.x(), pt.y()))
+
+    def test_add_larger_tolerance(self):
+        # the grid is rebuilt with larger cells
+        self.index.add(QgsPointXY(3.0, 2.0), 0.5)
+        self.assertEqual(self.index.cell_size, 0.501)
+        near = self.index.find_near(QgsPointXY(2.5, 2.0))
+        self.assertEqual([(vtx[0].x(), vtx[1], vtx[3]) for vtx in near], [(3.0, 0.5, 0.5)])
+
+    def test_layer_order(self):
+        self.index.add(QgsPointXY(1.02, 2.0), 0.05, 2)
+        self.index.add(QgsPointXY(0.98, 2.0), 0.05, 3)
+        near = self.index.find_near(QgsPointXY(1.0, 2.0))
+        self.assertEqual([vtx[2] for vtx in near], [1, 2, 3])
+
+
+class SegmentKeyTest(unittest.TestCase):
+
+    def test_direction(self):
+        pt1, pt2 = QgsPointXY(650000.123, 6860000.456), QgsPointXY(650010.0, 6859990.0)
+        self.assertEqual(global_fnc.segment_key(pt1, pt2, 3), global_fnc.segment_key(pt2, pt1, 3))
+
+    def test_rounding(self):
+        digit = global_fnc.dxf_dup_seg_digit
+        pt2 = QgsPointXY(10.0, 0.0)
+        key = global_fnc.segment_key(QgsPointXY(1.0, 2.0), pt2, digit)
+        self.assertEqual(key, ((1.0, 2.0), (10.0, 0.0)))
+        self.assertEqual(global_fnc.segment_key(pt2, QgsPointXY(1.0004, 1.9996), digit), key)
+        self.assertNotEqual(global_fnc.segment_key(QgsPointXY(1.0006, 2.0), pt2, digit), key)
+
+
+class BatchTransformTest(unittest.TestCase):
+
+    def test_same_as_transform(self):
+        coords_tr = QgsCoordinateTransform(QgsCoordinateReferenceSystem('EPSG:2154'),
+                                           QgsCoordinateReferenceSystem('EPSG:4326'), QgsProject.instance())
+        xys = [(650000.0, 6860000.0), (650010.5, 6860020.25), (650000.0, 6860000.0)]
+        batch = global_fnc.BatchTransform(coords_tr, xys)
+        self.assertEqual(len(batch.tr_pts), 2)
+        # the last point is not in the batch
+        for x, y in xys + [(651000.0, 6861000.0)]:
+            tr_pt = batch.transform(QgsPointXY(x, y))
+            expected = coords_tr.transform(QgsPointXY(x, y))
+            self.assertAlmostEqual(tr_pt.x(), expected.x(), 9)
+            self.assertAlmostEqual(tr_pt.y(), expected.y(), 9)
+        self.assertEqual(len(batch.tr_pts), 3)
+
+
+def line(*xys):
+    return QgsGeometry.fromPolylineXY([QgsPointXY(x, y) for x, y in xys])
+
+
+class EdgeIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.l_edge = memory_layer('LineString', [('@id_arc', QVariant.Int)],
+                                   [(line((0.0, 0.0), (10.0, 0.0)), [1]), (line((0.0, 50.0), (10.0, 50.0)), [2])])
+        self.index = global_fnc.EdgeIndex(self.l_edge)
+        self.report = global_fnc.ImportReport(identity_transform(), batch=True)
+
+    def check(self, nw_line):
+        return global_fnc.check_limit_cross(nw_line, self.l_edge, '99999', 'False', 'Limite privée', None, False,
+                                            self.index, self.report)
+
+    def conflicts(self):
+        return [tuple(conflict[:2]) for conflict in self.report.conflicts]
+
+    def test_candidates(self):
+        self.assertEqual([edge[1] for edge in self.index.candidates(line((5.0, -1.0), (5.0, 1.0)))], [1])
+        self.assertEqual(self.index.candidates(line((0.0, 20.0), (10.0, 20.0))), [])
+
+    def test_equal(self):
+        # same limit drawn in the other direction
+        self.assertFalse(self.check(line((10.0, 0.0), (0.0, 0.0))))
+        self.assertEqual(self.conflicts(), [(global_fnc.tl_ln_equ, global_fnc.txt_nwln_equ_rfu)])
+
+    def test_equal_new_limit(self):
+        # limit added to the index (no id_arc)
+        nw_feat = global_fnc.build_nw_feat(self.l_edge, line((0.0, 20.0), (10.0, 20.0)), [None])
+        self.index.add(nw_feat)
+        self.assertFalse(self.check(line((0.0, 20.0), (10.0, 20.0))))
+        self.assertEqual(self.conflicts(), [(global_fnc.tl_ln_equ, global_fnc.txt_nwln_equ)])
+
+    def test_crosses(self):
+        self.assertFalse(self.check(line((5.0, -1.0), (5.0, 1.0))))
+        self.assertEqual(self.conflicts(), [(global_fnc.tl_ln_ints, global_fnc.txt_nwln_ints_rfu)])
+
+    def test_touches(self):
+        # limits sharing a vertex or far from the limits are created
+        self.assertTrue(self.check(line((10.0, 0.0), (10.0, 50.0))))
+        self.assertTrue(self.check(line((0.0, 20.0), (10.0, 20.0))))
+        self.assertEqual(self.report.conflicts, [])
+
+
+class ImportReportTest(unittest.TestCase):
+
+    def test_batch(self):
+        report = global_fnc.ImportReport(identity_transform(), batch=True)
+        pt = QgsGeometry.fromPointXY(QgsPointXY(1.0, 2.0))
+        global_fnc.report_conflict(report, ('Titre', '<b>Texte</b>', 'Info'), pt, 12)
+        self.assertEqual(report.conflicts, [['Titre', '<b>Texte</b>', 'Info', pt, 12]])
+
+    def test_html_to_txt(self):
+        self.assertEqual(global_fnc.html_to_txt("<b>Point</b> proche<br/>du  RFU"), "Point proche du RFU")
+
+
+class ElimPtTest(unittest.TestCase):
+
+    def test_replace(self):
+        elim_pts = {}
+        rfu_pt, other_rfu_pt = QgsPointXY(650000.01, 6860000.02), QgsPointXY(650000.03, 6860000.0)
+        global_fnc.add_elim_pt(elim_pts, QgsPointXY(650000.0, 6860000.0), rfu_pt)
+        # the first RFU point found is kept
+        global_fnc.add_elim_pt(elim_pts, QgsPointXY(650000.0, 6860000.0), other_rfu_pt)
+        # same point as the eliminated point, up to the rounding (elim_pt_digit)
+        self.assertIs(global_fnc.replace_elim_pt(elim_pts, QgsPointXY(650000.000000001, 6860000.0)), rfu_pt)
+        pt = QgsPointXY(650000.0, 6860000.001)
+        self.assertIs(global_fnc.replace_elim_pt(elim_pts, pt), pt)
+
+
+class AddNwFeatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.lyr = memory_layer('Point', [('num', QVariant.Int)])
+        self.lyr.startEditing()
+
+    def tearDown(self):
+        self.lyr.rollBack()
+
+    def test_one_undo_step(self):
+        nw_feats = [global_fnc.build_nw_feat(self.lyr, QgsGeometry.fromPointXY(QgsPointXY(i, i)), [i])
+                    for i in range(3)]
+        global_fnc.add_nw_feats(self.lyr, nw_feats, global_fnc.imp_dxf_editcmd)
+        self.assertEqual(self.lyr.featureCount(), 3)
+        self.assertEqual(self.lyr.undoStack().count(), 1)
+        self.assertEqual(self.lyr.undoStack().text(0), global_fnc.imp_dxf_editcmd)
+        self.lyr.undoStack().undo()
+        self.assertEqual(self.lyr.featureCount(), 0)
+
+    def test_no_feature(self):
+        global_fnc.add_nw_feats(self.lyr, [], global_fnc.imp_dxf_editcmd)
+        self.assertEqual(self.lyr.undoStack().count(), 0)
+
+
+class WorkZoneExtentTest(unittest.TestCase):
+
+    def setUp(self):
+        self.canvas = QGIS_APP[1]
+        self.limit_area = QgsRectangle(2.35, 48.85, 2.36, 48.86)  # download in WGS84
+
+    def extent(self, epsg):
+        self.canvas.setDestinationCrs(QgsCoordinateReferenceSystem(epsg))
+        return global_fnc.work_zone_extent(self.limit_area, self.canvas, QgsProject.instance())
+
+    def test_current_crs(self):
+        # the CC zone is changed after the download: the work zone follows the CRS of the canvas
+        for epsg in ('EPSG:2154', 'EPSG:3949'):
+            coords_tr = QgsCoordinateTransform(QgsCoordinateReferenceSystem('EPSG:4326'),
+                                               QgsCoordinateReferenceSystem(epsg), QgsProject.instance())
+            center = coords_tr.transform(QgsPointXY(2.355, 48.855))
+            self.assertTrue(self.extent(epsg).contains(center), epsg)
+        self.assertFalse(self.extent('EPSG:3949').contains(self.extent('EPSG:2154')))
+
+    def test_no_download(self):
+        self.assertIsNone(global_fnc.work_zone_extent(None, self.canvas, QgsProject.instance()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,780 @@
+# coding=utf-8
+"""Tests of the sgmdxfparser DXF reader.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'contact@geofoncier.fr'
+__date__ = '2026-10-18'
+__copyright__ = 'Copyright 2026, Geofoncier'
+
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+from array import array
+from io import BytesIO, StringIO
+
+import sgmdxfparser
+from sgmdxfparser import cache, parallel
+from sgmdxfparser.cache import DrawingCache
+from sgmdxfparser.dxfentities import ocs_2_wcs_coords, ocs_2_wcs_xy
+from sgmdxfparser.entitysection import EntityIndex
+from sgmdxfparser.flatten import BlockFlattener
+from sgmdxfparser.streaming import iter_modelspace
+from sgmdxfparser.tags import (DXFTag, DXFStructureError, DXFParseCanceled, TagGroups, Tags, TagStore, BINARY_DXF_SENTINEL,
+                               MAX_GROUP_CODE, TYPES, binary_tagger, cast_table, cast_tag_value, stream_tagger, tostr)
+
+
+TAGS = u"""  0
+SECTION
+  2
+ENTITIES
+999
+a comment
+  0
+LINE
+  8
+LIM
+ 10
+1.5
+ 20
+2.5
+ 30
+0.0
+ 11
+3.0
+ 21
+4.0
+ 70
+1.0
+  0
+ENDSEC
+  0
+EOF
+"""
+
+
+class StreamTaggerTest(unittest.TestCase):
+    """Test the bulk tokenizer."""
+
+    def test_tags(self):
+        """Tags are cast, points merged and comments skipped."""
+        tags = list(stream_tagger(StringIO(TAGS)))
+        self.assertEqual(tags, [
+            DXFTag(0, 'SECTION'),
+            DXFTag(2, 'ENTITIES'),
+            DXFTag(0, 'LINE'),
+            DXFTag(8, 'LIM'),
+            DXFTag(10, (1.5, 2.5, 0.0)),
+            DXFTag(11, (3.0, 4.0)),
+            DXFTag(70, 1),
+            DXFTag(0, 'ENDSEC'),
+            DXFTag(0, 'EOF'),
+        ])
+
+    def test_block_boundaries(self):
+        """The result does not depend on the size of the blocks read."""
+        expected = list(stream_tagger(StringIO(TAGS)))
+        for block_size in (1, 2, 3, 7, 16):
+            self.assertEqual(list(stream_tagger(StringIO(TAGS), block_size=block_size)), expected)
+
+    def test_assure_3d_coords(self):
+        tags = list(stream_tagger(StringIO(TAGS), assure_3d_coords=True))
+        self.assertEqual(tags[5], DXFTag(11, (3.0, 4.0, 0.0)))
+
+    def test_missing_y_coordinate(self):
+        with self.assertRaises(DXFStructureError):
+            list(stream_tagger(StringIO(u" 10\n1.0\n 30\n2.0\n")))
+
+    def test_invalid_tag(self):
+        with self.assertRaises(DXFStructureError):
+            list(stream_tagger(StringIO(u" 40\nabc\n")))
+
+    def test_bytes_codepage(self):
+        """Binary streams are decoded with the $DWGCODEPAGE of the header."""
+        data = u"  9\r\n$ACADVER\r\n  1\r\nAC1015\r\n  9\r\n$DWGCODEPAGE\r\n  3\r\nANSI_1252\r\n" \
+               u"  8\r\nlimite \xe9paisse\r\n 40\r\n2.5\r\n".encode('cp1252')
+        tags = list(stream_tagger(BytesIO(data)))
+        self.assertEqual(tags[-2], DXFTag(8, u'limite \xe9paisse'))
+        self.assertEqual(tags[-1], DXFTag(40, 2.5))
+
+    def test_bytes_utf8(self):
+        """R2007+ binary streams are decoded as utf-8."""
+        data = u"  9\n$ACADVER\n  1\nAC1027\n  8\nlimite \xe9paisse\n".encode('utf-8')
+        tags = list(stream_tagger(BytesIO(data), block_size=5))
+        self.assertEqual(tags[-1], DXFTag(8, u'limite \xe9paisse'))
+
+
+ENTITY = u"""  0
+LINE
+  5
+2F
+102
+{ACAD_REACTORS
+330
+1F
+102
+}
+  8
+LIM
+ 10
+1.0
+ 20
+2.0
+ 11
+3.0
+ 21
+4.0
+1001
+APP
+1000
+data
+  0
+POINT
+  8
+0
+ 10
+5.0
+ 20
+6.0
+"""
+
+
+class TagsViewTest(unittest.TestCase):
+    """Test the columnar tag store and its views, against Tags."""
+
+    def setUp(self):
+        self.tags = Tags.from_text(ENTITY)
+        store = TagStore()
+        for tag in self.tags:
+            store.append(tag)
+        self.view = store.view()
+
+    def test_sequence(self):
+        self.assertEqual(list(self.view), list(self.tags))
+        self.assertEqual(len(self.view), len(self.tags))
+        self.assertEqual(self.view[2], self.tags[2])
+        self.assertEqual(self.view[-1], self.tags[-1])
+        self.assertEqual(list(self.view[1:-2]), self.tags[1:-2])
+        self.assertEqual(list(self.view[1:-2][1:3]), self.tags[2:4])
+
+    def test_groups(self):
+        groups = TagGroups(self.view)
+        self.assertEqual([list(group) for group in groups], [list(group) for group in TagGroups(self.tags)])
+        self.assertEqual(groups[1].get_type(), 'POINT')
+
+    def test_tags_interface(self):
+        line, point = TagGroups(self.view)
+        expected, _ = TagGroups(self.tags)
+        self.assertEqual(line.find_all(8), expected.find_all(8))
+        self.assertEqual(line.tag_index(10), expected.tag_index(10))
+        self.assertEqual(line.tag_index(11, 2, 8), expected.tag_index(11, 2, 8))
+        self.assertRaises(ValueError, line.tag_index, 40)
+        self.assertEqual(line.get_value(8), 'LIM')
+        self.assertRaises(ValueError, line.get_value, 40)
+        self.assertEqual(list(line.plain_tags()), list(expected.plain_tags()))
+        self.assertEqual(list(point.plain_tags()), list(point))
+        self.assertEqual(list(line.xdata()), list(expected.xdata()))
+        self.assertEqual(line.app_data(), expected.app_data())
+
+
+def dxf_text(*entities):
+    """DXF R12 text of a drawing with the given entities (lists of (code, value))."""
+    lines = ['0', 'SECTION', '2', 'HEADER', '9', '$ACADVER', '1', 'AC1009', '0', 'ENDSEC',
+             '0', 'SECTION', '2', 'ENTITIES']
+    for entity in entities:
+        for code, value in entity:
+            lines.extend((str(code), str(value)))
+    lines.extend(('0', 'ENDSEC', '0', 'EOF'))
+    return u'\n'.join(lines) + u'\n'
+
+
+def line(layer, x=0.0):
+    return [(0, 'LINE'), (8, layer), (10, x), (20, 0.0), (30, 0.0), (11, x + 1.0), (21, 1.0), (31, 0.0)]
+
+
+def insert(layer, name='SOM', attribs=False):
+    entity = [(0, 'INSERT'), (8, layer), (2, name), (10, 1.0), (20, 2.0), (30, 0.0)]
+    if attribs:
+        entity.extend([(66, 1),
+                       (0, 'ATTRIB'), (8, layer), (10, 1.0), (20, 2.0), (30, 0.0), (40, 1.0), (1, 'A'), (2, 'NUM'),
+                       (0, 'SEQEND'), (8, layer)])
+    return entity
+
+
+def polyline(layer):
+    return [(0, 'POLYLINE'), (8, layer), (66, 1), (10, 0.0), (20, 0.0), (30, 0.0),
+            (0, 'VERTEX'), (8, layer), (10, 1.0), (20, 1.0), (30, 0.0),
+            (0, 'VERTEX'), (8, layer), (10, 2.0), (20, 1.0), (30, 0.0),
+            (0, 'SEQEND'), (8, layer)]
+
+
+class EntityFilterTest(unittest.TestCase):
+    """Test the layer_filter and dxftype_filter options of Drawing."""
+
+    TEXT = dxf_text(line('LIM'), polyline('LIM'), insert('SOM', attribs=True),
+                    line('AUTRE'), insert('AUTRE', attribs=True), polyline('AUTRE'), insert('SOM'))
+
+    def entities(self, **options):
+        dwg = sgmdxfparser.read(StringIO(self.TEXT), options)
+        return [(entity.dxftype, entity.layer) for entity in dwg.entities]
+
+    def test_no_filter(self):
+        self.assertEqual(len(self.entities()), 7)
+
+    def test_layer_filter(self):
+        self.assertEqual(self.entities(layer_filter=['LIM', 'SOM']), [
+            ('LINE', 'LIM'), ('POLYLINE', 'LIM'), ('INSERT', 'SOM'), ('INSERT', 'SOM')])
+
+    def test_dxftype_filter(self):
+        self.assertEqual(self.entities(dxftype_filter=['INSERT']), [
+            ('INSERT', 'SOM'), ('INSERT', 'AUTRE'), ('INSERT', 'SOM')])
+
+    def test_both_filters(self):
+        self.assertEqual(self.entities(layer_filter=['AUTRE'], dxftype_filter=['INSERT', 'POLYLINE']), [
+            ('INSERT', 'AUTRE'), ('POLYLINE', 'AUTRE')])
+
+    def test_followers_are_kept(self):
+        dwg = sgmdxfparser.read(StringIO(self.TEXT), {'dxftype_filter': ['POLYLINE', 'INSERT']})
+        polyline, insert = list(dwg.entities)[:2]
+        self.assertEqual(len(polyline.points), 2)
+        self.assertEqual([attrib.tag for attrib in insert.attribs], ['NUM'])
+
+
+class ExtentFilterTest(unittest.TestCase):
+    """Test the extent and extent_margin options of Drawing."""
+
+    LWPOLYLINE = [(0, 'LWPOLYLINE'), (8, 'LIM'), (90, 2), (10, 30.0), (20, 0.0), (10, 40.0), (20, 0.0)]
+    TEXT = dxf_text(line('LIM', 0.0), line('LIM', 10.0), insert('SOM', attribs=True), polyline('LIM'), LWPOLYLINE)
+
+    def entities(self, **options):
+        dwg = sgmdxfparser.read(StringIO(self.TEXT), options)
+        return [(entity.dxftype, entity.layer) for entity in dwg.entities]
+
+    def test_extent(self):
+        # POLYLINE entities are not filtered, the insert point (1, 2) and the first line are outside
+        self.assertEqual(self.entities(extent=(5.0, -1.0, 20.0, 2.0)), [('LINE', 'LIM'), ('POLYLINE', 'LIM')])
+
+    def test_extent_margin(self):
+        self.assertEqual(self.entities(extent=(5.0, -1.0, 20.0, 2.0), extent_margin=10.0), [
+            ('LINE', 'LIM'), ('LINE', 'LIM'), ('INSERT', 'SOM'), ('POLYLINE', 'LIM'), ('LWPOLYLINE', 'LIM')])
+
+    def test_crossing_entity(self):
+        # no point of the polyline inside the extent, but its bounds overlap
+        self.assertEqual(self.entities(extent=(34.0, -1.0, 35.0, 1.0)), [('POLYLINE', 'LIM'), ('LWPOLYLINE', 'LIM')])
+
+    def test_ocs_entity_is_kept(self):
+        text = dxf_text(self.LWPOLYLINE + [(210, 0.0), (220, 0.0), (230, -1.0)])
+        dwg = sgmdxfparser.read(StringIO(text), {'extent': (-40.0, -1.0, -30.0, 1.0)})
+        self.assertEqual(len(dwg.entities), 1)
+
+    def test_iter_modelspace(self):
+        options = {'extent': (5.0, -1.0, 20.0, 2.0), 'dxftype_filter': ['LINE', 'INSERT']}
+        entities = list(iter_modelspace(StringIO(self.TEXT), options))
+        self.assertEqual([entity.start[0] for entity in entities], [10.0])
+
+
+class SlotsTest(unittest.TestCase):
+    """Test the __slots__ based entity classes."""
+
+    def test_no_instance_dict(self):
+        dwg = sgmdxfparser.read(StringIO(EntityFilterTest.TEXT))
+        for entity in dwg.entities:
+            self.assertFalse(hasattr(entity, '__dict__'), entity.dxftype)
+
+    def test_polyface(self):
+        face = [(0, 'POLYLINE'), (8, 'LIM'), (66, 1), (10, 0.0), (20, 0.0), (30, 0.0), (70, 64)]
+        for x, y in ((0.0, 0.0), (1.0, 0.0), (1.0, 1.0)):
+            face.extend([(0, 'VERTEX'), (8, 'LIM'), (10, x), (20, y), (30, 0.0), (70, 192)])
+        face.extend([(0, 'VERTEX'), (8, 'LIM'), (10, 0.0), (20, 0.0), (30, 0.0), (70, 128),
+                     (71, 1), (72, 2), (73, 3), (0, 'SEQEND')])
+        polyface = list(sgmdxfparser.read(StringIO(dxf_text(face))).entities)[0]
+        self.assertEqual(polyface.dxftype, 'POLYFACE')
+        self.assertEqual(polyface.layer, 'LIM')
+        self.assertEqual([list(subface) for subface in polyface], [[(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (1.0, 1.0, 0.0)]])
+
+
+class LWPolylineCoordsTest(unittest.TestCase):
+    """Test the array based LWPolyline coordinates."""
+
+    def lwpolyline(self, *extra):
+        entity = [(0, 'LWPOLYLINE'), (8, 'LIM'), (90, 3), (70, 1), (38, 2.0),
+                  (10, 1.0), (20, 2.0), (42, 0.5), (10, 3.0), (20, 4.0), (40, 1.0), (41, 2.0), (10, 5.0), (20, 6.0)]
+        return list(sgmdxfparser.read(StringIO(dxf_text(entity + list(extra)))).entities)[0]
+
+    def test_coords(self):
+        lwpolyline = self.lwpolyline()
+        self.assertEqual(list(lwpolyline.coords), [1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+        self.assertEqual(lwpolyline.points, [(1.0, 2.0), (3.0, 4.0), (5.0, 6.0)])
+        self.assertEqual(list(lwpolyline.bulge), [0.5, 0.0, 0.0])
+        self.assertEqual(lwpolyline.width, [(0.0, 0.0), (1.0, 2.0), (0.0, 0.0)])
+        self.assertEqual(len(lwpolyline), 3)
+        self.assertTrue(lwpolyline.is_closed)
+
+    def test_extrusion(self):
+        lwpolyline = self.lwpolyline((210, 0.0), (220, 0.0), (230, -1.0))
+        self.assertEqual(lwpolyline.points, [(-1.0, 2.0), (-3.0, 4.0), (-5.0, 6.0)])
+
+    def test_extrusion_elevation(self):
+        # OCS axes of (0.6, 0, 0.8): x (0, 1, 0), y (-0.8, 0, 0.6), the elevation (2.0) moves the points along z
+        lwpolyline = self.lwpolyline((210, 0.6), (220, 0.0), (230, 0.8))
+        for (x, y), (ex, ey) in zip(lwpolyline.points, [(-0.4, 1.0), (-2.0, 3.0), (-3.6, 5.0)]):
+            self.assertAlmostEqual(x, ex)
+            self.assertAlmostEqual(y, ey)
+        self.assertEqual(lwpolyline.ndim, 2)
+
+    def test_extrusion_not_unit(self):
+        # the extrusion vector is normalized
+        lwpolyline = self.lwpolyline((210, 3.0), (220, 0.0), (230, 4.0))
+        self.assertAlmostEqual(lwpolyline.points[0][0], -0.4)
+        self.assertAlmostEqual(lwpolyline.points[0][1], 1.0)
+
+    def test_ocs_2_wcs_coords_3d(self):
+        # the z of each point is used instead of the elevation
+        coords = ocs_2_wcs_coords(array('d', [1.0, 2.0, 2.0, 3.0, 4.0, -1.0]), 3, 5.0, (0.6, 0.0, 0.8))
+        for value, expected in zip(coords, [-0.4, 1.0, -3.8, 3.0]):
+            self.assertAlmostEqual(value, expected)
+
+    def test_ocs_2_wcs_coords(self):
+        points = [(1.0, 2.0), (3.0, -4.0)]
+        for n_vector in ((0.0, 0.0, -1.0), (0.6, 0.0, 0.8), (0.0, 0.6, 0.8)):
+            coords = ocs_2_wcs_coords(array('d', [1.0, 2.0, 3.0, -4.0]), 2, 5.0, n_vector)
+            expected = [ocs_2_wcs_xy(point, 5.0, n_vector) for point in points]
+            for (x, y), (ex, ey) in zip(zip(coords[0::2], coords[1::2]), expected):
+                self.assertAlmostEqual(x, ex)
+                self.assertAlmostEqual(y, ey)
+
+
+def binary_dxf(tags, one_byte_codes=False, encoding='cp1252'):
+    """Binary DXF data of tags (list of (code, value)), value types are found from the python type."""
+    data = [BINARY_DXF_SENTINEL]
+    for code, value in tags:
+        if not one_byte_codes:
+            data.append(struct.pack('<H', code))
+        elif code < 255:
+            data.append(struct.pack('<B', code))
+        else:
+            data.append(struct.pack('<BH', 255, code))
+        if isinstance(value, float):
+            data.append(struct.pack('<d', value))
+        elif isinstance(value, bool):
+            data.append(struct.pack('<B', value))
+        elif isinstance(value, int):
+            data.append(struct.pack('<i' if 90 <= code < 100 or code == 1071 else '<h', value))
+        elif isinstance(value, bytes):
+            data.append(struct.pack('<B', len(value)) + value)
+        else:
+            data.append(value.encode(encoding) + b'\x00')
+    return b''.join(data)
+
+
+BINARY_TAGS = [(0, 'SECTION'), (2, 'HEADER'), (9, '$ACADVER'), (1, 'AC1015'), (9, '$DWGCODEPAGE'), (1, 'ANSI_1252'),
+               (0, 'ENDSEC'), (0, 'SECTION'), (2, 'ENTITIES'),
+               (0, 'LWPOLYLINE'), (8, u'limite \xe9paisse'), (90, 2), (70, 1), (10, 1.0), (20, 2.0), (10, 3.0), (20, 4.0),
+               (0, 'INSERT'), (8, 'SOM'), (2, 'B1'), (10, 5.0), (20, 6.0), (30, 0.0), (290, True),
+               (310, b'\x01\xab'), (1071, 7),
+               (0, 'ENDSEC'), (0, 'EOF')]
+
+
+class BinaryTaggerTest(unittest.TestCase):
+    """Test the binary DXF reader."""
+
+    def test_tags(self):
+        tags = list(binary_tagger(binary_dxf(BINARY_TAGS)))
+        self.assertEqual(tags[9:12], [DXFTag(0, 'LWPOLYLINE'), DXFTag(8, u'limite \xe9paisse'), DXFTag(90, 2)])
+        self.assertEqual(tags[13:15], [DXFTag(10, (1.0, 2.0)), DXFTag(10, (3.0, 4.0))])
+        self.assertEqual(tags[18:], [DXFTag(10, (5.0, 6.0, 0.0)), DXFTag(290, 1), DXFTag(310, '01AB'),
+                                     DXFTag(1071, 7), DXFTag(0, 'ENDSEC'), DXFTag(0, 'EOF')])
+
+    def test_one_byte_codes(self):
+        tags = [(0, 'SECTION'), (2, 'ENTITIES'), (0, 'POINT'), (10, 1.0), (20, 2.0), (1071, 3), (0, 'ENDSEC')]
+        expected = list(binary_tagger(binary_dxf(tags)))
+        self.assertEqual(list(binary_tagger(binary_dxf(tags, one_byte_codes=True))), expected)
+
+    def test_truncated(self):
+        with self.assertRaises(DXFStructureError):
+            list(binary_tagger(binary_dxf(BINARY_TAGS)[:-20]))
+
+    def test_read(self):
+        dwg = sgmdxfparser.read(BytesIO(binary_dxf(BINARY_TAGS)))
+        lwpolyline, insert = dwg.entities
+        self.assertEqual(dwg.dxfversion, 'AC1015')
+        self.assertEqual(lwpolyline.layer, u'limite \xe9paisse')
+        self.assertEqual(lwpolyline.points, [(1.0, 2.0), (3.0, 4.0)])
+        self.assertEqual((insert.name, insert.insert), ('B1', (5.0, 6.0, 0.0)))
+
+
+class IterModelspaceTest(unittest.TestCase):
+    """Test the streaming modelspace iterator."""
+
+    TEXT = dxf_text(line('LIM'), polyline('LIM'), line('LIM', x=5.0) + [(67, 1)], insert('SOM', attribs=True))
+
+    def test_same_as_drawing(self):
+        dwg = sgmdxfparser.read(StringIO(self.TEXT))
+        expected = [(entity.dxftype, entity.layer, entity.paperspace) for entity in dwg.modelspace()]
+        entities = [(entity.dxftype, entity.layer, entity.paperspace)
+                    for entity in iter_modelspace(StringIO(self.TEXT))]
+        self.assertEqual(entities, expected)
+        self.assertEqual(len(entities), 3)
+
+    def test_collected_entities(self):
+        polyline, insert = list(iter_modelspace(StringIO(self.TEXT)))[1:]
+        self.assertEqual(len(polyline.points), 2)
+        self.assertEqual([attrib.tag for attrib in insert.attribs], ['NUM'])
+
+    def test_filter(self):
+        entities = iter_modelspace(BytesIO(self.TEXT.encode('cp1252')), {'dxftype_filter': ['INSERT']})
+        self.assertEqual([entity.dxftype for entity in entities], ['INSERT'])
+
+
+class CastTest(unittest.TestCase):
+    """Test the dense cast table of the group codes."""
+
+    def test_table(self):
+        table = cast_table()
+        self.assertEqual(len(table), MAX_GROUP_CODE + 1)
+        expected = [tostr] * (MAX_GROUP_CODE + 1)
+        for caster, codes in TYPES:
+            for code in codes:
+                expected[code] = caster
+        self.assertEqual(table, expected)
+
+    def test_ranges(self):
+        self.assertEqual(cast_tag_value(8, 'LIM'), 'LIM')
+        self.assertEqual(cast_tag_value(40, '2.5'), 2.5)
+        self.assertEqual(cast_tag_value(40, 'inf'), float('inf'))
+        self.assertEqual(cast_tag_value(70, ' 1'), 1)
+        self.assertEqual(cast_tag_value(330, '1F'), '1F')
+        self.assertEqual(cast_tag_value(1000, 'text'), 'text')
+        self.assertEqual(cast_tag_value(1040, '0.5'), 0.5)
+        self.assertEqual(cast_tag_value(MAX_GROUP_CODE, '3'), 3)
+
+    def test_int_from_float(self):
+        # malformed integer values written as floats
+        self.assertEqual(cast_tag_value(70, '1.0'), 1)
+        self.assertEqual(cast_tag_value(62, '256.000'), 256)
+        with self.assertRaises(ValueError):
+            cast_tag_value(70, 'x')
+        with self.assertRaises(ValueError):
+            cast_tag_value(40, 'x')
+
+    def test_out_of_table(self):
+        self.assertEqual(cast_tag_value(MAX_GROUP_CODE + 1, '12'), '12')
+        self.assertEqual(cast_tag_value(5000, '12'), '12')
+        self.assertEqual(cast_tag_value(-1, '12'), '12')
+
+
+class ParallelReadTest(unittest.TestCase):
+    """Test the parallel option of Drawing."""
+
+    ENTITIES = [line('LIM', x=float(i)) for i in range(20)] + [polyline('LIM'), insert('SOM', attribs=True)] * 10
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, 'test.dxf')
+        with open(self.filename, 'wb') as fp:
+            fp.write(dxf_text(*self.ENTITIES).replace(u'\n', u'\r\n').encode('cp1252'))
+        self.min_part_size = parallel.MIN_PART_SIZE
+        parallel.MIN_PART_SIZE = 200  # split the ENTITIES section
+
+    def tearDown(self):
+        parallel.MIN_PART_SIZE = self.min_part_size
+        shutil.rmtree(self.tempdir)
+
+    def entities(self, **options):
+        dwg = sgmdxfparser.readfile(self.filename, options)
+        return [(entity.dxftype, entity.layer, getattr(entity, 'start', None), len(getattr(entity, 'points', ())),
+                 len(getattr(entity, 'attribs', ()))) for entity in dwg.entities]
+
+    def test_same_as_sequential(self):
+        expected = self.entities()
+        self.assertEqual(self.entities(parallel=2), expected)
+        self.assertEqual(len(expected), 40)
+
+    def test_filter(self):
+        self.assertEqual(self.entities(parallel=2, dxftype_filter=['INSERT']),
+                         self.entities(dxftype_filter=['INSERT']))
+
+    def test_parts(self):
+        with open(self.filename, 'rb') as fp:
+            data = fp.read()
+        name, start, end = parallel.section_ranges(data)[1]
+        tasks = parallel.section_tasks(data, name, start, end, 2)
+        self.assertEqual(name, 'ENTITIES')
+        self.assertGreater(len(tasks), 2)
+        self.assertEqual((tasks[0][1], tasks[-1][2]), (start, end))
+        for task, next_task in zip(tasks, tasks[1:]):
+            self.assertEqual(task[2], next_task[1])
+            self.assertNotIn(data[next_task[1]:next_task[1] + 12].split()[1], (b'VERTEX', b'ATTRIB', b'SEQEND'))
+
+
+class EntityIndexTest(unittest.TestCase):
+    """Test the index of the entities by layer and type."""
+
+    TEXT = dxf_text(line('LIM'), insert('VTX', name='B1'), polyline('LIM'), line('LIM', x=2.0) + [(67, 1)],
+                    insert('VTX', name='B2'), line('AUTRE'), insert('AUTRE', name='B1'), line('LIM', x=3.0))
+
+    def setUp(self):
+        self.dwg = sgmdxfparser.read(StringIO(self.TEXT))
+        self.index = self.dwg.entity_index()
+
+    def test_get(self):
+        self.assertEqual([entity.start[0] for entity in self.index.get('LIM', 'LINE')], [0.0, 3.0])  # modelspace
+        self.assertEqual(self.index.get('LIM', 'INSERT'), [])
+        self.assertIs(self.dwg.entity_index(), self.index)
+
+    def test_query_keeps_order(self):
+        entities = self.index.query('LIM', ('POLYLINE', 'LINE'))
+        self.assertEqual([entity.dxftype for entity in entities], ['LINE', 'POLYLINE', 'LINE'])
+
+    def test_inserts(self):
+        self.assertEqual([entity.layer for entity in self.index.get_inserts('B1')], ['VTX', 'AUTRE'])
+        self.assertEqual([entity.name for entity in self.index.get_inserts('B2', 'VTX')], ['B2'])
+        self.assertEqual(EntityIndex(self.dwg.entities).get_inserts('B3'), [])
+
+
+class LazyBlocksTest(unittest.TestCase):
+    """Test the on demand build of the block entities."""
+
+    TEXT = dxf_text(insert('SOM', name='B1')).replace(u'ENTITIES', u'\n'.join([
+        'BLOCKS', '0', 'BLOCK', '8', '0', '2', 'B1', '70', '0', '10', '0.0', '20', '0.0', '30', '0.0',
+        '0', 'LINE', '8', '0', '10', '0.0', '20', '0.0', '30', '0.0', '11', '1.0', '21', '1.0', '31', '0.0',
+        '0', 'TEXT', '8', '0', '10', '0.0', '20', '0.0', '30', '0.0', '40', '1.0', '1', 'A',
+        '0', 'ENDBLK', '8', '0', '0', 'ENDSEC', '0', 'SECTION', '2', 'ENTITIES']))
+
+    def test_lazy_block(self):
+        dwg = sgmdxfparser.read(StringIO(self.TEXT))
+        block = dwg.blocks['B1']
+        self.assertEqual(block.name, 'B1')
+        self.assertFalse(block.entities_loaded())
+        self.assertEqual([entity.dxftype for entity in block], ['LINE', 'TEXT'])
+        self.assertTrue(block.entities_loaded())
+        self.assertEqual(block[1].font, 'Arial')  # default text style resolved when the block is built
+        self.assertEqual([entity.dxftype for entity in dwg.entities], ['INSERT'])
+
+
+def block(name, basepoint, *entities):
+    tags = [(0, 'BLOCK'), (8, '0'), (2, name), (70, 0), (10, basepoint[0]), (20, basepoint[1]), (30, 0.0)]
+    for entity in entities:
+        tags.extend(entity)
+    return tags + [(0, 'ENDBLK'), (8, '0')]
+
+
+def blocks_text(blocks, *entities):
+    """DXF R12 text of a drawing with the given blocks (lists of (code, value)) and entities."""
+    lines = ['BLOCKS']
+    for code, value in [tag for tags in blocks for tag in tags]:
+        lines.extend((str(code), str(value)))
+    lines.extend(('0', 'ENDSEC', '0', 'SECTION', '2', 'ENTITIES'))
+    return dxf_text(*entities).replace(u'ENTITIES', u'\n'.join(lines))
+
+
+def placed(layer, name, x, y, rotation=0.0, scale=1.0):
+    return [(0, 'INSERT'), (8, layer), (2, name), (10, x), (20, y), (30, 0.0), (41, scale), (42, scale), (50, rotation)]
+
+
+class FlattenBlocksTest(unittest.TestCase):
+    """Test the flatten_blocks option of iter_modelspace and BlockFlattener."""
+
+    BLOCKS = [
+        block('SOM', (0.0, 0.0), [(0, 'LINE'), (8, '0'), (10, -1.0), (20, 0.0), (11, 1.0), (21, 0.0)]),
+        block('PARCEL', (10.0, 0.0), placed('VTX', 'SOM', 10.0, 0.0), placed('0', 'SOM', 12.0, 0.0, rotation=90.0),
+              [(0, 'LWPOLYLINE'), (8, 'LIM'), (90, 2), (10, 10.0), (20, 0.0), (10, 12.0), (20, 0.0)]),
+    ]
+    TEXT = blocks_text(BLOCKS, placed('BATI', 'PARCEL', 100.0, 50.0, rotation=90.0, scale=2.0),
+                       placed('BATI', 'PARCEL', 0.0, 0.0))
+
+    def flat(self, entity):
+        if entity.dxftype == 'INSERT':
+            points = [entity.insert[:2]]
+        elif entity.dxftype == 'LINE':
+            points = [entity.start[:2], entity.end[:2]]
+        else:
+            points = entity.points
+        return entity.dxftype, entity.layer, [(round(x, 6) + 0.0, round(y, 6) + 0.0) for x, y in points]
+
+    def test_nested_blocks(self):
+        entities = list(iter_modelspace(StringIO(self.TEXT), {'flatten_blocks': True}))
+        self.assertEqual([self.flat(entity) for entity in entities[:6]], [
+            ('INSERT', 'BATI', [(100.0, 50.0)]),
+            ('INSERT', 'VTX', [(100.0, 50.0)]),
+            ('LINE', 'VTX', [(100.0, 48.0), (100.0, 52.0)]),
+            ('INSERT', 'BATI', [(100.0, 54.0)]),
+            ('LINE', 'BATI', [(102.0, 54.0), (98.0, 54.0)]),  # rotated by 180
+            ('LWPOLYLINE', 'LIM', [(100.0, 50.0), (100.0, 54.0)]),
+        ])
+        self.assertEqual(len(entities), 12)
+        self.assertEqual([self.flat(entity) for entity in entities[6:8]], [
+            ('INSERT', 'BATI', [(0.0, 0.0)]), ('INSERT', 'VTX', [(0.0, 0.0)])])
+
+    def test_inserts_placement(self):
+        entities = list(iter_modelspace(StringIO(self.TEXT), {'flatten_blocks': True}))
+        som, nested_som = entities[1], entities[3]
+        self.assertAlmostEqual(360.0 - som.rotation, 90.0)
+        self.assertAlmostEqual(360.0 - nested_som.rotation, 180.0)
+        self.assertAlmostEqual(som.scale_x, 2.0)
+        self.assertAlmostEqual(som.scale_y, 2.0)
+
+    def test_filters(self):
+        options = {'flatten_blocks': True, 'layer_filter': ['LIM', 'VTX'], 'dxftype_filter': ['LWPOLYLINE', 'INSERT']}
+        entities = [self.flat(entity) for entity in iter_modelspace(StringIO(self.TEXT), options)]
+        self.assertEqual(entities, [
+            ('INSERT', 'VTX', [(100.0, 50.0)]), ('LWPOLYLINE', 'LIM', [(100.0, 50.0), (100.0, 54.0)]),
+            ('INSERT', 'VTX', [(0.0, 0.0)]), ('LWPOLYLINE', 'LIM', [(0.0, 0.0), (2.0, 0.0)])])
+
+    def test_no_flatten(self):
+        entities = list(iter_modelspace(StringIO(self.TEXT)))
+        self.assertEqual([entity.name for entity in entities], ['PARCEL', 'PARCEL'])
+
+    def test_block_flattened_once(self):
+        dwg = sgmdxfparser.read(StringIO(self.TEXT))
+        flattener = BlockFlattener(dwg.blocks)
+        first, second = [flattener.flatten(insert) for insert in dwg.entities]
+        self.assertEqual(len(first), len(second))
+        parcel = dwg.blocks['PARCEL']
+        self.assertIs(flattener.block_entities(parcel), flattener.block_entities(parcel))
+        self.assertEqual(sorted(flattener._flattened), ['PARCEL', 'SOM'])
+
+    def test_extrusion_and_recursion(self):
+        text = blocks_text([block('B', (0.0, 0.0), [(0, 'POINT'), (8, '0'), (10, 1.0), (20, 0.0)], placed('0', 'B', 0, 0))],
+                           placed('0', 'B', 5.0, 0.0) + [(210, 0.0), (220, 0.0), (230, -1.0)])
+        entities = list(iter_modelspace(StringIO(text), {'flatten_blocks': True}))
+        self.assertEqual([entity.dxftype for entity in entities], ['INSERT', 'POINT', 'INSERT'])
+        self.assertEqual(entities[1].point[:2], (-6.0, 0.0))
+
+
+class ProbeTest(unittest.TestCase):
+    """Test sgmdxfparser.probe()."""
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, 'test.dxf')
+        with open(self.filename, 'w') as fp:
+            fp.write(LazyBlocksTest.TEXT.replace(u'ENTITIES\n', u'ENTITIES\n' + u'\n'.join(
+                u'{}\n{}'.format(code, value) for entity in (line('LIM'), line('LIM', x=5.0), polyline('LIM'),
+                                                           line('LIM', x=9.0) + [(67, 1)], insert('VTX', attribs=True))
+                for code, value in entity) + u'\n'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_probe(self):
+        dxf_probe = sgmdxfparser.probe(self.filename)
+        self.assertEqual(dxf_probe.counts, {('LIM', 'LINE'): 2, ('LIM', 'POLYLINE'): 1,
+                                            ('VTX', 'INSERT'): 1, ('SOM', 'INSERT'): 1})
+        self.assertEqual(dxf_probe.layer_counts('LIM'), {'LINE': 2, 'POLYLINE': 1})
+        self.assertEqual(dxf_probe.bboxes[('LIM', 'LINE')], [0.0, 0.0, 6.0, 1.0])
+        self.assertEqual(dxf_probe.bboxes[('LIM', 'POLYLINE')], [1.0, 1.0, 2.0, 1.0])  # its vertices
+        self.assertEqual(dxf_probe.bbox(dxftypes=['INSERT']), (1.0, 2.0, 1.0, 2.0))
+        self.assertEqual([block.name for block in dxf_probe.blocks], ['B1'])
+        self.assertEqual(len(dxf_probe.blocks[0]), 0)
+
+    def test_location_bboxes(self):
+        # elevation points, directions and tangents are not locations
+        x, y = 650000.0, 6860000.0
+        text = dxf_text(
+            [(0, 'POLYLINE'), (8, 'LIM'), (66, 1), (10, 0.0), (20, 0.0), (30, 5.0),
+             (0, 'VERTEX'), (8, 'LIM'), (10, x), (20, y), (30, 0.0),
+             (0, 'VERTEX'), (8, 'LIM'), (10, x + 10.0), (20, y + 5.0), (30, 0.0),
+             (0, 'SEQEND'), (8, 'LIM')],
+            [(0, 'HATCH'), (8, 'NOISE'), (10, 0.0), (20, 0.0), (30, 0.0), (2, 'SOLID'), (70, 1), (71, 0), (91, 1),
+             (92, 2), (72, 0), (73, 1), (93, 3), (10, x), (20, y), (10, x + 4.0), (20, y), (10, x + 4.0), (20, y + 2.0),
+             (97, 0), (75, 0), (76, 1), (98, 0)],
+            [(0, 'MTEXT'), (8, 'NOISE'), (10, x + 1.0), (20, y + 1.0), (30, 0.0), (11, 1.0), (21, 0.0), (31, 0.0),
+             (1, 'T')],
+            [(0, 'SPLINE'), (8, 'NOISE'), (70, 8), (71, 3), (12, 1.0), (22, 0.0), (32, 0.0), (13, 0.0), (23, 1.0),
+             (33, 0.0), (10, x), (20, y - 1.0), (30, 0.0), (10, x + 3.0), (20, y), (30, 0.0)])
+        with open(self.filename, 'w') as fp:
+            fp.write(text)
+        dxf_probe = sgmdxfparser.probe(self.filename)
+        self.assertEqual(dxf_probe.bboxes[('LIM', 'POLYLINE')], [x, y, x + 10.0, y + 5.0])
+        self.assertEqual(dxf_probe.bboxes[('NOISE', 'HATCH')], [x, y, x + 4.0, y + 2.0])
+        self.assertEqual(dxf_probe.bboxes[('NOISE', 'MTEXT')], [x + 1.0, y + 1.0, x + 1.0, y + 1.0])
+        self.assertEqual(dxf_probe.bboxes[('NOISE', 'SPLINE')], [x, y - 1.0, x + 3.0, y])
+
+    def test_same_counts_as_drawing(self):
+        dwg = sgmdxfparser.readfile(self.filename)
+        counts = {}
+        for entity in dwg.modelspace():
+            counts[(entity.layer, entity.dxftype)] = counts.get((entity.layer, entity.dxftype), 0) + 1
+        self.assertEqual(sgmdxfparser.probe(self.filename).counts, counts)
+
+
+class ProgressTest(unittest.TestCase):
+    """Test the progress and cancel options."""
+
+    TEXT = dxf_text(*[line('LIM', x=float(i)) for i in range(100)])
+
+    def test_progress(self):
+        sizes = []
+        data = self.TEXT.encode('cp1252')
+        sgmdxfparser.read(BytesIO(data), {'progress': lambda size, total: sizes.append(size)})
+        self.assertEqual(sizes[-1], len(data))
+        self.assertEqual(sizes, sorted(sizes))
+
+    def test_cancel(self):
+        calls = []
+
+        def cancel():
+            calls.append(1)
+            return len(calls) > 10  # canceled while the entities are built
+
+        with self.assertRaises(DXFParseCanceled):
+            sgmdxfparser.read(StringIO(self.TEXT), {'cancel': cancel})
+        with self.assertRaises(DXFParseCanceled):
+            list(iter_modelspace(StringIO(self.TEXT), {'cancel': lambda: True}))
+
+
+class DrawingCacheTest(unittest.TestCase):
+    """Test the on-disk cache of parsed drawings."""
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, 'test.dxf')
+        self.write(dxf_text(line('LIM'), insert('SOM')))
+        self.cache = DrawingCache(os.path.join(self.tempdir, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def write(self, text):
+        with open(self.filename, 'w') as fp:
+            fp.write(text)
+
+    def test_hit(self):
+        options = {'dxftype_filter': ['LINE']}
+        dwg = self.cache.readfile(self.filename, options)
+        self.assertTrue(os.path.exists(self.cache.entry_path('drawing', self.filename, options)))
+        cached = self.cache.readfile(self.filename, {'dxftype_filter': ('LINE',)})
+        self.assertEqual([entity.dxftype for entity in cached.entities], ['LINE'])
+        self.assertEqual([layer.name for layer in cached.layers], [layer.name for layer in dwg.layers])
+
+    def test_changed_file(self):
+        self.assertEqual(len(self.cache.iterfile(self.filename)), 2)
+        self.write(dxf_text(line('LIM'), line('LIM', x=2.0), insert('SOM')))
+        self.assertEqual(len(self.cache.iterfile(self.filename)), 3)
+
+    def test_format_in_key(self):
+        path = self.cache.entry_path('drawing', self.filename)
+        fmt = cache.CACHE_FORMAT
+        cache.CACHE_FORMAT += 1
+        try:
+            self.assertNotEqual(self.cache.entry_path('drawing', self.filename), path)
+        finally:
+            cache.CACHE_FORMAT = fmt
+
+    def test_eviction(self):
+        self.cache.max_size = 1
+        self.cache.iterfile(self.filename)
+        self.cache.iterfile(self.filename, {'dxftype_filter': ['LINE']})
+        self.assertEqual(os.listdir(self.cache.directory), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
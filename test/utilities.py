@@ -23,10 +23,9 @@ def get_qgis_app():
     """
 
     try:
-        from PyQt4 import QtGui, QtCore
+        from qgis.PyQt import QtCore, QtWidgets
         from qgis.core import QgsApplication
         from qgis.gui import QgsMapCanvas
-        from qgis_interface import QgisInterface
     except ImportError:
         return None, None, None, None
 
@@ -44,7 +43,7 @@ def get_qgis_app():
     global PARENT  # pylint: disable=W0603
     if PARENT is None:
         #noinspection PyPep8Naming
-        PARENT = QtGui.QWidget()
+        PARENT = QtWidgets.QWidget()
 
     global CANVAS  # pylint: disable=W0603
     if CANVAS is None:
@@ -55,7 +54,12 @@ def get_qgis_app():
     global IFACE  # pylint: disable=W0603
     if IFACE is None:
         # QgisInterface is a stub implementation of the QGIS plugin interface
-        #noinspection PyPep8Naming
-        IFACE = QgisInterface(CANVAS)
+        # (not available if the stub is not ported to the running QGIS version)
+        try:
+            from qgis_interface import QgisInterface
+            #noinspection PyPep8Naming
+            IFACE = QgisInterface(CANVAS)
+        except ImportError:
+            pass
 
     return QGIS_APP, CANVAS, IFACE, PARENT